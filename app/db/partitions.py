@@ -0,0 +1,171 @@
+"""
+Particiones mensuales de credit_transactions (RANGE sobre created_at).
+
+La tabla se convierte a particionada con las migraciones 003-006. Desde ahí
+cada mes vive en su propia partición (credit_transactions_AAAA_MM) y este
+módulo crea por adelantado las de los próximos meses:
+
+    python -m app.db.partitions            # crea las que falten
+    python -m app.db.partitions --list     # muestra las existentes
+
+La app también lo corre al arrancar. Si la tabla no está particionada
+(SQLite en tests, o antes de migrar) no hace nada.
+"""
+
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+load_dotenv()
+
+PARENT_TABLE = "credit_transactions"
+# Meses futuros con partición creada de antemano
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Las sesiones se pagan a los pocos minutos de crearse: el webhook busca primero
+# en esta ventana para que Postgres lea sólo las particiones recientes.
+SESSION_LOOKUP_WINDOW_DAYS = int(os.getenv("SESSION_LOOKUP_WINDOW_DAYS", "31"))
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_{month.year}_{month.month:02d}"
+
+
+def lookup_since(window_days: int = SESSION_LOOKUP_WINDOW_DAYS) -> Optional[datetime]:
+    """
+    Límite inferior de created_at para las búsquedas por session_id, o None
+    si la ventana está deshabilitada (0).
+    """
+    if window_days <= 0:
+        return None
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=window_days)
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(:parent)"
+        ),
+        {"parent": PARENT_TABLE},
+    ).first() is not None
+
+
+def covered_until(conn: Connection) -> Optional[date]:
+    """
+    Mayor límite superior entre las particiones existentes (la partición
+    DEFAULT no cuenta). Las particiones son contiguas, así que todo lo anterior
+    ya tiene dónde ir.
+    """
+    rows = conn.execute(
+        text(
+            "SELECT pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ),
+        {"parent": PARENT_TABLE},
+    ).scalars()
+    bounds = []
+    for bound in rows:
+        match = _UPPER_BOUND.search(bound or "")
+        if match:
+            bounds.append(datetime.fromisoformat(match.group(1)).date())
+    return max(bounds) if bounds else None
+
+
+def missing_months(
+    start: date, until: Optional[date], months_ahead: int
+) -> List[Tuple[date, date]]:
+    """
+    Rangos [desde, hasta) mensuales a crear para cubrir desde el mes de
+    `start` hasta `months_ahead` meses después, salteando lo ya cubierto.
+    """
+    month = month_start(start)
+    last = month
+    for _ in range(months_ahead):
+        last = next_month(last)
+
+    ranges = []
+    while month <= last:
+        upper = next_month(month)
+        if until is None or upper > until:
+            ranges.append((month, upper))
+        month = upper
+    return ranges
+
+
+def ensure_partitions(
+    engine: Engine,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Crea las particiones mensuales que falten. Devuelve los nombres creados.
+    """
+    created = []
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return created
+        until = covered_until(conn)
+        for lower, upper in missing_months(today or date.today(), until, months_ahead):
+            # Una partición que empieza antes del límite actual se solaparía
+            # (p. ej. con la tabla histórica adjuntada por la migración).
+            if until is not None and lower < until:
+                continue
+            name = partition_name(lower)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            ))
+            created.append(name)
+    return created
+
+
+def maintain_partitions(engine: Engine) -> None:
+    """
+    Versión para el arranque: una falla no debe impedir que la app levante.
+    """
+    try:
+        created = ensure_partitions(engine)
+        if created:
+            print(f"Particiones creadas: {', '.join(created)}")
+    except Exception as e:
+        print(f"Error al crear particiones de {PARENT_TABLE}: {e}")
+
+
+def main(argv):
+    from app.db.session import engine
+
+    if "--list" in argv:
+        with engine.connect() as conn:
+            for name, bound in conn.execute(text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:parent) ORDER BY c.relname"
+            ), {"parent": PARENT_TABLE}):
+                print(f"{name}: {bound}")
+        return
+
+    for name in ensure_partitions(engine):
+        print(f"Creada {name}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
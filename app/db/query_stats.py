@@ -0,0 +1,248 @@
+"""
+Instrumentación de las sentencias SQL (eventos del Engine de SQLAlchemy).
+
+Cada sentencia suma a las métricas globales (cantidad y tiempo por operación)
+y, dentro de un request, a las estadísticas del request: cantidad, tiempo
+total en la DB y cantidad por fingerprint (la sentencia normalizada, sin
+literales ni parámetros). Además:
+
+    - sentencias de más de SLOW_QUERY_MS van al log de queries lentas
+    - si un request ejecuta la misma forma de sentencia más de
+      N_PLUS_ONE_THRESHOLD veces se emite un aviso de N+1 (una vez por
+      fingerprint y request)
+
+Los tests usan `track_queries()` para afirmar cuántas sentencias hace un
+código:
+
+    with track_queries() as stats:
+        apply_transition(db, ...)
+    assert stats.count <= 3
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.metrics import metrics
+
+load_dotenv()
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Repeticiones de la misma forma de sentencia en un request a partir de las que se avisa
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# Largo máximo del fingerprint en logs
+FINGERPRINT_MAX_LENGTH = 500
+
+queries_total = metrics.counter(
+    "db_queries_total",
+    "Sentencias SQL ejecutadas por operación",
+)
+query_duration = metrics.histogram(
+    "db_query_duration_seconds",
+    "Duración de las sentencias SQL por operación",
+)
+slow_queries = metrics.counter(
+    "db_slow_queries_total",
+    "Sentencias SQL más lentas que SLOW_QUERY_MS",
+)
+n_plus_one_warnings = metrics.counter(
+    "db_n_plus_one_total",
+    "Requests que repitieron una misma forma de sentencia más de "
+    "N_PLUS_ONE_THRESHOLD veces",
+)
+request_queries = metrics.histogram(
+    "db_queries_per_request",
+    "Sentencias SQL por request",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+request_db_time = metrics.histogram(
+    "db_time_per_request_seconds",
+    "Tiempo total en la DB por request",
+)
+
+_NORMALIZERS: Tuple[Tuple[re.Pattern, str], ...] = (
+    (re.compile(r"/\*.*?\*/", re.S), " "),                    # comentarios /* */
+    (re.compile(r"--[^\n]*"), " "),                            # comentarios --
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                      # strings
+    (re.compile(r"%\(\w+\)s|(?<!:):\w+|\$\d+|%s"), "?"),       # parámetros
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                   # números
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),        # listas IN / VALUES
+    (re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+"), "(?), ..."),     # varias filas VALUES
+    (re.compile(r"\s+"), " "),
+)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Forma de la sentencia: sin comentarios, literales ni parámetros, con las
+    listas IN y VALUES colapsadas. Dos sentencias que sólo difieren en los
+    valores tienen el mismo fingerprint.
+    """
+    for pattern, replacement in _NORMALIZERS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return verb if verb in ("select", "insert", "update", "delete") else "other"
+
+
+class QueryStats:
+    """
+    Sentencias de un request (o de un bloque `track_queries`).
+    """
+
+    def __init__(
+        self, label: str = "", n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD
+    ):
+        self.label = label
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints: Counter = Counter()
+        self.slow: List[Tuple[str, float]] = []
+        self.n_plus_one: List[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement_fingerprint: str, elapsed: float) -> int:
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.fingerprints[statement_fingerprint] += 1
+            return self.fingerprints[statement_fingerprint]
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Fingerprints ejecutados más de `threshold` veces, de más a menos.
+        """
+        threshold = self.n_plus_one_threshold if threshold is None else threshold
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n > threshold]
+
+
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def record_query(statement: str, elapsed: float) -> None:
+    operation = _operation(statement)
+    queries_total.inc(operation=operation)
+    query_duration.observe(elapsed, operation=operation)
+
+    stats = current_stats.get()
+    is_slow = elapsed * 1000 >= SLOW_QUERY_MS
+    if stats is None and not is_slow:
+        return
+
+    fp = fingerprint(statement)
+    if is_slow:
+        slow_queries.inc(operation=operation)
+        where = f" en {stats.label}" if stats is not None and stats.label else ""
+        print(
+            f"Query lenta ({elapsed * 1000:.1f} ms){where}: "
+            f"{fp[:FINGERPRINT_MAX_LENGTH]}"
+        )
+        if stats is not None:
+            stats.slow.append((fp, elapsed))
+
+    if stats is not None:
+        repetitions = stats.record(fp, elapsed)
+        if repetitions == stats.n_plus_one_threshold + 1:
+            # Una vez por fingerprint y request, al pasar el umbral
+            stats.n_plus_one.append(fp)
+            n_plus_one_warnings.inc()
+            print(
+                f"Posible N+1{' en ' + stats.label if stats.label else ''}: más de "
+                f"{stats.n_plus_one_threshold} ejecuciones de "
+                f"{fp[:FINGERPRINT_MAX_LENGTH]}"
+            )
+
+
+# -----------------------------
+# Eventos del Engine
+# -----------------------------
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if started:
+        record_query(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    started = conn.info.get("query_started") if conn is not None else None
+    if started:
+        started.pop()
+
+
+def instrument(target=Engine) -> None:
+    """
+    Registra los eventos en `target` (por defecto todos los Engine del
+    proceso: primario, réplicas y los de los tests). Idempotente.
+    """
+    if event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries(
+    label: str = "", n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD
+) -> Iterator[QueryStats]:
+    """
+    Junta las estadísticas de las sentencias ejecutadas dentro del bloque
+    (también las de hilos lanzados con el contexto copiado, como
+    run_in_threadpool o asyncio.to_thread).
+    """
+    stats = QueryStats(label, n_plus_one_threshold)
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI: estadísticas de sentencias por request, reportadas en
+    métricas al terminar.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope.get('method', '')} {scope.get('path', '')}"
+        with track_queries(label, self.n_plus_one_threshold) as stats:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                request_queries.observe(stats.count)
+                request_db_time.observe(stats.total_time)
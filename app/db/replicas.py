@@ -0,0 +1,214 @@
+"""
+Réplicas de lectura opcionales.
+
+Con REPLICA_DATABASE_URLS (URLs separadas por coma) las queries GraphQL de
+sólo lectura se mandan a una réplica sana; todo lo demás sigue yendo al
+primario. Cada réplica se chequea en segundo plano: si no responde o su lag
+supera REPLICA_MAX_LAG_SECONDS sale de la rotación hasta que se recupere.
+
+Read-your-writes: quien acaba de escribir sólo lee de una réplica que, según
+su último chequeo, ya aplicó esa escritura; si ninguna cumple, lee del
+primario.
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+from app.services.metrics import metrics
+
+load_dotenv()
+
+REPLICA_DATABASE_URLS = [
+    u.strip() for u in os.getenv("REPLICA_DATABASE_URLS", "").split(",") if u.strip()
+]
+# Cada cuánto se chequea cada réplica (segundos)
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "2"))
+# Lag a partir del cual la réplica sale de la rotación (segundos)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+# Cuánto se recuerda una escritura para read-your-writes (segundos)
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "30"))
+READ_YOUR_WRITES_MAX_KEYS = int(os.getenv("READ_YOUR_WRITES_MAX_KEYS", "10000"))
+
+# Segundos desde la última transacción aplicada; 0 si la réplica está al día
+# (sin escrituras nuevas pg_last_xact_replay_timestamp() no avanza).
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+replica_lag = metrics.gauge(
+    "db_replica_lag_seconds",
+    "Lag de replicación medido en el último chequeo",
+)
+replica_healthy = metrics.gauge(
+    "db_replica_healthy",
+    "1 si la réplica está en rotación",
+)
+replica_reads = metrics.counter(
+    "db_reads_routed_total",
+    "Lecturas de queries GraphQL por destino (replica o primary)",
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+
+class ReplicaSet:
+    """
+    Réplicas con chequeo de salud y lag. `pick()` elige en round-robin entre
+    las sanas y devuelve None cuando hay que ir al primario.
+    """
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        interval: float = REPLICA_CHECK_INTERVAL,
+        max_lag: float = REPLICA_MAX_LAG_SECONDS,
+    ):
+        self.replicas = [Replica(f"replica-{i}", e) for i, e in enumerate(engines)]
+        self.interval = interval
+        self.max_lag = max_lag
+        self._rr = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def measure_lag(self, engine: Engine) -> float:
+        with engine.connect() as conn:
+            if engine.dialect.name != "postgresql":
+                conn.execute(text("SELECT 1"))
+                return 0.0
+            return float(conn.execute(LAG_QUERY).scalar() or 0)
+
+    def check(self, replica: Replica) -> None:
+        started = time.monotonic()
+        try:
+            replica.lag = self.measure_lag(replica.engine)
+            replica.checked_at = started
+            replica.error = None
+            replica.healthy = replica.lag <= self.max_lag
+        except Exception as e:
+            replica.lag = None
+            replica.error = str(e)
+            replica.healthy = False
+        if replica.lag is not None:
+            replica_lag.set(replica.lag, replica=replica.name)
+        replica_healthy.set(1 if replica.healthy else 0, replica=replica.name)
+
+    def refresh(self) -> None:
+        for replica in self.replicas:
+            was_healthy = replica.healthy
+            self.check(replica)
+            if was_healthy and not replica.healthy:
+                print(
+                    f"Réplica {replica.name} fuera de rotación: "
+                    f"lag={replica.lag} error={replica.error}"
+                )
+
+    def pick(self, wrote_at: Optional[float] = None) -> Optional[Engine]:
+        """
+        Réplica para leer, o None para usar el primario. Con `wrote_at`
+        (monotonic de la última escritura del cliente) sólo sirven réplicas
+        que, según su último chequeo, ya aplicaron esa escritura
+        (checked_at - lag >= wrote_at).
+        """
+        candidates = [r for r in self.replicas if r.healthy]
+        if wrote_at is not None:
+            candidates = [r for r in candidates if r.checked_at - r.lag >= wrote_at]
+        if not candidates:
+            replica_reads.inc(target="primary")
+            return None
+        replica_reads.inc(target="replica")
+        return candidates[next(self._rr) % len(candidates)].engine
+
+    def status(self) -> List[Dict]:
+        return [
+            {
+                "name": r.name,
+                "healthy": r.healthy,
+                "lag_seconds": r.lag,
+                "error": r.error,
+            }
+            for r in self.replicas
+        ]
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Error chequeando réplicas: {e}")
+
+    async def start(self):
+        if not self.replicas:
+            return
+        await asyncio.to_thread(self.refresh)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class RecentWrites:
+    """
+    Última escritura por cliente (monotonic), acotada en cantidad de claves y
+    en tiempo. Es por proceso: con varios workers cada uno ve sólo lo suyo.
+    """
+
+    def __init__(
+        self,
+        window: float = READ_YOUR_WRITES_WINDOW,
+        max_keys: int = READ_YOUR_WRITES_MAX_KEYS,
+    ):
+        self.window = window
+        self.max_keys = max_keys
+        self._writes: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, key: Hashable) -> None:
+        with self._lock:
+            self._writes[key] = time.monotonic()
+            self._writes.move_to_end(key)
+            while len(self._writes) > self.max_keys:
+                self._writes.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[float]:
+        with self._lock:
+            wrote_at = self._writes.get(key)
+            if wrote_at is None:
+                return None
+            if time.monotonic() - wrote_at > self.window:
+                del self._writes[key]
+                return None
+            return wrote_at
+
+
+def create_replica_engines(urls: List[str] = REPLICA_DATABASE_URLS) -> List[Engine]:
+    return [create_engine(url, pool_pre_ping=True) for url in urls]
@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, MetaData, Delete, Insert, Update
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
 from dotenv import load_dotenv
 import os
+from app.db.replicas import ReplicaSet, RecentWrites, create_replica_engines
+from app.db.query_stats import SQL_INSTRUMENTATION, instrument
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -14,6 +16,62 @@ if not DATABASE_URL:
 
 # Configurar SQLAlchemy
 engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Conteo, tiempos, queries lentas y N+1 de todas las sentencias (app/db/query_stats.py)
+if SQL_INSTRUMENTATION:
+    instrument()
+
+# Réplicas de lectura (opcionales, REPLICA_DATABASE_URLS)
+replica_set = ReplicaSet(create_replica_engines())
+recent_writes = RecentWrites()
+
+
+def _dispose_inherited_pool():
+    # Tras un fork el hijo hereda los sockets del padre: se descartan sin
+    # cerrarlos para que cada worker abra sus propias conexiones.
+    engine.dispose(close=False)
+    for replica in replica_set.replicas:
+        replica.engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_inherited_pool)
+
+class RoutingSession(Session):
+    """
+    Sesión que manda las lecturas a una réplica cuando se marcó como de sólo
+    lectura (info["read_only"], lo hace la extensión GraphQL para las queries).
+    Escrituras, flushes y cualquier lectura posterior a una escritura de la
+    misma sesión van al primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_set
+            and self.info.get("read_only")
+            and not self.info.get("wrote")
+            and not self._flushing
+            and not isinstance(clause, (Insert, Update, Delete))
+        ):
+            replica = replica_set.pick(self.info.get("wrote_at"))
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _track_writes(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine
+)
 Base = declarative_base()
 metadata = MetaData()
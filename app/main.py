@@ -1,12 +1,33 @@
+import asyncio
 import os
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from strawberry.fastapi import GraphQLRouter
 from app.schemas.schema import schema
-from app.routers import webhook_router
+from app.routers import (
+    webhook_router,
+    health_router,
+    metrics_router,
+    export_router,
+    status_router,
+    profiler_router,
+)
+from app.routers.graphql_router import PersistedQueryRouter
+from app.services.health_service import health_monitor
+from app.services.jwt_auth import jwks_cache
+from app.services.fx_rates import rate_table
+from app.services.status_notify import status_notifier
+from app.services.job_queue import job_runner
+from app.services.group_commit import transition_writer
+from app.services.payment_stats import stats_folder
+from app.services.event_outbox import outbox_relay
+from app.services.json_codec import CodecJSONResponse
+from app.services.profiler import ProfilerMiddleware
+from app.db.query_stats import QueryStatsMiddleware
 from app.db.session import Base, engine
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, replica_set
+from app.db.partitions import maintain_partitions
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,7 +35,10 @@ LEROI_FRONT = os.getenv("LEROI_FRONT")
 
 def get_context():
     db = SessionLocal()
-    return {"db": db}
+    try:
+        yield {"db": db}
+    finally:
+        db.close()
 
 # Crear tablas en la DB
 try:
@@ -23,7 +47,45 @@ try:
 except Exception as e:
     print(f"Error al conectar a la base de datos: {e}")
 
-app = FastAPI(title="Payments Services prueba", version="2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Particiones mensuales de credit_transactions para los próximos meses
+    await asyncio.to_thread(maintain_partitions, engine)
+    # Snapshot de salud refrescado en segundo plano
+    await health_monitor.start()
+    # Claves del servicio de auth para verificar los JWT localmente
+    await jwks_cache.start()
+    # Chequeo de salud y lag de las réplicas de lectura
+    await replica_set.start()
+    # Tipos de cambio para los precios en otras monedas
+    await rate_table.start()
+    # Conexión LISTEN para los cambios de estado aplicados en otras instancias
+    await status_notifier.start()
+    # Workers de la cola de trabajos (avisos con WEBHOOK_PROCESSING=queue)
+    await job_runner.start()
+    # Suma los eventos de estadísticas a los rollups
+    await stats_folder.start()
+    # Publica los eventos que quedaron en el outbox sin publicar
+    await outbox_relay.start()
+    yield
+    await job_runner.stop()
+    # Escribe las transiciones encoladas en modo group commit
+    await transition_writer.stop()
+    await outbox_relay.stop()
+    await stats_folder.stop()
+    await status_notifier.stop()
+    await rate_table.stop()
+    await replica_set.stop()
+    await jwks_cache.stop()
+    await health_monitor.stop()
+
+
+app = FastAPI(
+    title="Payments Services prueba",
+    version="2.0",
+    lifespan=lifespan,
+    default_response_class=CodecJSONResponse,
+)
 
 ALLOWED_ORIGINS = [LEROI_FRONT, "http://localhost:5173","http://localhost:3000","http://localhost:3001","https://leroi-front-next.vercel.app"]
 
@@ -36,6 +98,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Sentencias SQL por request (conteo, tiempo, N+1)
+app.add_middleware(QueryStatsMiddleware)
+
+# Profiling bajo demanda (header X-Profile o PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilerMiddleware)
+
 # Ruta de prueba
 @app.get("/")
 async def root_health_check():
@@ -44,12 +112,27 @@ async def root_health_check():
 
 
 # GraphQL
-graphql_app = GraphQLRouter(schema, context_getter=get_context)
+graphql_app = PersistedQueryRouter(schema, context_getter=get_context)
 app.include_router(graphql_app, prefix="/payments-be", tags=["payments-be"])
 
 # REST: webhook
 app.include_router(webhook_router.router)
 
+# Probes de liveness / readiness
+app.include_router(health_router.router)
+
+# Métricas
+app.include_router(metrics_router.router)
+
+# Export para conciliación
+app.include_router(export_router.router)
+
+# Estado del pago en tiempo real (SSE)
+app.include_router(status_router.router)
+
+# Perfiles de requests (admin)
+app.include_router(profiler_router.router)
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080)) 
     uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
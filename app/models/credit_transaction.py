@@ -1,14 +1,30 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, func
+from sqlalchemy import Column, Integer, LargeBinary, String, TIMESTAMP, func
 from app.db.session import Base
+from app.services.tokens import hash_token
 
 class CreditTransaction(Base):
     __tablename__ = "credit_transactions"
 
+    # En Postgres la tabla está particionada por mes sobre created_at y la PK
+    # real es (id, created_at); id sigue siendo único (sale de una secuencia).
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), nullable=False)
     credits = Column(Integer, nullable=False)
-    created_at = Column(TIMESTAMP, server_default=func.now())
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
     status = Column(String(50), nullable=False)  # approved, pending, failed
+    # Última transición aplicada (NULL: sin transiciones desde la migración 007)
+    status_changed_at = Column(TIMESTAMP)
     payment_id = Column(String(255), nullable=False)
-    session_id = Column(String, nullable=False) 
-    token = Column(String(512), nullable=False)
+    session_id = Column(String, nullable=False, index=True)
+    # SHA-256 del token de autenticación: el token en sí no se guarda
+    token_hash = Column(LargeBinary(32), nullable=False)
+    # Se incrementa en cada cambio de estado (concurrencia optimista)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    def _set_token(self, token):
+        self.token_hash = hash_token(token) if token is not None else None
+
+    # Sólo escritura: CreditTransaction(token=...) guarda el hash
+    token = property(fset=_set_token)
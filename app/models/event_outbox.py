@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, Integer, String, Text, TIMESTAMP
+from app.db.session import Base
+
+class OutboxEvent(Base):
+    """
+    Evento de Pub/Sub pendiente de publicar. Se inserta en la misma transacción
+    que la escritura que lo origina (la transición de estado del pago), así que
+    existe si y sólo si esa escritura se confirmó. Se borra al publicarse; si la
+    publicación del request falla, lo publica el relay.
+    """
+    __tablename__ = "event_outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    event_type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    ordering_key = Column(String(255))
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text)
@@ -0,0 +1,34 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, Index, Integer, String, Text, TIMESTAMP, text
+from app.db.session import Base
+
+class Job(Base):
+    """
+    Trabajo pendiente de una cola. Los workers de cualquier instancia lo toman
+    con SELECT ... FOR UPDATE SKIP LOCKED; mientras corre queda invisible hasta
+    `locked_until` (si el worker muere, otro lo retoma al vencer).
+    """
+    __tablename__ = "jobs"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    queue = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    # queued, running, done, dead
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # Próximo intento
+    run_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    locked_until = Column(TIMESTAMP)
+    locked_by = Column(String(255))
+    last_error = Column(Text)
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    finished_at = Column(TIMESTAMP)
+
+    __table_args__ = (
+        # Sólo pendientes: los terminados no pesan en la búsqueda de trabajo
+        Index(
+            "ix_jobs_claim", "queue", "status", "run_at",
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Column, Integer, Numeric, String, TIMESTAMP
+from app.db.session import Base
+
+class PaymentStatsDelta(Base):
+    """
+    Evento de estadísticas todavía no sumado a los rollups. Se inserta en la
+    transacción que lo origina (sólo INSERT: no comparte filas con otros
+    requests) y un proceso en segundo plano lo pliega en payment_stats_rollups.
+    """
+    __tablename__ = "payment_stats_deltas"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    at = Column(TIMESTAMP, nullable=False)
+    tier = Column(Integer, nullable=False)
+    status = Column(String(50), nullable=False)
+    count = Column(Integer, nullable=False)
+    amount = Column(Numeric(12, 2, asdecimal=False), nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Numeric, String, TIMESTAMP
+from app.db.session import Base
+
+class PaymentStatsRollup(Base):
+    """
+    Contadores precalculados por hora y por día. Cada fila acumula los eventos
+    (sesiones creadas y transiciones de pago) de un paquete y estado en el bucket.
+    """
+    __tablename__ = "payment_stats_rollups"
+
+    granularity = Column(String(10), primary_key=True)  # hour, day
+    bucket_start = Column(TIMESTAMP, primary_key=True)
+    tier = Column(Integer, primary_key=True)  # paquete de créditos
+    status = Column(String(50), primary_key=True)  # created, pending, approved, failed
+    count = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(12, 2, asdecimal=False), nullable=False, default=0)
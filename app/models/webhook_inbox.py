@@ -0,0 +1,32 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    TIMESTAMP,
+    func,
+)
+from app.db.session import Base
+
+class WebhookInbox(Base):
+    """
+    Cada aviso recibido en /webhooks/mercadopago, tal como llegó, con el
+    resultado de su último procesamiento. El cuerpo no se modifica ni se borra:
+    permite reprocesar avisos si un bug o una caída rompió el procesamiento.
+    """
+    __tablename__ = "webhook_inbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    received_at = Column(
+        TIMESTAMP, nullable=False, server_default=func.now(), index=True
+    )
+    topic = Column(String(50))  # "type" del aviso: payment, merchant_order, ...
+    payment_id = Column(String(255), index=True)
+    body = Column(LargeBinary, nullable=False)  # cuerpo crudo del request
+    # received, processed, skipped, ignored, error
+    outcome = Column(String(20), nullable=False, default="received")
+    detail = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    processed_at = Column(TIMESTAMP)
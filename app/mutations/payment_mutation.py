@@ -1,5 +1,7 @@
 import strawberry
+from starlette.concurrency import run_in_threadpool
 from app.services.payment_service import MercadoPagoService
+from app.services.preference_cache import preference_cache, preference_key
 from app.schemas.payment_schema import Payment, PreferenceInput, ItemType, PayerType
 from dotenv import load_dotenv
 import os
@@ -14,10 +16,12 @@ mp_service = MercadoPagoService()
 @strawberry.type
 class PaymentMutation:
     @strawberry.mutation
-    def create_preference(self, input: PreferenceInput) -> Payment:
+    async def create_preference(self, input: PreferenceInput) -> Payment:
+        items = [item.__dict__ for item in input.items]
+
         # Construir payload para MercadoPago
         pref_data = {
-            "items": [item.__dict__ for item in input.items],
+            "items": items,
             "external_reference": input.external_reference,
             "auto_return": "approved",
             "back_urls": {
@@ -29,12 +33,16 @@ class PaymentMutation:
         }
 
 
-        # Llamar al servicio de MercadoPago
-        resp = mp_service.create_preference(pref_data)
-        pref = resp["response"]
+        def _create():
+            resp = mp_service.create_preference(pref_data)
+            # 🔎 Debug: imprimir respuesta completa de MP
+            print("Respuesta MP:", resp["response"])
+            return resp
 
-        # 🔎 Debug: imprimir respuesta completa de MP
-        print("Respuesta MP:", pref)
+        # Reutilizar la preferencia si el mismo checkout ya la creó
+        key = preference_key(items, input.external_reference)
+        resp = await run_in_threadpool(preference_cache.get_or_create, key, _create)
+        pref = resp["response"]
 
         # Mapear respuesta a tipo GraphQL
         return Payment(
@@ -1,7 +1,13 @@
 import strawberry
 import uuid
+from typing import Optional
 from strawberry.types import Info
+from starlette.concurrency import run_in_threadpool
 from app.models.credit_transaction import CreditTransaction
+from app.schemas.replica_routing import VERIFIED_CLIENT_KEY
+from app.services.jwt_auth import token_verifier
+from app.services.payment_stats import CREATED, record_event
+from app.services.tokens import hash_token
 
 @strawberry.type
 class SessionType:
@@ -10,27 +16,41 @@ class SessionType:
 @strawberry.type
 class SessionMutation:
     @strawberry.mutation
-    def create_session(
+    async def create_session(
         self,
         info: Info,
         authToken: str,
         credits: int,
-        email: str,
+        email: Optional[str] = None,
     ) -> SessionType:
         db = info.context["db"]
 
-        session_id = str(uuid.uuid4())
+        def _create():
+            # El token se verifica localmente contra el JWKS del servicio de auth;
+            # el email sale de los claims (el argumento queda por compatibilidad).
+            # Un kid desconocido refresca el JWKS por HTTP: fuera del event loop.
+            claims = token_verifier.verify(authToken)
+            email = claims.get("email")
+            if not email:
+                raise ValueError("El token no incluye email")
+            # Identidad verificada para read-your-writes (ReadReplicaRouting)
+            info.context[VERIFIED_CLIENT_KEY] = hash_token(authToken)
 
-        transaction = CreditTransaction(
-            email=email,
-            credits=credits,
-            token=authToken,
-            session_id=session_id,
-            payment_id="",
-            status="pending"
-        )
-        db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
+            session_id = str(uuid.uuid4())
 
+            transaction = CreditTransaction(
+                email=email,
+                credits=credits,
+                token=authToken,
+                session_id=session_id,
+                payment_id="",
+                status="pending"
+            )
+            db.add(transaction)
+            record_event(db, CREATED, credits)
+            db.commit()
+            db.refresh(transaction)
+            return session_id
+
+        session_id = await run_in_threadpool(_create)
         return SessionType(session_id=session_id)
@@ -0,0 +1,65 @@
+# app/pubsub/envelope.py
+"""
+Sobre (envelope) versionado de los eventos publicados en Pub/Sub.
+
+El cuerpo va en msgpack (o JSON con PUBSUB_ENCODING=json, para migrar
+suscriptores) y los datos para filtrar viajan como atributos del mensaje, así
+las suscripciones pueden filtrar del lado del servidor sin decodificar nada:
+
+    attributes.event_type = "payment_status_changed" AND attributes.status = "approved"
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import msgpack
+
+from app.services import json_codec
+
+SCHEMA_VERSION = 1
+PUBSUB_ENCODING = os.getenv("PUBSUB_ENCODING", "msgpack").lower()
+
+CONTENT_TYPES = {
+    "msgpack": "application/x-msgpack",
+    "json": "application/json",
+}
+
+
+def encode_event(
+    event_type: str,
+    payload: Dict[str, Any],
+    encoding: str = PUBSUB_ENCODING,
+) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Devuelve (cuerpo, atributos) listos para publisher.publish().
+    """
+    envelope = {
+        "v": SCHEMA_VERSION,
+        "event": event_type,
+        "ts": int(time.time() * 1000),
+        "data": payload,
+    }
+    if encoding == "json":
+        data = json_codec.dumps(envelope)
+    else:
+        data = msgpack.packb(envelope, use_bin_type=True)
+
+    attributes = {
+        "event_type": event_type,
+        "schema_version": str(SCHEMA_VERSION),
+        "content_type": CONTENT_TYPES.get(encoding, CONTENT_TYPES["msgpack"]),
+    }
+    status: Optional[str] = payload.get("status")
+    if status:
+        attributes["status"] = str(status)
+    return data, attributes
+
+
+def decode_event(data: bytes, attributes: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Inversa de encode_event, para suscriptores y pruebas.
+    """
+    if attributes.get("content_type") == CONTENT_TYPES["json"]:
+        return json_codec.loads(data)
+    return msgpack.unpackb(data, raw=False)
@@ -1,24 +1,69 @@
 # app/pubsub/pubsub_client.py
 from google.cloud import pubsub_v1
-import json
+from typing import Optional
 import os
+import threading
+from app.pubsub.envelope import encode_event
 
 PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 TOPIC_ID = os.getenv("PUBSUB_TOPIC")
 
-publisher = pubsub_v1.PublisherClient()
-topic_path = publisher.topic_path(PROJECT_ID, TOPIC_ID)
+topic_path = pubsub_v1.PublisherClient.topic_path(PROJECT_ID, TOPIC_ID)
 
-def publish_event(event_type: str, payload: dict):
+# El cliente abre canales gRPC que no sobreviven a un fork: se crea perezosamente
+# y se recrea si el proceso actual no es el que lo construyó (workers de uvicorn).
+_publisher = None
+_publisher_pid = None
+
+# Publicaciones en curso (enviadas y aún sin confirmar por Pub/Sub)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def get_publisher() -> pubsub_v1.PublisherClient:
+    """
+    Devuelve el cliente de Pub/Sub del proceso actual.
+    """
+    global _publisher, _publisher_pid
+    if _publisher is None or _publisher_pid != os.getpid():
+        # Ordering keys: los eventos de un mismo pago llegan en orden
+        options = pubsub_v1.types.PublisherOptions(enable_message_ordering=True)
+        _publisher = pubsub_v1.PublisherClient(publisher_options=options)
+        _publisher_pid = os.getpid()
+    return _publisher
+
+
+def get_backlog() -> int:
+    """
+    Cantidad de eventos publicados que todavía esperan confirmación de Pub/Sub.
+    """
+    return _in_flight
+
+
+def publish_event(event_type: str, payload: dict, ordering_key: Optional[str] = None):
     """
     Envía un mensaje a Pub/Sub con el tipo de evento y los datos asociados.
+    El tipo, el estado y la versión del schema van como atributos del mensaje;
+    `ordering_key` (el session_id) mantiene en orden los eventos de un pago.
     """
-    message = {
-        "event": event_type,
-        "data": payload
-    }
-    data = json.dumps(message).encode("utf-8")
-
-    future = publisher.publish(topic_path, data)
-    print(f"Publicando evento '{event_type}' en {TOPIC_ID}...")
-    return future.result()
+    global _in_flight
+    data, attributes = encode_event(event_type, payload)
+    publisher = get_publisher()
+
+    with _in_flight_lock:
+        _in_flight += 1
+    try:
+        future = publisher.publish(
+            topic_path, data, ordering_key=ordering_key or "", **attributes
+        )
+        print(f"Publicando evento '{event_type}' en {TOPIC_ID}...")
+        try:
+            return future.result()
+        except Exception:
+            # Un error pausa la ordering key: se reanuda para los próximos eventos
+            if ordering_key:
+                publisher.resume_publish(topic_path, ordering_key)
+            raise
+    finally:
+        with _in_flight_lock:
+            _in_flight -= 1
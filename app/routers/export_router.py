@@ -0,0 +1,52 @@
+import os
+from datetime import datetime
+from typing import Literal, Optional
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.db.session import engine
+from app.services.api_auth import bearer_token_auth
+from app.services.export_service import MEDIA_TYPES, encode_rows, export_rows
+
+load_dotenv()
+EXPORT_API_TOKEN = os.getenv("EXPORT_API_TOKEN")
+
+router = APIRouter()
+
+
+# Engine para el export: el stream dura más que una dependencia con yield,
+# así que cada descarga abre y cierra su propia conexión.
+def get_export_engine():
+    return engine
+
+
+# Export de transacciones para conciliación (CSV o NDJSON en streaming).
+# Para retomar una descarga cortada: after_id = último id recibido (con CSV,
+# header=false para no repetir el encabezado).
+@router.get(
+    "/exports/transactions",
+    dependencies=[Depends(bearer_token_auth(EXPORT_API_TOKEN, "exports"))],
+)
+def export_transactions(
+    date_from: datetime = Query(..., alias="from"),
+    date_to: datetime = Query(..., alias="to"),
+    status: Optional[Literal["pending", "approved", "failed"]] = None,
+    format: Literal["csv", "ndjson"] = "csv",
+    after_id: int = Query(0, ge=0),
+    header: bool = True,
+    export_engine=Depends(get_export_engine),
+):
+    if date_to <= date_from:
+        raise HTTPException(status_code=422, detail="'to' debe ser posterior a 'from'")
+
+    rows = export_rows(export_engine, date_from, date_to, status, after_id)
+    filename = f"transactions_{date_from:%Y%m%d}_{date_to:%Y%m%d}.{format}"
+    return StreamingResponse(
+        encode_rows(rows, format, header=header),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
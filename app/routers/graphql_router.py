@@ -0,0 +1,83 @@
+from typing import Literal
+
+from graphql import GraphQLError
+from strawberry.fastapi import GraphQLRouter
+from strawberry.http import GraphQLRequestData
+from strawberry.http.parse_content_type import parse_content_type
+from strawberry.http.exceptions import HTTPException
+from strawberry.types import ExecutionResult
+
+from app.services import json_codec
+from app.services.persisted_queries import PersistedQueryError, persisted_query_registry
+
+
+class PersistedQueryRouter(GraphQLRouter):
+    """
+    GraphQLRouter con Automatic Persisted Queries: el cliente puede mandar sólo
+    el hash (extensions.persistedQuery.sha256Hash) y el documento se resuelve
+    desde el registro.
+    """
+
+    registry = persisted_query_registry
+
+    def parse_json(self, data):
+        try:
+            return json_codec.loads(data)
+        except json_codec.JSONDecodeError as e:
+            raise HTTPException(400, "Unable to parse request body as JSON") from e
+
+    def encode_json(self, response_data) -> str:
+        return json_codec.dumps_str(response_data)
+
+    def create_response(self, response_data, sub_response):
+        # Se serializa directo a bytes, sin pasar por str
+        response = json_codec.CodecJSONResponse(
+            response_data,
+            status_code=sub_response.status_code or 200,
+        )
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+    def should_render_graphql_ide(self, request) -> bool:
+        # Un GET con sólo el hash es una operación, no un pedido del IDE
+        if request.query_params.get("extensions"):
+            return False
+        return super().should_render_graphql_ide(request)
+
+    async def parse_http_body(self, request) -> GraphQLRequestData:
+        content_type, _ = parse_content_type(request.content_type or "")
+
+        if request.method == "GET":
+            data = self.parse_query_params(request.query_params)
+        elif "application/json" in content_type:
+            data = self.parse_json(await request.get_body())
+        else:
+            # multipart (uploads): sin persisted queries
+            return await super().parse_http_body(request)
+
+        if not isinstance(data, dict):
+            data = {}
+        data = self.registry.resolve(data)
+
+        headers = {key.lower(): value for key, value in request.headers.items()}
+        protocol: Literal["http", "multipart-subscription"] = "http"
+        accept = parse_content_type(headers.get("accept", ""))
+        if self._is_multipart_subscriptions(*accept):
+            protocol = "multipart-subscription"
+
+        return GraphQLRequestData(
+            query=data.get("query"),
+            variables=data.get("variables"),
+            operation_name=data.get("operationName"),
+            protocol=protocol,
+        )
+
+    async def execute_operation(self, request, context, root_value):
+        try:
+            return await super().execute_operation(request, context, root_value)
+        except PersistedQueryError as e:
+            # Formato que esperan los clientes APQ para reintentar con la query completa
+            return ExecutionResult(
+                data=None,
+                errors=[GraphQLError(e.message, extensions={"code": e.code})],
+            )
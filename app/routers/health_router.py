@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Response
+from app.services.health_service import health_monitor
+
+router = APIRouter()
+
+
+# Liveness: el proceso responde, no depende de nada externo
+@router.get("/healthz")
+async def liveness():
+    return {"status": "ok"}
+
+
+# Readiness: lee el snapshot refrescado en segundo plano
+@router.get("/readyz")
+async def readiness(response: Response):
+    snapshot = health_monitor.snapshot()
+    if not snapshot["ready"]:
+        response.status_code = 503
+    return snapshot
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics import metrics
+
+router = APIRouter()
+
+
+# Métricas del proceso en formato de texto de Prometheus. Con varios workers
+# responde uno solo: son las de ese worker (ver MetricsRegistry)
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,49 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response
+from app.services.api_auth import bearer_token_auth
+from app.services.profiler import PROFILER_ADMIN_TOKEN, profile_store
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    dependencies=[Depends(bearer_token_auth(PROFILER_ADMIN_TOKEN, "profiler"))],
+)
+
+
+# Perfiles guardados, del más nuevo al más viejo
+@router.get("")
+async def list_profiles():
+    return [record.summary() for record in profile_store.list()]
+
+
+# Un perfil como HTML (pyinstrument), árbol de llamadas en texto o
+# speedscope (JSON para https://www.speedscope.app, flame graph)
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: int, format: Literal["html", "text", "speedscope"] = "html"
+):
+    record = profile_store.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+
+    content = record.render(format)
+    if format == "text":
+        return PlainTextResponse(content)
+    if format == "speedscope":
+        return Response(
+            content,
+            media_type="application/json",
+            headers={
+                "Content-Disposition": (
+                    f'attachment; filename="profile-{profile_id}.speedscope.json"'
+                )
+            },
+        )
+    return HTMLResponse(content)
+
+
+@router.delete("")
+async def clear_profiles():
+    profile_store.clear()
+    return {"status": "ok"}
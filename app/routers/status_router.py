@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.services import json_codec
+from app.services.status_broker import (
+    STATUS_HEARTBEAT_INTERVAL,
+    status_broker,
+)
+from app.services.status_stream import payment_status_stream, load_status_event
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter()
+
+
+async def _sse(session_id: str):
+    events = payment_status_stream(session_id, heartbeat=STATUS_HEARTBEAT_INTERVAL)
+    async for event in events:
+        if event is None:
+            # Latido: comentario SSE para que proxies no corten la conexión
+            yield b": ping\n\n"
+            continue
+        yield b"event: status\ndata: " + json_codec.dumps(event) + b"\n\n"
+
+
+# Server-Sent Events con el estado del pago de la sesión (alternativa a la
+# subscription GraphQL para clientes sin WebSocket)
+@router.get("/payments/{session_id}/events")
+async def payment_status_events(session_id: str):
+    if len(status_broker) >= status_broker.max_subscribers:
+        raise HTTPException(status_code=503, detail="Demasiados suscriptores")
+    if await run_in_threadpool(load_status_event, session_id) is None:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+
+    return StreamingResponse(
+        _sse(session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
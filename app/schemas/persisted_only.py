@@ -0,0 +1,28 @@
+from typing import Iterator
+
+from graphql import GraphQLError
+from strawberry.extensions import SchemaExtension
+
+from app.services.persisted_queries import persisted_query_registry
+
+
+class PersistedQueryAllowList(SchemaExtension):
+    """
+    Modo allow-list (GRAPHQL_PERSISTED_ONLY) para todos los transportes. El
+    router HTTP ya rechaza lo que no está en el manifest, pero las operaciones
+    por WebSocket (graphql-transport-ws / graphql-ws) no pasan por él: el
+    chequeo se repite acá, antes de ejecutar queries, mutations y
+    subscriptions.
+    """
+
+    registry = persisted_query_registry
+
+    def on_execute(self) -> Iterator[None]:
+        if not self.registry.is_allowed(self.execution_context.query or ""):
+            # Strawberry lo devuelve como error de la operación (también en
+            # las subscriptions) y no ejecuta nada
+            raise GraphQLError(
+                "Operación no registrada",
+                extensions={"code": "PERSISTED_QUERY_NOT_ALLOWED"},
+            )
+        yield
@@ -1,4 +1,8 @@
 import strawberry
+from typing import List
+from starlette.concurrency import run_in_threadpool
+from app.services.price_catalog import price_catalog
+from app.services.pricing import BASE_CURRENCY, price_for
 
 @strawberry.type
 class Price:
@@ -10,15 +14,19 @@ class Price:
 @strawberry.type
 class PriceQuery:
     @strawberry.field
-    def price(self, credits: int) -> Price:
-        PRICE_TABLE = {
-            250: 5.0,    # 250 créditos → 5 USD
-            750: 12.0,   # 750 créditos → 12 USD
-            1500: 20.0,  # 1500 créditos → 20 USD
-        }
-
-        cost = PRICE_TABLE.get(credits)
-        if not cost:
+    async def price(self, credits: int, currency: str = BASE_CURRENCY) -> Price:
+        if not price_for(credits):
             raise ValueError("Cantidad de créditos no válida")
 
-        return Price(credits=credits, cost=cost, currency="USD")
+        # Precio convertido y redondeado desde la tabla precalculada
+        # (el cálculo de una moneda nueva no corre en el event loop)
+        cost = await run_in_threadpool(price_catalog.price, credits, currency)
+        return Price(credits=credits, cost=cost, currency=currency.upper())
+
+    @strawberry.field
+    async def prices(self, currency: str = BASE_CURRENCY) -> List[Price]:
+        table = await run_in_threadpool(price_catalog.prices, currency)
+        return [
+            Price(credits=credits, cost=cost, currency=currency.upper())
+            for credits, cost in table.items()
+        ]
@@ -0,0 +1,194 @@
+import os
+from typing import Any, Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLObjectType,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    VariableNode,
+    get_named_type,
+    get_nullable_type,
+    is_leaf_type,
+)
+from strawberry.extensions import SchemaExtension
+from strawberry.types import ExecutionResult
+
+from app.services.metrics import metrics
+
+load_dotenv()
+
+GRAPHQL_MAX_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", "8"))
+GRAPHQL_MAX_ALIASES = int(os.getenv("GRAPHQL_MAX_ALIASES", "15"))
+GRAPHQL_MAX_COST = int(os.getenv("GRAPHQL_MAX_COST", "200"))
+
+# Costo por campo ("Tipo.campo"). Los que llaman a MercadoPago pesan mucho más
+# que los que resuelven en memoria o en la DB.
+FIELD_COSTS: Dict[str, int] = {
+    "Mutation.createPreference": 50,
+    "Mutation.getTransaction": 50,
+    "Mutation.createSession": 5,
+    # Long-poll: retiene la conexión hasta AWAIT_STATUS_MAX_TIMEOUT
+    "Query.awaitSessionStatus": 10,
+}
+# Costo de un campo objeto sin entrada en FIELD_COSTS; los escalares no suman
+DEFAULT_FIELD_COST = 1
+# Tamaño asumido de una lista cuando no se pide con first/last/limit
+DEFAULT_LIST_SIZE = 10
+LIST_SIZE_ARGUMENTS = ("first", "last", "limit")
+
+query_cost_histogram = metrics.histogram(
+    "graphql_query_cost",
+    "Costo calculado de cada operación GraphQL",
+    buckets=(1, 5, 10, 25, 50, 100, 200, 500, 1000),
+)
+rejected_queries = metrics.counter(
+    "graphql_queries_rejected_total",
+    "Operaciones GraphQL rechazadas por superar el costo máximo",
+)
+
+
+def _list_size(node: FieldNode, variables: Dict[str, Any]) -> int:
+    for argument in node.arguments or ():
+        if argument.name.value not in LIST_SIZE_ARGUMENTS:
+            continue
+        if isinstance(argument.value, IntValueNode):
+            return int(argument.value.value)
+        if isinstance(argument.value, VariableNode):
+            value = variables.get(argument.value.name.value)
+            if isinstance(value, int):
+                return value
+    return DEFAULT_LIST_SIZE
+
+
+def _selection_cost(
+    selection_set: SelectionSetNode,
+    parent_type: GraphQLObjectType,
+    multiplier: int,
+    fragments: Dict[str, FragmentDefinitionNode],
+    variables: Dict[str, Any],
+    schema,
+    visited: frozenset = frozenset(),
+) -> int:
+    total = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = selection.name.value
+            field = getattr(parent_type, "fields", {}).get(name)
+            if field is None or name.startswith("__"):
+                continue
+
+            field_type = get_named_type(field.type)
+            default = 0 if is_leaf_type(field_type) else DEFAULT_FIELD_COST
+            total += FIELD_COSTS.get(f"{parent_type.name}.{name}", default) * multiplier
+
+            if selection.selection_set:
+                child_multiplier = multiplier
+                if isinstance(get_nullable_type(field.type), GraphQLList):
+                    child_multiplier *= _list_size(selection, variables)
+                total += _selection_cost(
+                    selection.selection_set, field_type, child_multiplier,
+                    fragments, variables, schema, visited,
+                )
+
+        elif isinstance(selection, InlineFragmentNode):
+            fragment_type = parent_type
+            if selection.type_condition:
+                type_name = selection.type_condition.name.value
+                fragment_type = schema.get_type(type_name) or parent_type
+            total += _selection_cost(
+                selection.selection_set, fragment_type, multiplier,
+                fragments, variables, schema, visited,
+            )
+
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = fragments.get(name)
+            if fragment is None or name in visited:
+                continue
+            type_name = fragment.type_condition.name.value
+            fragment_type = schema.get_type(type_name) or parent_type
+            total += _selection_cost(
+                fragment.selection_set, fragment_type, multiplier,
+                fragments, variables, schema, visited | {name},
+            )
+    return total
+
+
+def operation_cost(
+    schema, document, operation_name: Optional[str], variables: Dict[str, Any]
+) -> int:
+    """
+    Costo estimado de la operación: suma de los costos de cada campo
+    multiplicada por el tamaño de las listas que lo contienen.
+    """
+    definitions = document.definitions
+    fragments = {
+        d.name.value: d for d in definitions if isinstance(d, FragmentDefinitionNode)
+    }
+    operations = [d for d in definitions if isinstance(d, OperationDefinitionNode)]
+    if operation_name:
+        operations = [
+            op for op in operations if op.name and op.name.value == operation_name
+        ]
+    if not operations:
+        return 0
+
+    operation = operations[0]
+    root_type = schema.get_root_type(operation.operation)
+    if root_type is None:
+        return 0
+    return _selection_cost(
+        operation.selection_set, root_type, 1, fragments, variables or {}, schema
+    )
+
+
+class QueryCostLimiter(SchemaExtension):
+    """
+    Calcula el costo de cada operación antes de ejecutarla, lo reporta en
+    métricas y rechaza las que superan `max_cost`. Se registra como clase para
+    que Strawberry cree una instancia por operación.
+    """
+
+    def __init__(self, *, execution_context=None, max_cost: int = GRAPHQL_MAX_COST):
+        self.execution_context = execution_context
+        self.max_cost = max_cost
+        self.cost: Optional[int] = None
+
+    def on_execute(self) -> Iterator[None]:
+        execution_context = self.execution_context
+        self.cost = operation_cost(
+            execution_context.schema._schema,
+            execution_context.graphql_document,
+            execution_context.operation_name,
+            execution_context.variables or {},
+        )
+        operation_type = execution_context.operation_type.value
+        query_cost_histogram.observe(self.cost, operation_type=operation_type)
+
+        if self.cost > self.max_cost:
+            rejected_queries.inc(operation_type=operation_type)
+            # Con un resultado ya cargado Strawberry no ejecuta la operación
+            execution_context.result = ExecutionResult(
+                data=None,
+                errors=[
+                    GraphQLError(
+                        f"La operación tiene costo {self.cost} "
+                        f"y el máximo es {self.max_cost}",
+                        extensions={"code": "QUERY_TOO_EXPENSIVE"},
+                    )
+                ],
+            )
+        yield
+
+    def get_results(self) -> Dict[str, Any]:
+        if self.cost is None:
+            return {}
+        return {"cost": {"requested": self.cost, "maximum": self.max_cost}}
@@ -0,0 +1,61 @@
+from typing import Hashable, Optional
+
+from strawberry.types.graphql import OperationType
+from strawberry.extensions import SchemaExtension
+
+from app.db.session import recent_writes
+from app.services.tokens import hash_token
+
+
+# Clave del contexto GraphQL con la identidad verificada del cliente (hash del
+# token), la deja createSession después de verificar el authToken
+VERIFIED_CLIENT_KEY = "client_key"
+
+
+def client_key(request) -> Optional[Hashable]:
+    """
+    Identifica al cliente para read-your-writes: el hash del token si viene en
+    Authorization (Bearer), si no la IP.
+
+    El front envía el token sólo como argumento de createSession y las
+    queries que siguen (awaitSessionStatus, getTransaction) no llevan
+    credenciales: para ellas la clave es la IP, que sólo sale de
+    X-Forwarded-For si el proxy es de confianza (FORWARDED_ALLOW_IPS). Varios
+    clientes detrás de la misma IP comparten la ventana: leen más del
+    primario, nunca datos viejos.
+    """
+    if request is None:
+        return None
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return hash_token(token)
+    client = getattr(request, "client", None)
+    return client.host if client else None
+
+
+class ReadReplicaRouting(SchemaExtension):
+    """
+    Marca la sesión de DB de las queries como de sólo lectura para que el
+    RoutingSession las mande a una réplica, respetando la última escritura del
+    cliente. Las mutations siguen en el primario y, si escriben, se recuerda
+    la escritura del cliente.
+    """
+
+    def on_execute(self):
+        context = self.execution_context.context
+        if not isinstance(context, dict):
+            context = {}
+        db = context.get("db")
+        key = client_key(context.get("request"))
+
+        operation_type = self.execution_context.operation_type
+        if db is not None and operation_type == OperationType.QUERY:
+            db.info["read_only"] = True
+            db.info["wrote_at"] = recent_writes.get(key) if key is not None else None
+        yield
+        if db is not None and db.info.get("wrote"):
+            # La escritura se recuerda con la clave del request y, si el
+            # resolver verificó un token, también con su hash: así la ve una
+            # lectura posterior con ese token en Authorization
+            for written_key in {key, context.get(VERIFIED_CLIENT_KEY)} - {None}:
+                recent_writes.mark(written_key)
@@ -1,15 +1,31 @@
+import os
 import strawberry
+from strawberry.extensions import (
+    MaxAliasesLimiter,
+    ParserCache,
+    QueryDepthLimiter,
+    ValidationCache,
+)
 from app.schemas.price_schema import PriceQuery
+from app.schemas.stats_schema import StatsQuery
+from app.schemas.status_schema import PaymentStatusSubscription, StatusQuery
 from app.mutations.payment_mutation import PaymentMutation
 from app.schemas.transaction_schema import TransactionMutation
 from app.mutations.session_mutation import SessionMutation
+from app.schemas.replica_routing import ReadReplicaRouting
+from app.schemas.persisted_only import PersistedQueryAllowList
+from app.schemas.query_limits import (
+    GRAPHQL_MAX_ALIASES,
+    GRAPHQL_MAX_DEPTH,
+    QueryCostLimiter,
+)
 
 
 # -----------------------------
 # Query principal
 # -----------------------------
 @strawberry.type
-class Query(PriceQuery):   # hereda de PriceQuery
+class Query(PriceQuery, StatsQuery, StatusQuery):   # hereda los campos de cada módulo
     @strawberry.field
     def ping(self) -> str:
         return "pong"
@@ -23,7 +39,35 @@ class Mutation(PaymentMutation, TransactionMutation, SessionMutation):
     pass
 
 
+# -----------------------------
+# Subscriptions raíz
+# -----------------------------
+@strawberry.type
+class Subscription(PaymentStatusSubscription):
+    pass
+
+
 # -----------------------------
 # Schema principal
 # -----------------------------
-schema = strawberry.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
+# El front envía siempre las mismas operaciones: se cachea el documento
+# parseado y el resultado de la validación
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.getenv("GRAPHQL_DOCUMENT_CACHE_SIZE", "256"))
+
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=[
+        # Sólo operaciones del manifest con GRAPHQL_PERSISTED_ONLY (HTTP y WebSocket)
+        PersistedQueryAllowList,
+        ParserCache(maxsize=GRAPHQL_DOCUMENT_CACHE_SIZE),
+        ValidationCache(maxsize=GRAPHQL_DOCUMENT_CACHE_SIZE),
+        # Límites contra queries costosas (profundidad, alias y costo)
+        QueryDepthLimiter(max_depth=GRAPHQL_MAX_DEPTH),
+        MaxAliasesLimiter(max_alias_count=GRAPHQL_MAX_ALIASES),
+        QueryCostLimiter,
+        # Queries de sólo lectura a réplicas (si hay configuradas)
+        ReadReplicaRouting,
+    ],
+)
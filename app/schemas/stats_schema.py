@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+from enum import Enum
+from typing import Annotated, List, Optional
+
+import strawberry
+from dotenv import load_dotenv
+from strawberry.types import Info
+
+from app.services.api_auth import token_matches
+from app.services.payment_stats import CONVERTED, CREATED, query_stats
+from app.services.payment_state import APPROVED, FAILED, PENDING
+
+load_dotenv()
+STATS_API_TOKEN = os.getenv("STATS_API_TOKEN")
+
+
+@strawberry.enum
+class Granularity(Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+
+@strawberry.type
+class PaymentStatsBucket:
+    bucket_start: datetime
+    tier: int
+    created: int
+    pending: int
+    approved: int
+    failed: int
+    revenue: float  # suma de lo cobrado en los pagos aprobados
+    # Sesiones creadas en el bucket que ya se aprobaron (cohorte)
+    converted: int
+    # converted / created: de las sesiones creadas en el bucket, cuántas se
+    # aprobaron (hasta ahora). `approved` cuenta las aprobaciones ocurridas en
+    # el bucket, de sesiones creadas antes o después, y no sirve para esto.
+    conversion_rate: Optional[float]
+
+
+@strawberry.type
+class StatsQuery:
+    @strawberry.field
+    def payment_stats(
+        self,
+        info: Info,
+        date_from: Annotated[datetime, strawberry.argument(name="from")],
+        date_to: Annotated[datetime, strawberry.argument(name="to")],
+        granularity: Granularity = Granularity.DAY,
+    ) -> List[PaymentStatsBucket]:
+        request = info.context.get("request")
+        authorization = (
+            request.headers.get("authorization") if request is not None else None
+        )
+        if not token_matches(authorization, STATS_API_TOKEN):
+            raise PermissionError("No autorizado")
+
+        db = info.context["db"]
+        buckets = query_stats(db, date_from, date_to, granularity.value)
+        result = []
+        for bucket in buckets:
+            created = bucket.counts.get(CREATED, 0)
+            converted = bucket.counts.get(CONVERTED, 0)
+            result.append(PaymentStatsBucket(
+                bucket_start=bucket.bucket_start,
+                tier=bucket.tier,
+                created=created,
+                pending=bucket.counts.get(PENDING, 0),
+                approved=bucket.counts.get(APPROVED, 0),
+                failed=bucket.counts.get(FAILED, 0),
+                revenue=bucket.amounts.get(APPROVED, 0.0),
+                converted=converted,
+                conversion_rate=converted / created if created else None,
+            ))
+        return result
@@ -0,0 +1,36 @@
+import strawberry
+from typing import AsyncGenerator, Optional
+from app.services.status_broker import AWAIT_STATUS_MAX_TIMEOUT
+from app.services.status_stream import await_status_change, payment_status_stream
+
+
+@strawberry.type
+class PaymentStatusEvent:
+    session_id: str
+    status: str
+    payment_id: Optional[str]
+
+
+@strawberry.type
+class StatusQuery:
+    @strawberry.field
+    async def await_session_status(
+        self, session_id: str, timeout: float = AWAIT_STATUS_MAX_TIMEOUT
+    ) -> PaymentStatusEvent:
+        # Long-poll: responde apenas cambia el estado, o con el estado actual
+        # al vencer el timeout (acotado a AWAIT_STATUS_MAX_TIMEOUT)
+        timeout = min(max(timeout, 0.0), AWAIT_STATUS_MAX_TIMEOUT)
+        event = await await_status_change(session_id, timeout)
+        return PaymentStatusEvent(**event)
+
+
+@strawberry.type
+class PaymentStatusSubscription:
+    @strawberry.subscription
+    async def payment_status(
+        self, session_id: str
+    ) -> AsyncGenerator[PaymentStatusEvent, None]:
+        # Estado actual y cada cambio aplicado por el webhook, hasta un estado
+        # final (approved) o el idle timeout
+        async for event in payment_status_stream(session_id):
+            yield PaymentStatusEvent(**event)
@@ -1,8 +1,7 @@
 import strawberry
 from typing import Optional
-from app.services.payment_service import MercadoPagoService
-
-mp_service = MercadoPagoService()
+from starlette.concurrency import run_in_threadpool
+from app.services.payment_lookup import payment_lookup
 
 
 # -----------------------------
@@ -22,9 +21,10 @@ class Transaction:
 @strawberry.type
 class TransactionMutation:
     @strawberry.mutation
-    def get_transaction(self, payment_id: str) -> Transaction:
-        resp = mp_service.sdk.payment().get(payment_id)
-        data = resp["response"]
+    async def get_transaction(self, payment_id: str) -> Transaction:
+        # Comparte la llamada a MP con el webhook y otros polls del mismo pago,
+        # aunque ya esté enviada: el poll no necesita un estado más nuevo
+        data = await run_in_threadpool(payment_lookup.get, payment_id, fresh=False)
 
         return Transaction(
             id=data["id"],
@@ -0,0 +1,130 @@
+"""
+Entrypoint de producción: uvicorn multi-worker con uvloop + httptools.
+
+    python -m app.server
+
+Variables de entorno:
+    PORT                  Puerto de escucha (8080)
+    WEB_CONCURRENCY       Cantidad de workers (por defecto, CPUs disponibles)
+    KEEP_ALIVE_TIMEOUT    Segundos que se mantiene abierta una conexión ociosa (5)
+    BACKLOG               Conexiones pendientes de aceptar en el socket (2048)
+    GRACEFUL_TIMEOUT      Segundos para drenar requests al apagar (30)
+    ACCESS_LOG            "false" desactiva el log de accesos
+    FORWARDED_ALLOW_IPS   IPs o CIDRs del proxy/balanceador, separados por coma,
+                          de los que se aceptan X-Forwarded-For/Proto (127.0.0.1)
+
+Las métricas de /metrics están en memoria de cada worker: con más de uno, cada
+scrape trae sólo las del worker que lo atiende. Si se usan, correr
+WEB_CONCURRENCY=1 y escalar en contenedores.
+"""
+
+import importlib.util
+import ipaddress
+import os
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """
+    Límite de CPU impuesto al contenedor (cgroup v2 o v1), si existe.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def default_workers() -> int:
+    """
+    Un worker por CPU disponible para el proceso, respetando el límite del cgroup.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, int(limit) or 1)
+
+    return max(cpus, 1)
+
+
+# Tamaño máximo de un CIDR en FORWARDED_ALLOW_IPS (ver forwarded_allow_ips)
+MAX_PROXY_ADDRESSES = 65536
+
+
+def forwarded_allow_ips(value: str) -> List[str]:
+    """
+    Direcciones de los proxies de confianza a partir de una lista de IPs y
+    CIDRs. Uvicorn 0.30 sólo compara IPs exactas, así que los CIDRs se
+    expanden (hasta MAX_PROXY_ADDRESSES direcciones cada uno).
+    """
+    addresses: List[str] = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        if item == "*":
+            raise ValueError(
+                "FORWARDED_ALLOW_IPS no admite '*': indicá el CIDR del proxy"
+            )
+        network = ipaddress.ip_network(item, strict=False)
+        if network.num_addresses > MAX_PROXY_ADDRESSES:
+            raise ValueError(f"CIDR demasiado grande en FORWARDED_ALLOW_IPS: {item}")
+        addresses.extend(str(address) for address in network)
+    return addresses
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def build_config() -> Dict[str, Any]:
+    """
+    Argumentos para uvicorn.run a partir del entorno.
+    """
+    return {
+        # La app se pasa como import string: cada worker la importa por su cuenta
+        "app": "app.main:app",
+        "host": os.getenv("HOST", "0.0.0.0"),
+        "port": int(os.getenv("PORT", "8080")),
+        "workers": int(os.getenv("WEB_CONCURRENCY") or default_workers()),
+        "loop": "uvloop" if _available("uvloop") else "auto",
+        "http": "httptools" if _available("httptools") else "auto",
+        "timeout_keep_alive": int(os.getenv("KEEP_ALIVE_TIMEOUT", "5")),
+        "backlog": int(os.getenv("BACKLOG", "2048")),
+        "timeout_graceful_shutdown": int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        "access_log": os.getenv("ACCESS_LOG", "true").lower() != "false",
+        "proxy_headers": True,
+        "forwarded_allow_ips": forwarded_allow_ips(
+            os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+        ),
+    }
+
+
+def main():
+    config = build_config()
+    print(
+        f"Iniciando {config['workers']} worker(s) en el puerto {config['port']} "
+        f"(loop={config['loop']}, http={config['http']})"
+    )
+    uvicorn.run(**config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import secrets
+from typing import Callable, Optional
+
+from fastapi import Header, HTTPException
+
+
+def token_matches(authorization: Optional[str], expected_token: Optional[str]) -> bool:
+    """
+    True si el header `Authorization: Bearer <token>` coincide (comparación en
+    tiempo constante). Sin token configurado nunca coincide.
+    """
+    if not expected_token:
+        return False
+    scheme, _, token = (authorization or "").partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(
+        token.encode(), expected_token.encode()
+    )
+
+
+def bearer_token_auth(expected_token: Optional[str], realm: str) -> Callable:
+    """
+    Dependencia de FastAPI que exige `Authorization: Bearer <token>`.
+    Sin token configurado el endpoint queda deshabilitado (503) en lugar de
+    abierto.
+    """
+
+    def _check(authorization: Optional[str] = Header(default=None)) -> None:
+        if not expected_token:
+            raise HTTPException(
+                status_code=503,
+                detail=f"{realm} deshabilitado: falta configurar el token",
+            )
+        if not token_matches(authorization, expected_token):
+            raise HTTPException(
+                status_code=401,
+                detail="Token inválido",
+                headers={"WWW-Authenticate": f'Bearer realm="{realm}"'},
+            )
+
+    return _check
@@ -0,0 +1,195 @@
+import csv
+import gzip
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Engine
+
+from app.models.credit_transaction import CreditTransaction
+from app.services.payment_state import TERMINAL_STATES
+
+load_dotenv()
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Filas por vuelta del cursor y por DELETE
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+# Pausa entre DELETEs para no saturar la réplica ni el autovacuum
+ARCHIVE_DELETE_PAUSE_MS = float(os.getenv("ARCHIVE_DELETE_PAUSE_MS", "50"))
+
+# El token de sesión no se archiva: no sirve para conciliar y es un secreto.
+ARCHIVE_COLUMNS = (
+    CreditTransaction.id,
+    CreditTransaction.email,
+    CreditTransaction.credits,
+    CreditTransaction.created_at,
+    CreditTransaction.status,
+    CreditTransaction.payment_id,
+    CreditTransaction.session_id,
+    CreditTransaction.version,
+)
+
+
+class ArchiveError(Exception):
+    pass
+
+
+@dataclass
+class ArchiveResult:
+    path: Optional[Path]
+    archived: int
+    deleted: int
+
+
+def _archivable(before: datetime):
+    return (
+        CreditTransaction.created_at < before,
+        CreditTransaction.status.in_(sorted(TERMINAL_STATES)),
+    )
+
+
+def stream_rows(
+    engine: Engine, before: datetime, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> Iterator[tuple]:
+    """
+    Filas archivables en orden de id, leídas con un cursor del lado del
+    servidor: en memoria sólo hay `batch_size` filas a la vez.
+    """
+    stmt = (
+        select(*ARCHIVE_COLUMNS)
+        .where(*_archivable(before))
+        .order_by(CreditTransaction.id)
+        .execution_options(yield_per=batch_size)
+    )
+    with engine.connect() as conn:
+        for row in conn.execute(stmt):
+            yield tuple(row)
+
+
+def count_archivable(engine: Engine, before: datetime) -> int:
+    with engine.connect() as conn:
+        stmt = (
+            select(func.count())
+            .select_from(CreditTransaction)
+            .where(*_archivable(before))
+        )
+        return conn.execute(stmt).scalar_one()
+
+
+def write_archive(rows: Iterable[tuple], path: Path) -> int:
+    """
+    Escribe las filas como CSV comprimido con gzip. Se escribe a un archivo
+    temporal que se renombra al terminar, así nunca queda un archivo a medias
+    con el nombre final. Devuelve la cantidad de filas escritas.
+    """
+    tmp = path.with_name(path.name + ".tmp")
+    count = 0
+    with gzip.open(tmp, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([c.key for c in ARCHIVE_COLUMNS])
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    tmp.replace(path)
+    return count
+
+
+def read_archive_ids(path: Path) -> Iterator[int]:
+    with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            yield int(row[0])
+
+
+def _batches(ids: Iterable[int], size: int) -> Iterator[List[int]]:
+    batch = []
+    for id_ in ids:
+        batch.append(id_)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def delete_archived(
+    engine: Engine,
+    path: Path,
+    before: datetime,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause_ms: float = ARCHIVE_DELETE_PAUSE_MS,
+) -> int:
+    """
+    Borra sólo los ids que están en el archivo, en transacciones cortas de
+    `batch_size` filas. Se repite el filtro de archivado para no borrar una
+    fila que haya cambiado desde que se leyó.
+    """
+    deleted = 0
+    for batch in _batches(read_archive_ids(path), batch_size):
+        with engine.begin() as conn:
+            result = conn.execute(
+                delete(CreditTransaction)
+                .where(CreditTransaction.id.in_(batch), *_archivable(before))
+                .execution_options(synchronize_session=False)
+            )
+            deleted += result.rowcount
+        if pause_ms > 0:
+            time.sleep(pause_ms / 1000)
+    return deleted
+
+
+def archive_transactions(
+    engine: Engine,
+    before: datetime,
+    output_dir: Union[str, Path] = ARCHIVE_DIR,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    delete_rows: bool = True,
+    pause_ms: float = ARCHIVE_DELETE_PAUSE_MS,
+) -> ArchiveResult:
+    """
+    Archiva las transacciones terminadas (approved/failed) anteriores a
+    `before`:
+
+    1. las lee con un cursor del servidor y las escribe a un .csv.gz
+    2. relee el archivo ya sincronizado a disco y compara su cantidad de
+       filas con un SELECT count(*) del mismo filtro
+    3. borra de la tabla los ids archivados, en lotes
+
+    Si en el medio una fila vieja pasó a un estado terminal los conteos no
+    coinciden y no se borra nada: basta con volver a correrlo.
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    path = out / f"credit_transactions_before_{before:%Y%m%d}_{stamp}.csv.gz"
+
+    written = write_archive(stream_rows(engine, before, batch_size), path)
+    if written == 0:
+        path.unlink()
+        return ArchiveResult(path=None, archived=0, deleted=0)
+
+    in_file = sum(1 for _ in read_archive_ids(path))
+    in_table = count_archivable(engine, before)
+    if in_file != in_table:
+        raise ArchiveError(
+            f"{path} tiene {in_file} filas y la tabla {in_table} archivables: "
+            "no se borra nada"
+        )
+
+    deleted = 0
+    if delete_rows:
+        deleted = delete_archived(engine, path, before, batch_size, pause_ms)
+    if delete_rows and deleted != written:
+        print(
+            f"Aviso: se archivaron {written} filas pero se borraron {deleted} "
+            "(cambiaron durante el archivado)"
+        )
+    return ArchiveResult(path=path, archived=in_file, deleted=deleted)
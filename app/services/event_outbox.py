@@ -0,0 +1,214 @@
+"""
+Outbox transaccional de los eventos de Pub/Sub.
+
+El evento payment_status_changed lleva los créditos de la sesión: no puede
+perderse si Pub/Sub falla después del commit de la transición (los reintentos
+del aviso ven la transición ya aplicada y no vuelven a publicar). Por eso el
+evento se inserta en event_outbox en la misma transacción que el UPDATE de la
+transición y se publica después:
+
+  - en el request, apenas se confirma la transición (`dispatch`);
+  - si eso falla (o la instancia muere antes), el relay en segundo plano
+    publica los eventos con más de OUTBOX_RELAY_DELAY segundos, por orden de
+    id, tomándolos con FOR UPDATE SKIP LOCKED (varias instancias no publican
+    el mismo a la vez).
+
+La entrega es al menos una vez: un evento publicado cuyo borrado falla se
+vuelve a publicar. Los consumidores descartan repetidos por
+(session_id, version).
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.event_outbox import OutboxEvent
+from app.pubsub.pubsub_client import publish_event
+from app.services import json_codec
+from app.services.metrics import metrics
+
+load_dotenv()
+
+# Cada cuánto busca el relay eventos sin publicar (segundos)
+OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", "5"))
+# Antigüedad mínima de un evento para el relay: antes lo publica el request (segundos)
+OUTBOX_RELAY_DELAY = float(os.getenv("OUTBOX_RELAY_DELAY", "10"))
+OUTBOX_RELAY_BATCH = int(os.getenv("OUTBOX_RELAY_BATCH", "100"))
+
+outbox_events = metrics.counter(
+    "outbox_events_total",
+    "Eventos del outbox por origen (inline, relay) y resultado (published, error)",
+)
+
+
+def add_event(
+    db: Session,
+    event_type: str,
+    payload: Dict[str, Any],
+    ordering_key: Optional[str] = None,
+) -> OutboxEvent:
+    """
+    Agrega el evento a la sesión; queda en el outbox al hacer commit (junto
+    con lo que haya escrito quien llama).
+    """
+    event = OutboxEvent(
+        event_type=event_type,
+        payload=json_codec.dumps_str(payload),
+        ordering_key=ordering_key,
+        created_at=datetime.utcnow(),
+    )
+    db.add(event)
+    return event
+
+
+def _published(db: Session, event_id: int) -> None:
+    db.execute(delete(OutboxEvent).where(OutboxEvent.id == event_id))
+
+
+def _failed(db: Session, event_id: int, error: str) -> None:
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id == event_id)
+        .values(attempts=OutboxEvent.attempts + 1, last_error=error)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def dispatch(
+    db: Session,
+    event_id: int,
+    event_type: str,
+    payload: Dict[str, Any],
+    ordering_key: Optional[str] = None,
+    publish: Callable = publish_event,
+) -> bool:
+    """
+    Publica un evento recién confirmado y lo saca del outbox. Si la
+    publicación falla no propaga el error: el evento queda para el relay.
+    """
+    try:
+        publish(event_type, payload, ordering_key=ordering_key)
+    except Exception as e:
+        print(f"Error publicando el evento {event_id}, queda en el outbox: {e}")
+        outbox_events.inc(via="inline", result="error")
+        db.rollback()
+        _failed(db, event_id, str(e))
+        db.commit()
+        return False
+    outbox_events.inc(via="inline", result="published")
+    _published(db, event_id)
+    db.commit()
+    return True
+
+
+def relay_pending(
+    db: Session,
+    publish: Optional[Callable] = None,
+    limit: int = OUTBOX_RELAY_BATCH,
+    min_age: float = OUTBOX_RELAY_DELAY,
+) -> int:
+    """
+    Publica hasta `limit` eventos con al menos `min_age` segundos, por orden
+    de id, y los saca del outbox en una transacción. Si un evento falla, los
+    siguientes de su ordering key esperan a la próxima pasada (Pub/Sub los
+    tiene que recibir en orden). Devuelve cuántos publicó.
+    """
+    publish = publish or publish_event
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+    events = db.execute(
+        select(OutboxEvent)
+        .where(OutboxEvent.created_at <= cutoff)
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    published = 0
+    blocked: Set[Optional[str]] = set()
+    for event in events:
+        if event.ordering_key and event.ordering_key in blocked:
+            continue
+        try:
+            payload = json_codec.loads(event.payload)
+            publish(event.event_type, payload, ordering_key=event.ordering_key)
+        except Exception as e:
+            print(f"Relay: error publicando el evento {event.id}: {e}")
+            outbox_events.inc(via="relay", result="error")
+            event.attempts += 1
+            event.last_error = str(e)
+            blocked.add(event.ordering_key)
+            continue
+        outbox_events.inc(via="relay", result="published")
+        db.delete(event)
+        published += 1
+    db.commit()
+    return published
+
+
+class OutboxRelay:
+    """
+    Publica en segundo plano, cada `interval` segundos, los eventos que el
+    request no llegó a publicar.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = OUTBOX_RELAY_INTERVAL,
+        batch: int = OUTBOX_RELAY_BATCH,
+        min_age: float = OUTBOX_RELAY_DELAY,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch = batch
+        self.min_age = min_age
+        self._task: Optional[asyncio.Task] = None
+
+    def relay(self, min_age: Optional[float] = None) -> int:
+        published = 0
+        db = self.session_factory()
+        try:
+            while True:
+                n = relay_pending(
+                    db,
+                    limit=self.batch,
+                    min_age=self.min_age if min_age is None else min_age,
+                )
+                published += n
+                if n < self.batch:
+                    return published
+        except Exception as e:
+            db.rollback()
+            print(f"Error en el relay del outbox: {e}")
+            return published
+        finally:
+            db.close()
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.relay)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+outbox_relay = OutboxRelay()
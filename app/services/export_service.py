@@ -0,0 +1,89 @@
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Iterator, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models.credit_transaction import CreditTransaction
+from app.services import json_codec
+from app.services.archive_service import ARCHIVE_COLUMNS
+
+load_dotenv()
+
+# Filas por vuelta del cursor del servidor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+# Bytes acumulados antes de mandar un chunk al cliente
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", "65536"))
+
+# Mismas columnas que el archivado: sin el token de sesión
+EXPORT_COLUMNS = ARCHIVE_COLUMNS
+EXPORT_FIELDS = [c.key for c in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def export_rows(
+    engine: Engine,
+    date_from: datetime,
+    date_to: datetime,
+    status: Optional[str] = None,
+    after_id: int = 0,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[tuple]:
+    """
+    Transacciones con created_at en [date_from, date_to) ordenadas por id,
+    leídas con un cursor del servidor. `after_id` permite retomar una
+    descarga cortada desde el último id recibido (paginación por clave).
+    """
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .where(
+            CreditTransaction.created_at >= date_from,
+            CreditTransaction.created_at < date_to,
+            CreditTransaction.id > after_id,
+        )
+        .order_by(CreditTransaction.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if status:
+        stmt = stmt.where(CreditTransaction.status == status)
+    with engine.connect() as conn:
+        for row in conn.execute(stmt):
+            yield tuple(row)
+
+
+def _csv_line(row) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(row)
+    return buf.getvalue().encode("utf-8")
+
+
+def encode_rows(
+    rows: Iterator[tuple], fmt: str, header: bool = True
+) -> Iterator[bytes]:
+    """
+    Serializa las filas en chunks de ~EXPORT_CHUNK_BYTES. El encabezado CSV
+    sale antes de la consulta, así el primer byte llega de inmediato.
+    """
+    if fmt == "csv" and header:
+        yield _csv_line(EXPORT_FIELDS)
+
+    chunk = bytearray()
+    for row in rows:
+        if fmt == "csv":
+            chunk += _csv_line(row)
+        else:
+            chunk += json_codec.dumps(dict(zip(EXPORT_FIELDS, row)))
+            chunk += b"\n"
+        if len(chunk) >= EXPORT_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
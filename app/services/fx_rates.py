@@ -0,0 +1,223 @@
+"""
+Tipos de cambio en memoria para mostrar precios en otras monedas.
+
+La tabla se carga al arrancar y se refresca en segundo plano cada
+FX_REFRESH_INTERVAL segundos. Las lecturas nunca esperan a la red: si ya pasó
+el intervalo se devuelve la tabla vieja y se dispara un refresco
+(stale-while-revalidate); sin tabla, o con una más vieja que FX_MAX_STALENESS,
+la lectura falla con FxRateUnavailable y también dispara el refresco. Tras un
+refresco fallido no se reintenta durante FX_FAILURE_BACKOFF segundos, así un
+proveedor caído no recibe un intento por request.
+
+Proveedores (sin FX_PROVIDER sólo hay precios en BASE_CURRENCY):
+    FX_PROVIDER=http     FX_RATES_URL (formato {"base_code", "rates"})
+    FX_PROVIDER=static   FX_STATIC_RATES="ARS=1000,BRL=5.1" (desarrollo y tests)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import requests
+from dotenv import load_dotenv
+
+from app.services.metrics import metrics
+from app.services.pricing import BASE_CURRENCY
+
+load_dotenv()
+
+FX_PROVIDER = os.getenv("FX_PROVIDER", "").lower()
+FX_RATES_URL = os.getenv("FX_RATES_URL", "")
+FX_STATIC_RATES = os.getenv("FX_STATIC_RATES", "")
+# Cada cuánto se refresca la tabla (segundos)
+FX_REFRESH_INTERVAL = float(os.getenv("FX_REFRESH_INTERVAL", "900"))
+# Edad máxima de una tabla usable sin refrescar antes (segundos)
+FX_MAX_STALENESS = float(os.getenv("FX_MAX_STALENESS", "86400"))
+# Espera tras un refresco fallido antes de volver a intentar (segundos)
+FX_FAILURE_BACKOFF = float(os.getenv("FX_FAILURE_BACKOFF", "60"))
+
+fx_refreshes = metrics.counter(
+    "fx_rates_refresh_total",
+    "Refrescos de la tabla de tipos de cambio",
+)
+fx_age = metrics.gauge(
+    "fx_rates_age_seconds",
+    "Antigüedad de la tabla de tipos de cambio al último uso",
+)
+
+
+class FxRateUnavailable(Exception):
+    pass
+
+
+@dataclass
+class RateSnapshot:
+    base: str
+    rates: Dict[str, float]
+    fetched_at: float
+    # Cambia en cada refresco: invalida los precios precalculados
+    version: int = 0
+
+
+def http_provider(url: str = FX_RATES_URL) -> Callable[[], Dict[str, float]]:
+    def fetch() -> Dict[str, float]:
+        resp = requests.get(url, timeout=5)
+        resp.raise_for_status()
+        data = resp.json()
+        base = data.get("base_code") or data.get("base")
+        if base != BASE_CURRENCY:
+            raise FxRateUnavailable(
+                f"El proveedor devolvió base {base}, se esperaba {BASE_CURRENCY}"
+            )
+        return {k.upper(): float(v) for k, v in data["rates"].items()}
+
+    return fetch
+
+
+def static_provider(rates) -> Callable[[], Dict[str, float]]:
+    """
+    Proveedor local: un dict o un string "ARS=1000,BRL=5.1".
+    """
+    if isinstance(rates, str):
+        rates = dict(pair.split("=", 1) for pair in rates.split(",") if "=" in pair)
+    table = {k.strip().upper(): float(v) for k, v in rates.items()}
+
+    def fetch() -> Dict[str, float]:
+        return dict(table)
+
+    return fetch
+
+
+def default_provider() -> Optional[Callable[[], Dict[str, float]]]:
+    """
+    Proveedor según FX_PROVIDER, o None si no está configurado.
+    """
+    if FX_PROVIDER == "static":
+        return static_provider(FX_STATIC_RATES)
+    if FX_PROVIDER == "http":
+        if not FX_RATES_URL:
+            raise ValueError("FX_PROVIDER=http requiere FX_RATES_URL")
+        return http_provider(FX_RATES_URL)
+    if FX_PROVIDER:
+        raise ValueError(f"FX_PROVIDER inválido: {FX_PROVIDER}")
+    return None
+
+
+class RateTable:
+    def __init__(
+        self,
+        provider: Optional[Callable[[], Dict[str, float]]],
+        interval: float = FX_REFRESH_INTERVAL,
+        max_staleness: float = FX_MAX_STALENESS,
+        failure_backoff: float = FX_FAILURE_BACKOFF,
+    ):
+        self._provider = provider
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.failure_backoff = failure_backoff
+        self._snapshot: Optional[RateSnapshot] = None
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._revalidating = False
+        self._task: Optional[asyncio.Task] = None
+
+    def refresh(self) -> RateSnapshot:
+        """
+        Pide la tabla al proveedor (bloqueante) y reemplaza el snapshot.
+        """
+        if self._provider is None:
+            raise FxRateUnavailable("Tipos de cambio no configurados (FX_PROVIDER)")
+        try:
+            rates = self._provider()
+        except Exception:
+            self._failed_at = time.monotonic()
+            fx_refreshes.inc(result="error")
+            raise
+        rates[BASE_CURRENCY] = 1.0
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._snapshot = RateSnapshot(BASE_CURRENCY, rates, time.monotonic(), version)
+        self._failed_at = None
+        fx_refreshes.inc(result="ok")
+        return self._snapshot
+
+    def _revalidate(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error refrescando tipos de cambio: {e}")
+        finally:
+            self._revalidating = False
+
+    def _backing_off(self) -> bool:
+        failed_at = self._failed_at
+        if failed_at is None:
+            return False
+        return time.monotonic() - failed_at < self.failure_backoff
+
+    def _trigger_refresh(self) -> None:
+        # Un solo refresco en segundo plano a la vez, y ninguno durante el backoff
+        if self._provider is None or self._backing_off():
+            return
+        with self._lock:
+            if not self._revalidating:
+                self._revalidating = True
+                threading.Thread(target=self._revalidate, daemon=True).start()
+
+    def snapshot(self) -> RateSnapshot:
+        """
+        Tabla actual, sin esperar a la red. Sin tabla usable lanza
+        FxRateUnavailable (y dispara un refresco en segundo plano).
+        """
+        snapshot = self._snapshot
+        age = time.monotonic() - snapshot.fetched_at if snapshot else None
+
+        if snapshot is None or age > self.max_staleness:
+            self._trigger_refresh()
+            if self._provider is None:
+                raise FxRateUnavailable("Tipos de cambio no configurados (FX_PROVIDER)")
+            raise FxRateUnavailable("Sin tipos de cambio actualizados")
+
+        fx_age.set(age)
+        if age > self.interval:
+            self._trigger_refresh()
+        return snapshot
+
+    def rate(self, currency: str) -> float:
+        rate = self.snapshot().rates.get(currency.upper())
+        if rate is None:
+            raise ValueError(f"Moneda no soportada: {currency}")
+        return rate
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._backing_off():
+                await asyncio.to_thread(self._revalidate)
+
+    async def start(self):
+        if self._provider is None:
+            print(f"FX_PROVIDER no configurado: precios sólo en {BASE_CURRENCY}")
+            return
+        try:
+            await asyncio.to_thread(self.refresh)
+        except Exception as e:
+            print(f"Error cargando tipos de cambio: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+rate_table = RateTable(default_provider())
@@ -0,0 +1,402 @@
+"""
+Group commit de las transiciones de estado del webhook (write-behind opcional).
+
+Con WEBHOOK_GROUP_COMMIT=true cada transición se encola y un hilo escritor las
+aplica en lote: un único
+
+    UPDATE credit_transactions SET status, payment_id, version = version + 1
+    FROM (VALUES (session_id, target, payment_id), ...) AS v
+    WHERE session_id = v.session_id AND (status, target) permitido ...
+    RETURNING ...
+
+y un único commit cada GROUP_COMMIT_MAX_DELAY_MS o GROUP_COMMIT_MAX_BATCH
+transiciones, lo que pase primero. Quien encola recibe un Future que se
+resuelve recién después del commit: cuando `apply()` devuelve, el cambio ya
+es durable (mismo TransitionResult que apply_transition). Una transición que
+ya entró en un lote no se abandona por timeout.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from sqlalchemy import TIMESTAMP, text
+from sqlalchemy.orm import Session
+
+from app.db.partitions import lookup_since
+from app.db.session import SessionLocal
+from app.models.credit_transaction import CreditTransaction
+from app.services.metrics import metrics
+from app.services.payment_state import (
+    ALLOWED_PREDECESSORS,
+    APPROVED,
+    NEW_PAYMENT_TRANSITIONS,
+    EventBuilder,
+    TransitionResult,
+    add_transition_event,
+)
+from app.services.payment_stats import (
+    CONVERTED,
+    HOUR,
+    bucket_start,
+    record_events,
+    stats_delta,
+    utcnow,
+)
+from app.services.pricing import price_for
+
+load_dotenv()
+
+WEBHOOK_GROUP_COMMIT = os.getenv("WEBHOOK_GROUP_COMMIT", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Espera máxima de una transición antes de escribir el lote (milisegundos)
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", "5"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "200"))
+# Espera máxima de quien encola hasta el commit (segundos)
+GROUP_COMMIT_TIMEOUT = float(os.getenv("GROUP_COMMIT_TIMEOUT", "10"))
+
+TABLE = CreditTransaction.__tablename__
+
+batch_size_histogram = metrics.histogram(
+    "group_commit_batch_size",
+    "Transiciones escritas por commit",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+flush_duration = metrics.histogram(
+    "group_commit_flush_seconds",
+    "Duración de cada lote (UPDATE + estadísticas + commit)",
+)
+
+
+@dataclass
+class PendingTransition:
+    session_id: str
+    target: str
+    payment_id: str
+    event: Optional[EventBuilder] = None
+    # Monto cobrado en BASE_CURRENCY (None: precio del paquete)
+    amount: Optional[float] = None
+    future: Future = field(default_factory=Future)
+
+
+def _allowed_pairs(new_payment: bool):
+    # (estado actual, destino) permitidos; con `new_payment`, los que además
+    # exigen un payment_id distinto del guardado
+    return [
+        (prev, target)
+        for target, prevs in ALLOWED_PREDECESSORS.items()
+        for prev in prevs
+        if ((prev, target) in NEW_PAYMENT_TRANSITIONS) == new_payment
+    ]
+
+
+def batch_update_sql(count: int, since: Optional[datetime]) -> str:
+    """
+    UPDATE ... FROM (VALUES ...) para `count` transiciones. Las columnas del
+    VALUES se referencian como column1..3 (nombre por defecto en Postgres y
+    en SQLite).
+    """
+    rows = ", ".join(f"(:s{i}, :t{i}, :p{i})" for i in range(count))
+    same_payment = ", ".join(
+        f"(:prev{i}, :next{i})" for i in range(len(_allowed_pairs(False)))
+    )
+    new_payment = ", ".join(
+        f"(:newprev{i}, :newnext{i})" for i in range(len(_allowed_pairs(True)))
+    )
+    window = f" AND {TABLE}.created_at >= :since" if since is not None else ""
+    return (
+        f"UPDATE {TABLE} SET status = v.column2, payment_id = v.column3, "
+        f"version = {TABLE}.version + 1, "
+        f"status_changed_at = :changed_at "
+        f"FROM (VALUES {rows}) AS v "
+        f"WHERE {TABLE}.session_id = v.column1{window} "
+        f"AND (({TABLE}.status, v.column2) IN (VALUES {same_payment}) "
+        f"OR (({TABLE}.status, v.column2) IN (VALUES {new_payment}) "
+        f"AND {TABLE}.payment_id <> v.column3)) "
+        f"RETURNING session_id, email, credits, version, created_at"
+    )
+
+
+def _batch_params(
+    items: Sequence[PendingTransition], since: Optional[datetime]
+) -> Dict:
+    params = {}
+    for i, item in enumerate(items):
+        params.update({
+            f"s{i}": item.session_id,
+            f"t{i}": item.target,
+            f"p{i}": item.payment_id,
+        })
+    for i, (prev, target) in enumerate(_allowed_pairs(False)):
+        params.update({f"prev{i}": prev, f"next{i}": target})
+    for i, (prev, target) in enumerate(_allowed_pairs(True)):
+        params.update({f"newprev{i}": prev, f"newnext{i}": target})
+    if since is not None:
+        params["since"] = since
+    params["changed_at"] = utcnow()
+    return params
+
+
+def _rounds(items: Sequence[PendingTransition]) -> List[List[PendingTransition]]:
+    # Un UPDATE ... FROM toca cada fila una sola vez: las transiciones de la
+    # misma sesión van en UPDATEs sucesivos, en el orden en que llegaron.
+    rounds: List[List[PendingTransition]] = []
+    depth: Dict[str, int] = {}
+    for item in items:
+        n = depth.get(item.session_id, 0)
+        depth[item.session_id] = n + 1
+        if n == len(rounds):
+            rounds.append([])
+        rounds[n].append(item)
+    return rounds
+
+
+def write_batch(
+    db: Session, items: Sequence[PendingTransition]
+) -> Dict[int, TransitionResult]:
+    """
+    Aplica el lote en la transacción de `db` (sin commit). Devuelve el
+    resultado por índice de `items`; las sesiones inexistentes no aparecen.
+    """
+    results: Dict[int, TransitionResult] = {}
+    applied_events: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+    # (paquete, hora de creación) de las sesiones aprobadas en el lote
+    conversions: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+    outbox = []
+    index = {id(item): i for i, item in enumerate(items)}
+    since = lookup_since()
+
+    for round_items in _rounds(items):
+        pending = list(round_items)
+        # Primero sólo las particiones recientes; lo que no aparezca, en toda la tabla
+        for window in ((since, None) if since is not None else (None,)):
+            if not pending:
+                break
+            # created_at tipado: en SQLite el RETURNING de un text() lo da como str
+            stmt = text(batch_update_sql(len(pending), window)).columns(
+                created_at=TIMESTAMP
+            )
+            rows = db.execute(stmt, _batch_params(pending, window)).all()
+            by_session = {row.session_id: row for row in rows}
+            remaining = []
+            for item in pending:
+                row = by_session.get(item.session_id)
+                if row is None:
+                    remaining.append(item)
+                    continue
+                result = results[index[id(item)]] = TransitionResult(
+                    applied=True,
+                    session_id=item.session_id,
+                    status=item.target,
+                    email=row.email,
+                    credits=row.credits,
+                    payment_id=item.payment_id,
+                    version=row.version,
+                )
+                amount = item.amount
+                if amount is None:
+                    amount = price_for(row.credits) or 0
+                totals = applied_events[(item.target, row.credits)]
+                totals[0] += 1
+                totals[1] += amount
+                if item.target == APPROVED:
+                    created_hour = bucket_start(row.created_at, HOUR)
+                    totals = conversions[(row.credits, created_hour)]
+                    totals[0] += 1
+                    totals[1] += amount
+                if item.event is not None:
+                    event = add_transition_event(db, result, item.event)
+                    outbox.append((result, event))
+            pending = remaining
+
+        if pending:
+            # Sin transición: aviso repetido, fuera de orden o sesión inexistente
+            session_ids = {item.session_id for item in pending}
+            current = dict(
+                db.query(CreditTransaction.session_id, CreditTransaction.status)
+                .filter(CreditTransaction.session_id.in_(session_ids))
+                .all()
+            )
+            for item in pending:
+                if item.session_id in current:
+                    results[index[id(item)]] = TransitionResult(
+                        applied=False,
+                        session_id=item.session_id,
+                        status=current[item.session_id],
+                    )
+
+    # Deltas de estadísticas: uno por (estado, paquete) en vez de uno por fila,
+    # y las conversiones uno por (paquete, hora de creación de la sesión)
+    record_events(db, [
+        stats_delta(status, tier, count=count, amount=amount)
+        for (status, tier), (count, amount) in applied_events.items()
+    ] + [
+        stats_delta(CONVERTED, tier, at=created_hour, count=count, amount=amount)
+        for (tier, created_hour), (count, amount) in conversions.items()
+    ])
+    # Eventos de las transiciones aplicadas: se confirman con el lote
+    if outbox:
+        db.flush()
+        for result, event in outbox:
+            result.event_id = event.id
+    return results
+
+
+class GroupCommitWriter:
+    """
+    Hilo escritor que junta las transiciones encoladas y las escribe en lote.
+    Arranca con la primera transición; `close()` escribe lo pendiente y lo
+    detiene.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_delay_ms: float = GROUP_COMMIT_MAX_DELAY_MS,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ):
+        self.session_factory = session_factory
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[PendingTransition]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        session_id: str,
+        target: str,
+        payment_id: str,
+        event: Optional[EventBuilder] = None,
+        amount: Optional[float] = None,
+    ) -> Future:
+        if target not in ALLOWED_PREDECESSORS:
+            raise ValueError(f"Estado destino inválido: {target}")
+        self._ensure_started()
+        item = PendingTransition(session_id, target, payment_id, event, amount)
+        self._queue.put(item)
+        return item.future
+
+    def apply(
+        self,
+        session_id: str,
+        target: str,
+        payment_id: str,
+        event: Optional[EventBuilder] = None,
+        amount: Optional[float] = None,
+        timeout: float = GROUP_COMMIT_TIMEOUT,
+    ) -> TransitionResult:
+        """
+        Igual que apply_transition, pero escrito en el próximo lote. Vuelve
+        después del commit.
+
+        Si pasan `timeout` segundos y la transición sigue en la cola, se
+        cancela (el escritor la saltea) y se propaga TimeoutError: no se
+        escribió nada y el aviso se puede reintentar. Si ya está en un lote,
+        se espera el resultado de ese commit en lugar de abandonarla.
+        """
+        future = self.submit(session_id, target, payment_id, event, amount)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise
+            return future.result()
+
+    def flush(self, items: Sequence[PendingTransition]) -> None:
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            results = write_batch(db, items)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for item in items:
+                item.future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        batch_size_histogram.observe(len(items))
+        flush_duration.observe(time.perf_counter() - started)
+        for i, item in enumerate(items):
+            result = results.get(i)
+            if result is None:
+                item.future.set_exception(Exception("Sesión no encontrada en DB"))
+            else:
+                item.future.set_result(result)
+
+    def _collect(self) -> Optional[List[PendingTransition]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # stop(): se escribe lo juntado y se vuelve a marcar para salir
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # Las canceladas por timeout en apply() no se escriben; las demás
+            # ya no se pueden cancelar
+            batch = [
+                item for item in batch if item.future.set_running_or_notify_cancel()
+            ]
+            if batch:
+                self.flush(batch)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit", daemon=True
+                )
+                self._thread.start()
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    def close(self):
+        """
+        Escribe lo pendiente y detiene el hilo escritor.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    async def stop(self):
+        await asyncio.to_thread(self.close)
+
+
+transition_writer = GroupCommitWriter()
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.db.session import engine as default_engine
+from app.pubsub import pubsub_client
+
+load_dotenv()
+
+# Cada cuánto se refresca el snapshot (segundos)
+HEALTH_REFRESH_INTERVAL = float(os.getenv("HEALTH_REFRESH_INTERVAL", "5"))
+# Snapshot más viejo que esto se considera no confiable (segundos)
+HEALTH_MAX_STALENESS = float(
+    os.getenv("HEALTH_MAX_STALENESS", str(HEALTH_REFRESH_INTERVAL * 3))
+)
+# Fracción del pool en uso a partir de la cual dejamos de recibir tráfico
+POOL_SATURATION_THRESHOLD = float(os.getenv("POOL_SATURATION_THRESHOLD", "0.9"))
+# Eventos pendientes de confirmar por Pub/Sub tolerados
+PUBLISHER_BACKLOG_LIMIT = int(os.getenv("PUBLISHER_BACKLOG_LIMIT", "100"))
+
+
+class HealthMonitor:
+    """
+    Mantiene un snapshot del estado de las dependencias (DB, pool, Pub/Sub)
+    refrescado en segundo plano. Los probes sólo leen el snapshot, así que no
+    tocan la DB ni la red en el camino del request.
+    """
+
+    def __init__(
+        self,
+        engine: Engine = default_engine,
+        interval: float = HEALTH_REFRESH_INTERVAL,
+        max_staleness: float = HEALTH_MAX_STALENESS,
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self._snapshot: Dict[str, Any] = {
+            "ready": False,
+            "checked_at": None,
+            "checks": {},
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    # -----------------------------
+    # Checks
+    # -----------------------------
+    def _pool_check(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        if not isinstance(pool, QueuePool):
+            # SQLite y pools sin límite: no hay saturación que medir
+            return {"ok": True, "pool": type(pool).__name__}
+
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        saturation = checked_out / capacity if capacity else 0.0
+        return {
+            "ok": saturation < POOL_SATURATION_THRESHOLD,
+            "pool": type(pool).__name__,
+            "checked_out": checked_out,
+            "capacity": capacity,
+            "saturation": round(saturation, 3),
+        }
+
+    def _database_check(self, pool_ok: bool) -> Dict[str, Any]:
+        if not pool_ok:
+            # Con el pool agotado el checkout quedaría bloqueado hasta el timeout
+            return {"ok": False, "error": "pool saturado"}
+
+        started = time.perf_counter()
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        return {"ok": True, "latency_ms": latency_ms}
+
+    def _publisher_check(self) -> Dict[str, Any]:
+        backlog = pubsub_client.get_backlog()
+        return {"ok": backlog < PUBLISHER_BACKLOG_LIMIT, "backlog": backlog}
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Ejecuta todos los checks (bloqueante) y reemplaza el snapshot.
+        """
+        pool = self._pool_check()
+        checks = {
+            "database": self._database_check(pool["ok"]),
+            "pool": pool,
+            "publisher": self._publisher_check(),
+        }
+        self._snapshot = {
+            "ready": all(check["ok"] for check in checks.values()),
+            "checked_at": time.time(),
+            "checks": checks,
+        }
+        return self._snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Devuelve el último snapshot; si está vencido se reporta como no listo.
+        """
+        snapshot = dict(self._snapshot)
+        checked_at = snapshot["checked_at"]
+        age = time.time() - checked_at if checked_at else None
+        snapshot["age_seconds"] = round(age, 3) if age is not None else None
+        if age is None or age > self.max_staleness:
+            snapshot["ready"] = False
+        return snapshot
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Error refrescando health snapshot: {e}")
+
+    async def start(self):
+        await asyncio.to_thread(self.refresh)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+health_monitor = HealthMonitor()
@@ -0,0 +1,286 @@
+"""
+Cola de trabajos en la DB para repartir el procesamiento entre instancias.
+
+Cualquier réplica encola (`enqueue`) y los workers de todas las réplicas toman
+trabajos con SELECT ... FOR UPDATE SKIP LOCKED: dos workers nunca toman el
+mismo y ninguno espera al otro. Un trabajo tomado queda invisible durante
+JOB_VISIBILITY_TIMEOUT segundos; si el worker muere antes de terminarlo, otro
+lo retoma al vencer. Los que fallan se reintentan con backoff exponencial y,
+agotados los intentos, quedan en estado `dead` (dead-letter) para revisarlos.
+
+Concurrencia por cola (workers por proceso): JOB_QUEUE_CONCURRENCY="webhooks=8".
+"""
+
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.job import Job
+from app.services import json_codec
+from app.services.metrics import metrics
+
+load_dotenv()
+
+# Tiempo que un trabajo tomado queda invisible para otros workers (segundos)
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "8"))
+# Backoff entre reintentos: base * 2^(intento - 1), con jitter y tope (segundos)
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "2"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "600"))
+# Espera de un worker sin trabajo antes de volver a buscar (segundos)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_QUEUE_CONCURRENCY = os.getenv("JOB_QUEUE_CONCURRENCY", "")
+JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "4"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+jobs_finished = metrics.counter(
+    "jobs_finished_total",
+    "Trabajos terminados por cola y resultado (done, retry, dead)",
+)
+job_duration = metrics.histogram(
+    "job_duration_seconds",
+    "Duración de los trabajos por cola",
+)
+
+
+def parse_concurrency(value: str) -> Dict[str, int]:
+    """
+    "webhooks=8,emails=2" → {"webhooks": 8, "emails": 2}
+    """
+    result = {}
+    for pair in value.split(","):
+        if "=" in pair:
+            name, count = pair.split("=", 1)
+            result[name.strip()] = int(count)
+    return result
+
+
+def retry_delay(
+    attempts: int,
+    base: float = JOB_RETRY_BASE_DELAY,
+    cap: float = JOB_RETRY_MAX_DELAY,
+) -> float:
+    """
+    Espera antes del próximo intento tras `attempts` intentos fallidos, con
+    jitter para que los trabajos que fallaron juntos no reintenten juntos.
+    """
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def enqueue(
+    db: Session,
+    queue: str,
+    payload: Dict[str, Any],
+    run_at: Optional[datetime] = None,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> Job:
+    """
+    Agrega el trabajo a la sesión; se encola al hacer commit (junto con lo
+    que haya escrito quien llama).
+    """
+    job = Job(
+        queue=queue,
+        payload=json_codec.dumps_str(payload),
+        status=QUEUED,
+        max_attempts=max_attempts,
+        run_at=run_at or datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+
+def claim(
+    db: Session,
+    queue: str,
+    worker_id: str,
+    limit: int = 1,
+    visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+) -> List[Job]:
+    """
+    Toma hasta `limit` trabajos listos de la cola: pendientes con run_at
+    vencido o tomados por un worker cuyo visibility timeout ya pasó.
+
+    Un trabajo retomado que ya agotó sus intentos (el worker murió o se colgó
+    en cada uno) pasa a dead-letter en lugar de volver a correr.
+    """
+    now = datetime.utcnow()
+    jobs = list(db.scalars(
+        select(Job)
+        .where(
+            Job.queue == queue,
+            or_(
+                and_(Job.status == QUEUED, Job.run_at <= now),
+                and_(Job.status == RUNNING, Job.locked_until < now),
+            ),
+        )
+        .order_by(Job.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ))
+    claimed, dead = [], 0
+    for job in jobs:
+        if job.status == RUNNING and job.attempts >= job.max_attempts:
+            job.status = DEAD
+            job.locked_by = None
+            job.locked_until = None
+            job.finished_at = now
+            job.last_error = (
+                f"Visibility timeout vencido en el intento {job.attempts} "
+                f"de {job.max_attempts}"
+            )
+            dead += 1
+            continue
+        job.status = RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=visibility_timeout)
+        claimed.append(job)
+    db.commit()
+    if dead:
+        jobs_finished.inc(dead, queue=queue, result=DEAD)
+    return claimed
+
+
+def _finish(db: Session, job: Job, worker_id: str, **values) -> bool:
+    # Sólo si el trabajo sigue siendo de este worker: tras el visibility
+    # timeout puede haberlo tomado otro
+    updated = db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == RUNNING, Job.locked_by == worker_id)
+        .values(locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return bool(updated)
+
+
+def complete(db: Session, job: Job, worker_id: str) -> bool:
+    return _finish(
+        db, job, worker_id, status=DONE, finished_at=datetime.utcnow(), last_error=None
+    )
+
+
+def fail(db: Session, job: Job, worker_id: str, error: str) -> str:
+    """
+    Reprograma el trabajo con backoff o, sin intentos restantes, lo pasa a
+    dead-letter. Devuelve el resultado (retry o dead).
+    """
+    if job.attempts >= job.max_attempts:
+        _finish(
+            db,
+            job,
+            worker_id,
+            status=DEAD,
+            finished_at=datetime.utcnow(),
+            last_error=error,
+        )
+        return DEAD
+    run_at = datetime.utcnow() + timedelta(seconds=retry_delay(job.attempts))
+    _finish(db, job, worker_id, status=QUEUED, run_at=run_at, last_error=error)
+    return "retry"
+
+
+class JobRunner:
+    """
+    Handlers por cola y workers del proceso. Cada worker toma un trabajo por
+    vez; la cantidad de workers por cola sale de `concurrency`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        concurrency: Optional[Dict[str, int]] = None,
+        default_concurrency: int = JOB_DEFAULT_CONCURRENCY,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+    ):
+        self.session_factory = session_factory
+        if concurrency is None:
+            concurrency = parse_concurrency(JOB_QUEUE_CONCURRENCY)
+        self.concurrency = concurrency
+        self.default_concurrency = default_concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.handlers: Dict[str, Callable[[Session, Dict[str, Any]], Any]] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def register(
+        self, queue: str, handler: Callable[[Session, Dict[str, Any]], Any]
+    ) -> None:
+        self.handlers[queue] = handler
+
+    def run_once(self, queue: str, worker_id: str) -> bool:
+        """
+        Toma y ejecuta un trabajo de la cola. False si no había ninguno listo.
+        """
+        db = self.session_factory()
+        try:
+            jobs = claim(db, queue, worker_id, 1, self.visibility_timeout)
+            if not jobs:
+                return False
+            job = jobs[0]
+            started = time.perf_counter()
+            try:
+                self.handlers[queue](db, json_codec.loads(job.payload))
+            except Exception as e:
+                db.rollback()
+                result = fail(db, job, worker_id, str(e))
+                print(
+                    f"Trabajo {job.id} de {queue} falló "
+                    f"(intento {job.attempts}, {result}): {e}"
+                )
+            else:
+                result = DONE if complete(db, job, worker_id) else "lost"
+            jobs_finished.inc(queue=queue, result=result)
+            job_duration.observe(time.perf_counter() - started, queue=queue)
+            return True
+        finally:
+            db.close()
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def _work(self, queue: str, worker_id: str):
+        while True:
+            try:
+                found = await asyncio.to_thread(self.run_once, queue, worker_id)
+            except Exception as e:
+                print(f"Error en el worker {worker_id}: {e}")
+                found = False
+            if not found:
+                await asyncio.sleep(self.poll_interval)
+
+    async def start(self):
+        host = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        for queue in self.handlers:
+            for i in range(self.concurrency.get(queue, self.default_concurrency)):
+                worker = self._work(queue, f"{host}-{queue}-{i}")
+                self._tasks.append(asyncio.create_task(worker))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+job_runner = JobRunner()
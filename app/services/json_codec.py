@@ -0,0 +1,72 @@
+"""
+Codec JSON de la aplicación. Por defecto usa orjson; con JSON_CODEC=stdlib (o
+si orjson no está instalado) cae al módulo json de la librería estándar.
+
+Todas las rutas calientes (webhook, external_reference, eventos de Pub/Sub y
+respuestas GraphQL) pasan por aquí.
+"""
+
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Union
+
+from dotenv import load_dotenv
+from starlette.responses import JSONResponse
+
+load_dotenv()
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es dependencia de producción
+    orjson = None
+
+JSON_CODEC = os.getenv("JSON_CODEC", "orjson").lower()
+USE_ORJSON = orjson is not None and JSON_CODEC == "orjson"
+
+# orjson.JSONDecodeError hereda de json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+if USE_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+else:
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+class CodecJSONResponse(JSONResponse):
+    """
+    JSONResponse serializada con el codec de la aplicación (estilo ORJSONResponse).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,234 @@
+"""
+Verificación local de los tokens de autenticación (JWT) de createSession.
+
+La firma se valida contra el key set (JWKS) del servicio de auth, que se
+mantiene en memoria y se refresca en segundo plano: verificar un token no
+agrega ninguna llamada de red. Los claims ya verificados se guardan en un LRU
+indexado por el hash del token, así que el mismo token (reintentos del front,
+varias sesiones del mismo usuario) no vuelve a pagar la verificación RSA.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import jwt
+import requests
+from dotenv import load_dotenv
+
+from app.services.metrics import metrics
+from app.services.tokens import hash_token
+
+load_dotenv()
+
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "")
+AUTH_JWKS_URL = os.getenv(
+    "AUTH_JWKS_URL", f"{AUTH_SERVICE_URL.rstrip('/')}/.well-known/jwks.json"
+)
+AUTH_JWT_ISSUER = os.getenv("AUTH_JWT_ISSUER") or None
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE") or None
+AUTH_JWT_ALGORITHMS = [
+    a.strip()
+    for a in os.getenv("AUTH_JWT_ALGORITHMS", "RS256,ES256").split(",")
+    if a.strip()
+]
+# Tolerancia de reloj para exp/nbf/iat (segundos)
+AUTH_JWT_LEEWAY = float(os.getenv("AUTH_JWT_LEEWAY", "30"))
+# Cada cuánto se refresca el JWKS en segundo plano (segundos)
+JWKS_REFRESH_INTERVAL = float(os.getenv("JWKS_REFRESH_INTERVAL", "300"))
+# Mínimo entre refrescos forzados por un kid desconocido (segundos)
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", "30"))
+AUTH_CLAIMS_CACHE_SIZE = int(os.getenv("AUTH_CLAIMS_CACHE_SIZE", "10000"))
+
+jwks_refreshes = metrics.counter(
+    "auth_jwks_refresh_total",
+    "Refrescos del JWKS del servicio de auth",
+)
+claims_cache_lookups = metrics.counter(
+    "auth_claims_cache_lookups_total",
+    "Búsquedas en el LRU de claims verificados",
+)
+token_rejections = metrics.counter(
+    "auth_token_rejected_total",
+    "Tokens de autenticación rechazados",
+)
+
+
+class InvalidAuthToken(Exception):
+    pass
+
+
+def fetch_jwks(url: str = AUTH_JWKS_URL) -> Dict[str, Any]:
+    resp = requests.get(url, timeout=5)
+    resp.raise_for_status()
+    return resp.json()
+
+
+class JWKSCache:
+    """
+    Claves públicas del servicio de auth por `kid`. Se refrescan cada
+    `interval` segundos en segundo plano; un `kid` desconocido (rotación de
+    claves) fuerza un refresco, limitado a uno cada `min_interval` segundos.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Dict[str, Any]] = fetch_jwks,
+        interval: float = JWKS_REFRESH_INTERVAL,
+        min_interval: float = JWKS_MIN_REFRESH_INTERVAL,
+    ):
+        self._fetch = fetch
+        self.interval = interval
+        self.min_interval = min_interval
+        self._keys: Dict[Optional[str], jwt.PyJWK] = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, jwks: Dict[str, Any]) -> None:
+        keys = {}
+        for key in jwt.PyJWKSet.from_dict(jwks).keys:
+            keys[key.key_id] = key
+        self._keys = keys
+        self._refreshed_at = time.monotonic()
+
+    def refresh(self) -> bool:
+        try:
+            self.load(self._fetch())
+        except Exception as e:
+            jwks_refreshes.inc(result="error")
+            print(f"Error refrescando JWKS: {e}")
+            return False
+        jwks_refreshes.inc(result="ok")
+        return True
+
+    def get_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            # Un único key sin kid en el token: se usa ése
+            key = next(iter(self._keys.values()))
+        if key is not None:
+            return key
+
+        with self._lock:
+            stale = time.monotonic() - self._refreshed_at >= self.min_interval
+            if kid not in self._keys and stale:
+                self.refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            raise InvalidAuthToken(f"Clave desconocida: {kid}")
+        return key
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.refresh)
+
+    async def start(self):
+        await asyncio.to_thread(self.refresh)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class TokenVerifier:
+    """
+    Verifica firma, exp/nbf y (si están configurados) iss/aud. Los claims
+    válidos quedan en un LRU por hash del token hasta su `exp`.
+    """
+
+    def __init__(
+        self,
+        jwks: JWKSCache,
+        issuer: Optional[str] = AUTH_JWT_ISSUER,
+        audience: Optional[str] = AUTH_JWT_AUDIENCE,
+        algorithms=AUTH_JWT_ALGORITHMS,
+        leeway: float = AUTH_JWT_LEEWAY,
+        cache_size: int = AUTH_CLAIMS_CACHE_SIZE,
+    ):
+        self.jwks = jwks
+        self.issuer = issuer
+        self.audience = audience
+        self.algorithms = list(algorithms)
+        self.leeway = leeway
+        self.cache_size = cache_size
+        # hash del token → (exp, claims)
+        self._cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] + self.leeway < time.time():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[1]
+
+    def _store(self, key: bytes, claims: Dict[str, Any]) -> None:
+        with self._lock:
+            self._cache[key] = (float(claims["exp"]), claims)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        if not token:
+            token_rejections.inc(reason="missing")
+            raise InvalidAuthToken("Falta el token de autenticación")
+
+        key = hash_token(token)
+        claims = self._cached(key)
+        if claims is not None:
+            claims_cache_lookups.inc(result="hit")
+            return claims
+        claims_cache_lookups.inc(result="miss")
+
+        try:
+            header = jwt.get_unverified_header(token)
+            signing_key = self.jwks.get_key(header.get("kid"))
+            claims = jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=self.algorithms,
+                issuer=self.issuer,
+                audience=self.audience,
+                leeway=self.leeway,
+                options={
+                    "require": ["exp"],
+                    "verify_aud": self.audience is not None,
+                    "verify_iss": self.issuer is not None,
+                },
+            )
+        except InvalidAuthToken:
+            token_rejections.inc(reason="unknown_key")
+            raise
+        except jwt.PyJWTError as e:
+            token_rejections.inc(reason="invalid")
+            raise InvalidAuthToken(f"Token inválido: {e}") from e
+
+        self._store(key, claims)
+        return claims
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+jwks_cache = JWKSCache()
+token_verifier = TokenVerifier(jwks_cache)
@@ -0,0 +1,66 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List
+
+from app.services.metrics import metrics
+
+lane_waits = metrics.counter(
+    "webhook_lane_waits_total",
+    "Avisos que tuvieron que esperar a otro aviso del mismo pago",
+)
+lane_wait_seconds = metrics.histogram(
+    "webhook_lane_wait_seconds",
+    "Tiempo de espera en la cola del pago antes de procesar",
+)
+active_lanes = metrics.gauge(
+    "webhook_lanes_active",
+    "Pagos con avisos en proceso o en espera",
+)
+
+
+class KeyedLanes:
+    """
+    Serializa el trabajo por clave (p. ej. payment_id): los avisos de un mismo
+    pago se procesan de a uno y en orden de llegada (asyncio.Lock es FIFO),
+    mientras que pagos distintos corren en paralelo.
+
+    Sólo existen locks para las claves con trabajo en curso, así que la
+    memoria queda acotada por la concurrencia y no por la cantidad de pagos.
+    """
+
+    def __init__(self, name: str = "webhook"):
+        self.name = name
+        # clave → [lock, cantidad de usuarios (en proceso + esperando)]
+        self._lanes: Dict[Hashable, List] = {}
+
+    @asynccontextmanager
+    async def lane(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._lanes.get(key)
+        if entry is None:
+            entry = [asyncio.Lock(), 0]
+            self._lanes[key] = entry
+            active_lanes.set(len(self._lanes), lanes=self.name)
+        entry[1] += 1
+
+        lock: asyncio.Lock = entry[0]
+        contended = lock.locked()
+        started = time.perf_counter()
+        try:
+            async with lock:
+                if contended:
+                    lane_waits.inc(lanes=self.name)
+                    waited = time.perf_counter() - started
+                    lane_wait_seconds.observe(waited, lanes=self.name)
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._lanes[key]
+                active_lanes.set(len(self._lanes), lanes=self.name)
+
+    def __len__(self) -> int:
+        return len(self._lanes)
+
+
+payment_lanes = KeyedLanes()
@@ -0,0 +1,78 @@
+import os
+import time
+from typing import Any, Callable, Dict
+
+import requests
+from dotenv import load_dotenv
+
+from app.services.metrics import metrics
+from app.services.single_flight import SingleFlight
+
+load_dotenv()
+
+MP_ACCESS_TOKEN = os.getenv("MP_ACCESS_TOKEN")
+# Ventana para juntar avisos del mismo pago antes de consultar a MP (ms, 0 = sin
+# espera). Sin ella la llamada sale enseguida y los avisos casi nunca se juntan.
+PAYMENT_LOOKUP_DEBOUNCE_MS = float(os.getenv("PAYMENT_LOOKUP_DEBOUNCE_MS", "5"))
+# Timeout del GET a MercadoPago (segundos)
+MP_API_TIMEOUT = float(os.getenv("MP_API_TIMEOUT", "10"))
+
+lookup_requests = metrics.counter(
+    "mp_payment_lookup_requests_total",
+    "Consultas de pago pedidas (webhook y getTransaction)",
+)
+lookup_upstream_calls = metrics.counter(
+    "mp_payment_lookup_upstream_calls_total",
+    "GET /v1/payments/{id} realmente enviados a MercadoPago",
+)
+
+
+def fetch_payment(payment_id) -> Dict[str, Any]:
+    """
+    Consulta el pago en la API de MercadoPago.
+    """
+    resp = requests.get(
+        f"https://api.mercadopago.com/v1/payments/{payment_id}",
+        headers={"Authorization": f"Bearer {MP_ACCESS_TOKEN}"},
+        timeout=MP_API_TIMEOUT,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+class PaymentLookup:
+    """
+    Consultas a MercadoPago por payment_id con single-flight: los pedidos
+    concurrentes del mismo pago comparten una sola llamada. Con debounce, la
+    llamada espera unos milisegundos para sumar a los avisos que llegan en ráfaga.
+
+    Un aviso sólo se suma a una llamada que todavía no salió hacia MP: si
+    llega con el GET ya enviado puede traer un cambio de estado posterior, así
+    que hace su propia consulta. Los pedidos con `fresh=False` (los polls de
+    getTransaction) se suman también a una llamada ya enviada.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Dict[str, Any]] = fetch_payment,
+        debounce_ms: float = PAYMENT_LOOKUP_DEBOUNCE_MS,
+    ):
+        self._fetch = fetch
+        self.debounce_ms = debounce_ms
+        self._flight = SingleFlight()
+
+    def get(self, payment_id, fresh: bool = True) -> Dict[str, Any]:
+        key = str(payment_id)
+        lookup_requests.inc()
+
+        def _call(seal):
+            if self.debounce_ms > 0:
+                time.sleep(self.debounce_ms / 1000)
+            seal()
+            lookup_upstream_calls.inc()
+            return self._fetch(key)
+
+        return self._flight.do(key, _call, sealable=True, join_sealed=not fresh)
+
+
+payment_lookup = PaymentLookup()
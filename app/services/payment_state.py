@@ -0,0 +1,268 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import and_, exists, literal, null, or_, select, union_all, update
+from sqlalchemy.orm import Session
+
+from app.db.partitions import lookup_since
+from app.models.credit_transaction import CreditTransaction
+from app.services.event_outbox import add_event
+from app.services.payment_stats import (
+    CONVERTED,
+    record_events,
+    stats_delta,
+    utcnow,
+)
+
+# -----------------------------
+# Máquina de estados del pago
+# -----------------------------
+PENDING = "pending"
+APPROVED = "approved"
+FAILED = "failed"
+
+# Estados en los que termina un intento de pago (archivado).
+# Una sesión failed todavía puede pasar a approved con un pago nuevo.
+TERMINAL_STATES = frozenset({APPROVED, FAILED})
+
+# Estados sin salida: los streams de estado terminan acá. failed no, porque el
+# reintento con otro medio de pago todavía puede aprobar la sesión.
+FINAL_STATES = frozenset({APPROVED})
+
+# Estado destino → estados desde los que se puede llegar.
+ALLOWED_PREDECESSORS: Dict[str, Tuple[str, ...]] = {
+    PENDING: (PENDING,),
+    APPROVED: (PENDING, FAILED),
+    FAILED: (PENDING,),
+}
+
+# (estado actual, destino) que sólo aplican si cambia el payment_id:
+# pending → pending es el primer aviso del pago; failed → approved es un pago
+# nuevo sobre el mismo external_reference después de un rechazo (el checkout
+# de MP deja reintentar con otro medio). Un approved del pago rechazado no aplica.
+NEW_PAYMENT_TRANSITIONS = frozenset({(PENDING, PENDING), (FAILED, APPROVED)})
+
+# Evento de Pub/Sub de cada transición aplicada (va por el outbox)
+PAYMENT_STATUS_CHANGED = "payment_status_changed"
+
+# Estado de MercadoPago → estado de la transacción
+MP_STATUS_MAP: Dict[str, str] = {
+    "approved": APPROVED,
+    "rejected": FAILED,
+    "cancelled": FAILED,
+    "pending": PENDING,
+    "in_process": PENDING,
+    "in_mediation": PENDING,
+    "authorized": PENDING,
+}
+
+
+def target_status(mp_status: Optional[str]) -> Optional[str]:
+    """
+    Estado destino para un estado de MercadoPago, o None si no produce transición.
+    """
+    return MP_STATUS_MAP.get(mp_status or "")
+
+
+def can_transition(current: str, target: str, new_payment: bool = True) -> bool:
+    if current not in ALLOWED_PREDECESSORS.get(target, ()):
+        return False
+    return new_payment or (current, target) not in NEW_PAYMENT_TRANSITIONS
+
+
+@dataclass
+class TransitionResult:
+    applied: bool
+    session_id: str
+    status: str
+    email: Optional[str] = None
+    credits: Optional[int] = None
+    payment_id: Optional[str] = None
+    version: Optional[int] = None
+    # Id en event_outbox del evento de la transición (si se pidió uno)
+    event_id: Optional[int] = None
+
+
+# Payload del evento PAYMENT_STATUS_CHANGED para una transición aplicada
+EventBuilder = Callable[[TransitionResult], Dict[str, Any]]
+
+
+def add_transition_event(db: Session, result: TransitionResult, event: EventBuilder):
+    """
+    Agrega al outbox el evento de la transición (sin flush ni commit).
+    """
+    return add_event(
+        db, PAYMENT_STATUS_CHANGED, event(result), ordering_key=result.session_id
+    )
+
+
+def apply_transition(
+    db: Session,
+    session_id: str,
+    target: str,
+    payment_id: str,
+    event: Optional[EventBuilder] = None,
+    amount: Optional[float] = None,
+) -> TransitionResult:
+    """
+    Aplica la transición con un único UPDATE condicional:
+
+        UPDATE credit_transactions SET status, payment_id, version = version + 1
+        WHERE session_id = ? AND status IN (predecesores) RETURNING ...
+
+    Si el estado actual no permite la transición (o es un aviso repetido) el
+    UPDATE no toca filas y no se escribe nada. En Postgres el UPDATE va en un
+    CTE junto con la lectura del estado actual, así que una sola sentencia
+    distingue aplicada, duplicado y sesión inexistente.
+
+    La búsqueda se acota primero a las sesiones recientes (created_at dentro
+    de SESSION_LOOKUP_WINDOW_DAYS) para que Postgres descarte las particiones
+    viejas; sólo si ahí no aparece se busca en toda la tabla.
+
+    Con `event`, una transición aplicada inserta su evento en el outbox en la
+    misma transacción que el UPDATE (`event_id` del resultado). `amount` es lo
+    cobrado (en BASE_CURRENCY) para las estadísticas.
+    """
+    predecessors = ALLOWED_PREDECESSORS.get(target)
+    if not predecessors:
+        raise ValueError(f"Estado destino inválido: {target}")
+
+    since = lookup_since()
+    args = (db, session_id, target, payment_id, predecessors)
+    result = _apply(*args, since, event, amount)
+    if result is None and since is not None:
+        result = _apply(*args, None, event, amount)
+    if result is None:
+        raise Exception("Sesión no encontrada en DB")
+    return result
+
+
+def _apply(
+    db: Session,
+    session_id: str,
+    target: str,
+    payment_id: str,
+    predecessors: Tuple[str, ...],
+    since: Optional[datetime],
+    event: Optional[EventBuilder] = None,
+    amount: Optional[float] = None,
+) -> Optional[TransitionResult]:
+    session_filter = [CreditTransaction.session_id == session_id]
+    if since is not None:
+        session_filter.append(CreditTransaction.created_at >= since)
+
+    new_payment = [p for p in predecessors if (p, target) in NEW_PAYMENT_TRANSITIONS]
+    same_payment = [p for p in predecessors if p not in new_payment]
+    stmt = (
+        update(CreditTransaction)
+        .where(
+            *session_filter,
+            or_(
+                CreditTransaction.status.in_(same_payment),
+                and_(
+                    CreditTransaction.status.in_(new_payment),
+                    CreditTransaction.payment_id != payment_id,
+                ),
+            ),
+        )
+        .values(
+            status=target,
+            payment_id=payment_id,
+            version=CreditTransaction.version + 1,
+            status_changed_at=utcnow(),
+        )
+        .returning(
+            CreditTransaction.email,
+            CreditTransaction.credits,
+            CreditTransaction.version,
+            CreditTransaction.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.get_bind().dialect.name == "postgresql":
+        # WITH updated AS (UPDATE ... RETURNING ...)
+        # SELECT true, ... FROM updated
+        # UNION ALL
+        # SELECT false, ..., status FROM credit_transactions
+        #   WHERE ... AND NOT EXISTS (SELECT FROM updated)
+        # La segunda rama ve la fila como estaba antes de la sentencia: sólo
+        # se usa cuando el UPDATE no tocó nada, y entonces ése es el estado actual.
+        updated = stmt.cte("updated")
+        stmt = union_all(
+            select(
+                literal(True).label("applied"),
+                updated.c.email,
+                updated.c.credits,
+                updated.c.version,
+                updated.c.created_at,
+                literal(target).label("status"),
+            ),
+            select(
+                literal(False),
+                null(),
+                null(),
+                null(),
+                null(),
+                CreditTransaction.status,
+            ).where(*session_filter, ~exists(select(updated.c.version))),
+        )
+        row = db.execute(stmt).first()
+        applied = row is not None and row.applied
+    else:
+        # SQLite no admite UPDATE dentro de un CTE: el estado actual se lee aparte
+        row = db.execute(stmt).first()
+        applied = row is not None
+        if not applied:
+            row = db.query(CreditTransaction.status).filter(*session_filter).first()
+
+    if row is None:
+        result = None
+    elif not applied:
+        result = TransitionResult(
+            applied=False, session_id=session_id, status=row.status
+        )
+    else:
+        result = TransitionResult(
+            applied=True,
+            session_id=session_id,
+            status=target,
+            email=row.email,
+            credits=row.credits,
+            payment_id=payment_id,
+            version=row.version,
+        )
+        # Delta de estadísticas y evento en la misma transacción que la transición
+        deltas = [stats_delta(target, row.credits, amount=amount)]
+        if target == APPROVED:
+            # Conversión por cohorte: en el bucket en que se creó la sesión
+            deltas.append(
+                stats_delta(CONVERTED, row.credits, at=row.created_at, amount=amount)
+            )
+        record_events(db, deltas)
+        if event is not None:
+            outbox = add_transition_event(db, result, event)
+            db.flush()
+            result.event_id = outbox.id
+    db.commit()
+    return result
+
+
+def current_status(db: Session, session_id: str) -> Optional[TransitionResult]:
+    """
+    Estado actual de la sesión (sin transición), o None si no existe.
+    """
+    row = (
+        db.query(CreditTransaction.status, CreditTransaction.payment_id)
+        .filter(CreditTransaction.session_id == session_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return TransitionResult(
+        applied=False,
+        session_id=session_id,
+        status=row.status,
+        payment_id=row.payment_id,
+    )
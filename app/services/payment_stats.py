@@ -0,0 +1,293 @@
+"""
+Estadísticas de pago precalculadas por hora y por día.
+
+Cada evento (sesión creada, transición aplicada) se inserta como una fila en
+payment_stats_deltas dentro de la transacción que lo origina: un INSERT no
+comparte filas con otros requests, así que no hay locks sobre contadores
+calientes. StatsFolder pliega los deltas en payment_stats_rollups cada
+STATS_FOLD_INTERVAL segundos, fuera del camino del request; las consultas
+leen sólo los rollups y van hasta ese tiempo atrasadas.
+"""
+
+import asyncio
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.payment_stats_delta import PaymentStatsDelta
+from app.models.payment_stats_rollup import PaymentStatsRollup
+from app.services.fx_rates import FxRateUnavailable, rate_table
+from app.services.pricing import BASE_CURRENCY, price_for
+
+load_dotenv()
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = (HOUR, DAY)
+
+# Evento de sesión creada; los demás estados son los de payment_state
+CREATED = "created"
+# Sesión aprobada contada en el bucket de su creación (cohorte): la conversión
+# de un bucket es converted / created de las mismas sesiones
+CONVERTED = "converted"
+
+# Tope de buckets por consulta (p. ej. un año por hora son 8760)
+STATS_MAX_BUCKETS = int(os.getenv("STATS_MAX_BUCKETS", "2000"))
+# Cada cuánto se pliegan los deltas en los rollups (segundos)
+STATS_FOLD_INTERVAL = float(os.getenv("STATS_FOLD_INTERVAL", "10"))
+# Deltas plegados por transacción
+STATS_FOLD_BATCH = int(os.getenv("STATS_FOLD_BATCH", "5000"))
+
+_STEP = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == DAY:
+        ts = ts.replace(hour=0)
+    return ts
+
+
+def stats_delta(
+    status: str,
+    tier: int,
+    at: Optional[datetime] = None,
+    count: int = 1,
+    amount: Optional[float] = None,
+) -> Dict:
+    """
+    Fila de payment_stats_deltas para `count` eventos. `amount` es el total
+    cobrado por esos eventos (en BASE_CURRENCY); sin él se usa el precio
+    actual del paquete.
+    """
+    if amount is None:
+        amount = (price_for(tier) or 0) * count
+    return {
+        "at": at or utcnow(),
+        "tier": tier,
+        "status": status,
+        "count": count,
+        "amount": amount,
+    }
+
+
+def record_events(db: Session, deltas: Sequence[Dict]) -> None:
+    """
+    Anota los deltas (`stats_delta`) en un solo INSERT. No hace commit: va en
+    la misma transacción que la escritura que los origina, así que cuentan
+    sólo si esa escritura se confirma.
+    """
+    if deltas:
+        db.execute(insert(PaymentStatsDelta).values(list(deltas)))
+
+
+def record_event(
+    db: Session,
+    status: str,
+    tier: int,
+    at: Optional[datetime] = None,
+    count: int = 1,
+    amount: Optional[float] = None,
+) -> None:
+    """
+    Anota `count` eventos como un delta (un INSERT), igual que record_events.
+    """
+    record_events(db, [stats_delta(status, tier, at, count, amount)])
+
+
+def charged_amount(
+    amount: Optional[float], currency: Optional[str]
+) -> Optional[float]:
+    """
+    Monto cobrado por MercadoPago (transaction_amount, currency_id) en
+    BASE_CURRENCY, o None si no se puede convertir (record_event usa entonces
+    el precio del paquete).
+    """
+    if amount is None:
+        return None
+    currency = (currency or BASE_CURRENCY).upper()
+    if currency == BASE_CURRENCY:
+        return float(amount)
+    try:
+        return float(amount) / rate_table.rate(currency)
+    except (FxRateUnavailable, ValueError) as e:
+        print(f"Monto cobrado en {currency} sin conversión a {BASE_CURRENCY}: {e}")
+        return None
+
+
+def fold_deltas(db: Session, limit: int = STATS_FOLD_BATCH) -> int:
+    """
+    Suma hasta `limit` deltas a los rollups de hora y de día (un UPSERT por
+    bucket, paquete y estado) y los borra, en una transacción. En Postgres los
+    deltas se toman con FOR UPDATE SKIP LOCKED: varias instancias pueden
+    plegar a la vez sin contar dos veces. Devuelve cuántos deltas plegó.
+    """
+    deltas = db.execute(
+        select(PaymentStatsDelta)
+        .order_by(PaymentStatsDelta.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not deltas:
+        db.rollback()
+        return 0
+
+    totals: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0])
+    for delta in deltas:
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(delta.at, granularity)
+            total = totals[(granularity, bucket, delta.tier, delta.status)]
+            total[0] += delta.count
+            total[1] += delta.amount
+
+    postgres = db.get_bind().dialect.name == "postgresql"
+    insert_rollup = pg_insert if postgres else sqlite_insert
+    # En orden de clave: dos instancias plegando a la vez no se bloquean en cruz
+    stmt = insert_rollup(PaymentStatsRollup).values([
+        {
+            "granularity": granularity,
+            "bucket_start": bucket,
+            "tier": tier,
+            "status": status,
+            "count": count,
+            "amount": amount,
+        }
+        for (granularity, bucket, tier, status), (count, amount) in sorted(
+            totals.items()
+        )
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularity", "bucket_start", "tier", "status"],
+        set_={
+            "count": PaymentStatsRollup.count + stmt.excluded.count,
+            "amount": PaymentStatsRollup.amount + stmt.excluded.amount,
+        },
+    )
+    db.execute(stmt)
+    db.execute(
+        delete(PaymentStatsDelta).where(
+            PaymentStatsDelta.id.in_([d.id for d in deltas])
+        )
+    )
+    db.commit()
+    return len(deltas)
+
+
+@dataclass
+class StatsBucket:
+    bucket_start: datetime
+    tier: int
+    counts: Dict[str, int] = field(default_factory=dict)
+    amounts: Dict[str, float] = field(default_factory=dict)
+
+
+def query_stats(
+    db: Session, date_from: datetime, date_to: datetime, granularity: str
+) -> List[StatsBucket]:
+    """
+    Buckets en [date_from, date_to) agrupados por paquete. Lee sólo la tabla
+    de rollups: a lo sumo buckets × paquetes × estados filas. Los eventos
+    todavía no plegados (últimos STATS_FOLD_INTERVAL segundos) no cuentan.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidad inválida: {granularity}")
+    if date_to <= date_from:
+        raise ValueError("'to' debe ser posterior a 'from'")
+    if (date_to - date_from) / _STEP[granularity] > STATS_MAX_BUCKETS:
+        raise ValueError(
+            f"El rango supera {STATS_MAX_BUCKETS} buckets: usá una granularidad mayor"
+        )
+
+    rows = db.execute(
+        select(PaymentStatsRollup)
+        .where(
+            PaymentStatsRollup.granularity == granularity,
+            PaymentStatsRollup.bucket_start >= bucket_start(date_from, granularity),
+            PaymentStatsRollup.bucket_start < date_to,
+        )
+        .order_by(PaymentStatsRollup.bucket_start, PaymentStatsRollup.tier)
+    ).scalars()
+
+    buckets: Dict[tuple, StatsBucket] = {}
+    for row in rows:
+        key = (row.bucket_start, row.tier)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = StatsBucket(
+                bucket_start=row.bucket_start, tier=row.tier
+            )
+        bucket.counts[row.status] = row.count
+        bucket.amounts[row.status] = float(row.amount)
+    return list(buckets.values())
+
+
+class StatsFolder:
+    """
+    Pliega los deltas en los rollups cada `interval` segundos, en segundo
+    plano. Cada pasada pliega por lotes hasta vaciar la tabla de deltas.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = STATS_FOLD_INTERVAL,
+        batch: int = STATS_FOLD_BATCH,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch = batch
+        self._task: Optional[asyncio.Task] = None
+
+    def fold(self) -> int:
+        folded = 0
+        db = self.session_factory()
+        try:
+            while True:
+                n = fold_deltas(db, self.batch)
+                folded += n
+                if n < self.batch:
+                    return folded
+        except Exception as e:
+            db.rollback()
+            print(f"Error plegando estadísticas de pago: {e}")
+            return folded
+        finally:
+            db.close()
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.fold)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Lo pendiente queda plegado antes de apagar
+        await asyncio.to_thread(self.fold)
+
+
+stats_folder = StatsFolder()
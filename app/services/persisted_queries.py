@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Manifest con las operaciones del front (Apollo o {hash: query})
+PERSISTED_QUERIES_FILE = os.getenv("GRAPHQL_PERSISTED_QUERIES_FILE")
+# Modo allow-list: sólo se ejecutan operaciones registradas en el manifest
+PERSISTED_QUERIES_ONLY = os.getenv("GRAPHQL_PERSISTED_ONLY", "false").lower() == "true"
+# Máximo de queries registradas automáticamente por los clientes (APQ)
+PERSISTED_QUERIES_MAX_ENTRIES = int(os.getenv("GRAPHQL_PERSISTED_MAX_ENTRIES", "1000"))
+
+
+class PersistedQueryError(Exception):
+    def __init__(self, message: str, code: str):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path: str) -> Dict[str, str]:
+    """
+    Lee un manifest de Apollo (operations[].id/body) o un dict plano {hash: query}.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "operations" in data:
+        return {op["id"]: op["body"] for op in data["operations"]}
+    return dict(data)
+
+
+class PersistedQueryRegistry:
+    """
+    Registro hash → documento para Automatic Persisted Queries.
+
+    Las operaciones del manifest quedan fijas; las que registran los clientes
+    (sólo fuera del modo allow-list) entran en un LRU acotado.
+    """
+
+    def __init__(
+        self,
+        manifest: Optional[Dict[str, str]] = None,
+        allow_list_only: bool = False,
+        max_entries: int = PERSISTED_QUERIES_MAX_ENTRIES,
+    ):
+        self.allow_list_only = allow_list_only
+        self.max_entries = max_entries
+        self._pinned: Dict[str, str] = dict(manifest or {})
+        self._registered: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, sha256: str) -> Optional[str]:
+        query = self._pinned.get(sha256)
+        if query is not None:
+            return query
+        with self._lock:
+            query = self._registered.get(sha256)
+            if query is not None:
+                self._registered.move_to_end(sha256)
+            return query
+
+    def register(self, sha256: str, query: str):
+        with self._lock:
+            self._registered[sha256] = query
+            self._registered.move_to_end(sha256)
+            while len(self._registered) > self.max_entries:
+                self._registered.popitem(last=False)
+
+    def is_allowed(self, query: str) -> bool:
+        """
+        Si la operación se puede ejecutar: fuera del modo allow-list, todas;
+        en modo allow-list, sólo las del manifest.
+        """
+        return not self.allow_list_only or query_hash(query) in self._pinned
+
+    def resolve(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Completa `query` a partir de extensions.persistedQuery y aplica el
+        modo allow-list. Devuelve el mismo dict del request.
+        """
+        extensions = data.get("extensions") or {}
+        if isinstance(extensions, str):
+            extensions = json.loads(extensions)
+        if not isinstance(extensions, dict):
+            extensions = {}
+        persisted = extensions.get("persistedQuery")
+        query = data.get("query")
+
+        if persisted:
+            sha256 = persisted.get("sha256Hash")
+            if persisted.get("version", 1) != 1 or not sha256:
+                raise PersistedQueryError(
+                    "Unsupported persisted query version",
+                    "PERSISTED_QUERY_NOT_SUPPORTED",
+                )
+
+            if query is None:
+                query = self.lookup(sha256)
+                if query is None:
+                    raise PersistedQueryError(
+                        "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+                    )
+                data["query"] = query
+                return data
+
+            if query_hash(query) != sha256:
+                raise PersistedQueryError(
+                    "provided sha does not match query",
+                    "PERSISTED_QUERY_HASH_MISMATCH",
+                )
+            if not self.allow_list_only:
+                self.register(sha256, query)
+
+        if query is not None and not self.is_allowed(query):
+            raise PersistedQueryError(
+                "Operación no registrada", "PERSISTED_QUERY_NOT_ALLOWED"
+            )
+
+        return data
+
+
+persisted_query_registry = PersistedQueryRegistry(
+    manifest=load_manifest(PERSISTED_QUERIES_FILE) if PERSISTED_QUERIES_FILE else None,
+    allow_list_only=PERSISTED_QUERIES_ONLY,
+)
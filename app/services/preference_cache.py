@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.services.single_flight import SingleFlight
+
+load_dotenv()
+
+# Tiempo de reutilización de una preferencia ya creada (segundos)
+PREFERENCE_CACHE_TTL = float(os.getenv("PREFERENCE_CACHE_TTL", "600"))
+PREFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("PREFERENCE_CACHE_MAX_ENTRIES", "10000"))
+# Margen antes del vencimiento propio de la preferencia en MercadoPago (segundos)
+PREFERENCE_EXPIRY_MARGIN = 60
+
+
+def _normalise_reference(external_reference: Optional[str]) -> Any:
+    if external_reference is None:
+        return None
+    try:
+        return json.loads(external_reference)
+    except ValueError:
+        return external_reference.strip()
+
+
+def preference_key(
+    items: List[Dict[str, Any]], external_reference: Optional[str]
+) -> str:
+    """
+    Hash estable de (items, external_reference): el mismo checkout produce la
+    misma clave aunque cambien el orden de los items o el formato del JSON.
+    """
+    normalised_items = sorted(
+        (
+            {
+                "title": str(item["title"]).strip(),
+                "quantity": int(item["quantity"]),
+                "unit_price": round(float(item["unit_price"]), 2),
+                "currency_id": (item.get("currency_id") or "").upper() or None,
+            }
+            for item in items
+        ),
+        key=lambda item: json.dumps(item, sort_keys=True),
+    )
+    canonical = json.dumps(
+        {
+            "items": normalised_items,
+            "external_reference": _normalise_reference(external_reference),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _expires_at(response: Dict[str, Any], ttl: float) -> float:
+    expires_at = time.time() + ttl
+    expiration = response.get("response", {}).get("expiration_date_to")
+    if expiration:
+        try:
+            mp_expiry = datetime.fromisoformat(expiration).timestamp()
+            expires_at = min(expires_at, mp_expiry - PREFERENCE_EXPIRY_MARGIN)
+        except ValueError:
+            pass
+    return expires_at
+
+
+class PreferenceCache:
+    """
+    Cache en memoria de preferencias de MercadoPago. Sólo guarda respuestas
+    exitosas y nunca más allá del vencimiento de la preferencia.
+    """
+
+    def __init__(
+        self,
+        ttl: float = PREFERENCE_CACHE_TTL,
+        max_entries: int = PREFERENCE_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key: str, response: Dict[str, Any]):
+        expires_at = _expires_at(response, self.ttl)
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (expires_at, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_create(
+        self, key: str, create: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Devuelve la preferencia cacheada o la crea; requests idénticos
+        concurrentes comparten una única llamada a MercadoPago.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        def _create():
+            # Otro hilo pudo haberla creado mientras esperábamos el turno
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            response = create()
+            created = response.get("status") in (200, 201)
+            if created and response.get("response", {}).get("init_point"):
+                self.put(key, response)
+            return response
+
+        return self._flight.do(key, _create)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+preference_cache = PreferenceCache()
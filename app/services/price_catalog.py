@@ -0,0 +1,61 @@
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Tuple
+
+from app.services.fx_rates import RateTable, rate_table
+from app.services.pricing import BASE_CURRENCY, PRICE_TABLE
+
+# Decimales por moneda (ISO 4217); el resto usa 2
+CURRENCY_DECIMALS: Dict[str, int] = {
+    "CLP": 0,
+    "COP": 0,
+    "JPY": 0,
+    "KRW": 0,
+    "PYG": 0,
+}
+
+
+def round_amount(amount: Decimal, currency: str) -> float:
+    exponent = Decimal(1).scaleb(-CURRENCY_DECIMALS.get(currency, 2))
+    return float(amount.quantize(exponent, rounding=ROUND_HALF_UP))
+
+
+class PriceCatalog:
+    """
+    Precios de todos los paquetes por moneda, calculados una vez por versión
+    de la tabla de tipos de cambio y redondeados según la moneda.
+    """
+
+    def __init__(self, rates: RateTable = rate_table):
+        self.rates = rates
+        # moneda → (versión de la tabla, {créditos: precio})
+        self._tables: Dict[str, Tuple[int, Dict[int, float]]] = {}
+
+    def prices(self, currency: str) -> Dict[int, float]:
+        currency = currency.upper()
+        if currency == BASE_CURRENCY:
+            # La moneda base no depende de que haya tipos de cambio
+            return dict(PRICE_TABLE)
+
+        snapshot = self.rates.snapshot()
+        cached = self._tables.get(currency)
+        if cached is not None and cached[0] == snapshot.version:
+            return cached[1]
+
+        rate = snapshot.rates.get(currency)
+        if rate is None:
+            raise ValueError(f"Moneda no soportada: {currency}")
+        table = {
+            credits: round_amount(Decimal(str(cost)) * Decimal(str(rate)), currency)
+            for credits, cost in PRICE_TABLE.items()
+        }
+        self._tables[currency] = (snapshot.version, table)
+        return table
+
+    def price(self, credits: int, currency: str) -> float:
+        table = self.prices(currency)
+        if credits not in table:
+            raise ValueError("Cantidad de créditos no válida")
+        return table[credits]
+
+
+price_catalog = PriceCatalog()
@@ -0,0 +1,15 @@
+from typing import Dict, Optional
+
+BASE_CURRENCY = "USD"
+
+# Paquetes de créditos → precio en BASE_CURRENCY. El backfill de estadísticas
+# (migrations/012_payment_stats_backfill.sql) repite estos precios.
+PRICE_TABLE: Dict[int, float] = {
+    250: 5.0,    # 250 créditos → 5 USD
+    750: 12.0,   # 750 créditos → 12 USD
+    1500: 20.0,  # 1500 créditos → 20 USD
+}
+
+
+def price_for(credits: int) -> Optional[float]:
+    return PRICE_TABLE.get(credits)
@@ -0,0 +1,191 @@
+"""
+Profiling por muestreo de requests en producción, bajo demanda.
+
+Un request se perfila si trae el header `X-Profile: <PROFILER_ADMIN_TOKEN>` o,
+sin header, con probabilidad PROFILE_SAMPLE_RATE. El perfil (pyinstrument,
+una muestra del stack cada PROFILER_INTERVAL segundos) queda en un ring
+buffer en memoria de PROFILE_BUFFER_SIZE entradas y se descarga desde
+/admin/profiles como árbol de llamadas (text), HTML o speedscope (flame graph).
+
+Sin header y con PROFILE_SAMPLE_RATE=0 el costo por request es buscar un
+header. pyinstrument sigue la tarea del request en el event loop: el trabajo
+que corre en el threadpool (run_in_threadpool) aparece como tiempo en await.
+"""
+
+import itertools
+import os
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.services.metrics import metrics
+
+load_dotenv()
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer, SpeedscopeRenderer
+except ImportError:  # pragma: no cover - pyinstrument es dependencia de producción
+    Profiler = None
+
+PROFILER_ADMIN_TOKEN = os.getenv("PROFILER_ADMIN_TOKEN")
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "x-profile").lower()
+# Fracción de requests perfilados sin header (0 = sólo bajo demanda)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Intervalo de muestreo (segundos)
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.001"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+# Requests perfilados a la vez por muestreo; los pedidos por header no cuentan
+PROFILE_MAX_SAMPLED = int(os.getenv("PROFILE_MAX_SAMPLED", "2"))
+
+profiles_captured = metrics.counter(
+    "profiles_captured_total",
+    "Requests perfilados por origen (header o sample)",
+)
+
+
+@dataclass
+class ProfileRecord:
+    id: int
+    method: str
+    path: str
+    trigger: str  # header, sample
+    started_at: datetime
+    duration: float
+    status_code: Optional[int]
+    session: Any  # pyinstrument.session.Session
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "status_code": self.status_code,
+        }
+
+    def render(self, format: str = "html") -> str:
+        if format == "text":
+            renderer = ConsoleRenderer(unicode=True, color=False, show_all=False)
+            return renderer.render(self.session)
+        if format == "speedscope":
+            return SpeedscopeRenderer().render(self.session)
+        return HTMLRenderer().render(self.session)
+
+
+class ProfileStore:
+    """
+    Ring buffer de los últimos perfiles: al llenarse se descarta el más viejo.
+    """
+
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE):
+        self._records: "deque[ProfileRecord]" = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, **fields) -> ProfileRecord:
+        with self._lock:
+            record = ProfileRecord(id=next(self._ids), **fields)
+            self._records.append(record)
+        return record
+
+    def list(self) -> List[ProfileRecord]:
+        with self._lock:
+            return list(reversed(self._records))
+
+    def get(self, profile_id: int) -> Optional[ProfileRecord]:
+        with self._lock:
+            return next((r for r in self._records if r.id == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI que perfila los requests elegidos y guarda el resultado
+    en `store`. Los demás pasan directo.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: Optional[ProfileStore] = None,
+        token: Optional[str] = PROFILER_ADMIN_TOKEN,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval: float = PROFILER_INTERVAL,
+        max_sampled: int = PROFILE_MAX_SAMPLED,
+    ):
+        self.app = app
+        self.store = store if store is not None else profile_store
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_sampled = max_sampled
+        self._sampled = 0
+        self._lock = threading.Lock()
+
+    def _trigger(self, scope) -> Optional[str]:
+        if Profiler is None:
+            return None
+        if self.token:
+            for name, value in scope.get("headers", ()):
+                if name == PROFILE_HEADER.encode() and secrets.compare_digest(
+                    value, self.token.encode()
+                ):
+                    return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            with self._lock:
+                if self._sampled < self.max_sampled:
+                    self._sampled += 1
+                    return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            if trigger == "sample":
+                with self._lock:
+                    self._sampled -= 1
+            self.store.add(
+                method=scope.get("method", ""),
+                path=scope.get("path", ""),
+                trigger=trigger,
+                started_at=started_at,
+                duration=time.perf_counter() - started,
+                status_code=status_code,
+                session=session,
+            )
+            profiles_captured.inc(trigger=trigger)
+
+
+profile_store = ProfileStore()
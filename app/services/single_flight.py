@@ -0,0 +1,70 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+        # Mientras está abierta, los pedidos nuevos de la clave se suman a esta llamada
+        self.open = True
+
+
+class SingleFlight:
+    """
+    Coalesce llamadas concurrentes con la misma clave: el primer hilo ejecuta
+    la función y el resto espera y recibe el mismo resultado (o excepción).
+
+    Con `sealable=True` la función recibe `seal()`: desde que la llama, los
+    pedidos nuevos de la clave ya no se suman a esta llamada sino que arrancan
+    otra. Sirve cuando el resultado puede quedar viejo apenas sale el pedido.
+    Con `join_sealed=True` el pedido se suma igual a la llamada en curso (a
+    quien le alcanza un resultado que ya estaba en camino).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[..., Any],
+        sealable: bool = False,
+        join_sealed: bool = False,
+    ) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None or not (call.open or join_sealed)
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        def seal():
+            with self._lock:
+                call.open = False
+
+        try:
+            call.result = fn(seal) if sealable else fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,205 @@
+"""
+Fan-out en proceso de los cambios de estado de pago hacia los clientes
+suscriptos (subscription GraphQL `paymentStatus`, SSE y el long-poll
+`awaitSessionStatus`). Los avisos de otras instancias llegan vía
+status_notify.
+
+Cada suscriptor tiene una cola acotada: si no consume, se descartan los
+eventos más viejos (sólo importa el último estado). La cantidad total de
+suscriptores también está acotada y cada stream se corta tras
+STATUS_IDLE_TIMEOUT segundos sin eventos o al llegar a un estado final
+(approved; un failed sigue abierto por si el reintento aprueba la sesión).
+"""
+
+import asyncio
+import os
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from app.services.metrics import metrics
+from app.services.payment_state import FINAL_STATES
+
+load_dotenv()
+
+STATUS_MAX_SUBSCRIBERS = int(os.getenv("STATUS_MAX_SUBSCRIBERS", "10000"))
+STATUS_QUEUE_SIZE = int(os.getenv("STATUS_QUEUE_SIZE", "8"))
+# Sin eventos durante este tiempo el stream se cierra (segundos)
+STATUS_IDLE_TIMEOUT = float(os.getenv("STATUS_IDLE_TIMEOUT", "600"))
+# Cada cuánto el stream emite un latido para proxies y balanceadores (segundos)
+STATUS_HEARTBEAT_INTERVAL = float(os.getenv("STATUS_HEARTBEAT_INTERVAL", "15"))
+# Espera máxima de un long-poll awaitSessionStatus (segundos)
+AWAIT_STATUS_MAX_TIMEOUT = float(os.getenv("AWAIT_STATUS_MAX_TIMEOUT", "30"))
+
+subscribers_gauge = metrics.gauge(
+    "payment_status_subscribers",
+    "Clientes suscriptos a cambios de estado de pago",
+)
+events_delivered = metrics.counter(
+    "payment_status_events_delivered_total",
+    "Eventos de estado entregados a suscriptores",
+)
+events_dropped = metrics.counter(
+    "payment_status_events_dropped_total",
+    "Eventos descartados por colas de suscriptores llenas",
+)
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def status_event(
+    session_id: str, status: str, payment_id: Optional[str] = None
+) -> dict:
+    """
+    Evento que ven los clientes: sólo el estado, sin email ni créditos.
+    """
+    return {
+        "session_id": session_id,
+        "status": status,
+        "payment_id": payment_id or None,
+    }
+
+
+class Subscription:
+    def __init__(self, session_id: str, queue_size: int):
+        self.session_id = session_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event: dict) -> None:
+        # Corre en el loop del suscriptor
+        if self.queue.full():
+            self.queue.get_nowait()
+            events_dropped.inc()
+        self.queue.put_nowait(event)
+        events_delivered.inc()
+
+
+class StatusBroker:
+    def __init__(
+        self,
+        max_subscribers: int = STATUS_MAX_SUBSCRIBERS,
+        queue_size: int = STATUS_QUEUE_SIZE,
+    ):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subs: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(self, session_id: str) -> Subscription:
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers("Demasiados suscriptores")
+            sub = Subscription(session_id, self.queue_size)
+            self._subs.setdefault(session_id, set()).add(sub)
+            self._count += 1
+        subscribers_gauge.set(self._count)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.session_id)
+            if subs is None or sub not in subs:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.session_id]
+            self._count -= 1
+        subscribers_gauge.set(self._count)
+
+    def publish(self, session_id: str, event: dict) -> int:
+        """
+        Entrega el evento a los suscriptores de la sesión. Se puede llamar
+        desde cualquier hilo (el webhook procesa en el threadpool). Devuelve
+        a cuántos suscriptores se mandó.
+        """
+        with self._lock:
+            subs = list(self._subs.get(session_id, ()))
+        for sub in subs:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is sub.loop:
+                sub.push(event)
+                continue
+            try:
+                sub.loop.call_soon_threadsafe(sub.push, event)
+            except RuntimeError:
+                # Loop cerrado: el suscriptor ya no existe
+                self.unsubscribe(sub)
+        return len(subs)
+
+    async def stream(
+        self,
+        session_id: str,
+        load_initial: Optional[Callable[[], Awaitable[Optional[dict]]]] = None,
+        idle_timeout: float = STATUS_IDLE_TIMEOUT,
+        heartbeat: Optional[float] = None,
+    ) -> AsyncIterator[Optional[dict]]:
+        """
+        Eventos de la sesión, empezando por el estado actual (`load_initial`,
+        que se lee después de suscribirse para no perder un cambio que llegue
+        en el medio). Con `heartbeat` emite None cada tantos segundos sin
+        eventos. Termina con un estado final o tras `idle_timeout` sin eventos.
+        """
+        sub = self.subscribe(session_id)
+        try:
+            initial = await load_initial() if load_initial else None
+            if initial is not None:
+                yield initial
+                if initial.get("status") in FINAL_STATES:
+                    return
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + idle_timeout
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                wait = min(remaining, heartbeat) if heartbeat else remaining
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=wait)
+                except asyncio.TimeoutError:
+                    if heartbeat and deadline - loop.time() > 0:
+                        yield None
+                    continue
+
+                deadline = loop.time() + idle_timeout
+                yield event
+                if event.get("status") in FINAL_STATES:
+                    return
+        finally:
+            self.unsubscribe(sub)
+
+    async def wait(
+        self,
+        session_id: str,
+        load_initial: Callable[[], Awaitable[Optional[dict]]],
+        timeout: float,
+    ) -> Optional[dict]:
+        """
+        Long-poll: devuelve el próximo evento de la sesión apenas llega, o el
+        estado actual si ya es final o si pasan `timeout` segundos sin cambios.
+        """
+        sub = self.subscribe(session_id)
+        try:
+            current = await load_initial()
+            if current is None or current.get("status") in FINAL_STATES:
+                return current
+            try:
+                return await asyncio.wait_for(sub.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return current
+        finally:
+            self.unsubscribe(sub)
+
+
+status_broker = StatusBroker()
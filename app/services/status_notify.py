@@ -0,0 +1,178 @@
+"""
+Difusión de los cambios de estado de pago entre instancias.
+
+Con varias réplicas del servicio, el webhook suele llegar a una instancia
+distinta de la que tiene al cliente esperando (subscription, SSE o
+awaitSessionStatus). Cada cambio aplicado se difunde con NOTIFY de Postgres en
+el canal STATUS_NOTIFY_CHANNEL; cada proceso mantiene una única conexión con
+LISTEN que reparte los avisos a sus suscriptores locales vía status_broker.
+
+Backends (STATUS_NOTIFY_BACKEND):
+    postgres   NOTIFY/LISTEN (default con DATABASE_URL de Postgres)
+    local      entrega directa en el proceso (SQLite, desarrollo y tests)
+"""
+
+import asyncio
+import os
+import select
+import threading
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.db.session import engine
+from app.services import json_codec
+from app.services.metrics import metrics
+from app.services.status_broker import StatusBroker, status_broker
+
+load_dotenv()
+
+STATUS_NOTIFY_BACKEND = os.getenv("STATUS_NOTIFY_BACKEND", "auto").lower()
+STATUS_NOTIFY_CHANNEL = os.getenv("STATUS_NOTIFY_CHANNEL", "payment_status")
+# Espera máxima de cada select() del listener; acota cuánto tarda en parar (segundos)
+STATUS_LISTEN_POLL_INTERVAL = float(os.getenv("STATUS_LISTEN_POLL_INTERVAL", "1"))
+# Pausa antes de reconectar el listener tras un error (segundos)
+STATUS_LISTEN_RECONNECT_DELAY = float(os.getenv("STATUS_LISTEN_RECONNECT_DELAY", "2"))
+
+notifications_sent = metrics.counter(
+    "payment_status_notify_total",
+    "Cambios de estado difundidos a otras instancias",
+)
+notifications_received = metrics.counter(
+    "payment_status_listen_received_total",
+    "Avisos de cambio de estado recibidos por el listener",
+)
+listener_connected = metrics.gauge(
+    "payment_status_listener_connected",
+    "1 si la conexión LISTEN del proceso está activa",
+)
+
+
+class LocalNotifier:
+    """
+    Sin Postgres: el aviso se entrega directamente a los suscriptores del
+    proceso. No cruza instancias.
+    """
+
+    def __init__(self, broker: StatusBroker):
+        self.broker = broker
+
+    def notify(self, db: Session, event: dict) -> None:
+        self.broker.publish(event["session_id"], event)
+        notifications_sent.inc(backend="local")
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class PostgresNotifier:
+    """
+    NOTIFY al aplicar un cambio y una conexión dedicada con LISTEN por
+    proceso. La conexión se reabre sola si se cae; los avisos emitidos
+    mientras tanto se pierden (los clientes lo cubren con el estado inicial
+    que leen al suscribirse y con el timeout del long-poll).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        broker: StatusBroker,
+        channel: str = STATUS_NOTIFY_CHANNEL,
+        poll_interval: float = STATUS_LISTEN_POLL_INTERVAL,
+        reconnect_delay: float = STATUS_LISTEN_RECONNECT_DELAY,
+    ):
+        self.engine = engine
+        self.broker = broker
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self, db: Session, event: dict) -> None:
+        # Se llama con la transición ya commiteada: el aviso sale en su propia
+        # transacción y nadie puede leer un estado que todavía no existe.
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": self.channel, "payload": json_codec.dumps_str(event)},
+        )
+        db.commit()
+        notifications_sent.inc(backend="postgres")
+
+    def dispatch(self, payload: str) -> None:
+        try:
+            event = json_codec.loads(payload)
+            session_id = event["session_id"]
+        except Exception as e:
+            print(f"Aviso de estado inválido: {payload!r} ({e})")
+            return
+        notifications_received.inc()
+        self.broker.publish(session_id, event)
+
+    def _connect(self):
+        # Conexión fuera del pool: queda tomada mientras viva el listener
+        fairy = self.engine.raw_connection()
+        fairy.detach()
+        conn = fairy.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                listener_connected.set(1)
+                while not self._stopping.is_set():
+                    if not select.select([conn], [], [], self.poll_interval)[0]:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Error en el listener de estados: {e}")
+            finally:
+                listener_connected.set(0)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stopping.wait(self.reconnect_delay)
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    async def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._listen, name="status-listener", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        if self._thread:
+            self._stopping.set()
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+
+def create_notifier(
+    backend: str = STATUS_NOTIFY_BACKEND, broker: StatusBroker = status_broker
+):
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "local"
+    if backend == "postgres":
+        return PostgresNotifier(engine, broker)
+    return LocalNotifier(broker)
+
+
+status_notifier = create_notifier()
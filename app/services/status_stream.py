@@ -0,0 +1,59 @@
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.db.session import SessionLocal
+from app.services.payment_state import current_status
+from app.services.status_broker import (
+    STATUS_IDLE_TIMEOUT,
+    status_broker,
+    status_event,
+)
+
+
+class SessionNotFound(Exception):
+    pass
+
+
+def load_status_event(session_id: str) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        current = current_status(db, session_id)
+    finally:
+        db.close()
+    if current is None:
+        return None
+    return status_event(session_id, current.status, current.payment_id)
+
+
+async def _load_initial(session_id: str) -> dict:
+    event = await run_in_threadpool(load_status_event, session_id)
+    if event is None:
+        raise SessionNotFound("Sesión no encontrada")
+    return event
+
+
+async def payment_status_stream(
+    session_id: str,
+    idle_timeout: float = STATUS_IDLE_TIMEOUT,
+    heartbeat: Optional[float] = None,
+) -> AsyncIterator[Optional[dict]]:
+    """
+    Estado actual de la sesión y luego cada cambio que aplique el webhook.
+    """
+
+    events = status_broker.stream(
+        session_id, lambda: _load_initial(session_id), idle_timeout, heartbeat
+    )
+    async for event in events:
+        yield event
+
+
+async def await_status_change(session_id: str, timeout: float) -> dict:
+    """
+    Espera hasta `timeout` segundos un cambio de estado de la sesión y lo
+    devuelve; si no hay cambios (o ya es final) devuelve el estado actual.
+    """
+    return await status_broker.wait(
+        session_id, lambda: _load_initial(session_id), timeout
+    )
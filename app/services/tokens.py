@@ -0,0 +1,10 @@
+import hashlib
+
+
+def hash_token(token: str) -> bytes:
+    """
+    SHA-256 del token de autenticación (32 bytes fijos). Los JWT tienen
+    entropía de sobra, así que no hace falta sal: el mismo token da siempre el
+    mismo hash y sirve como clave de búsqueda y de caché.
+    """
+    return hashlib.sha256(token.encode("utf-8")).digest()
@@ -0,0 +1,249 @@
+"""
+Inbox durable de los avisos de MercadoPago y reprocesamiento (replay).
+
+El webhook guarda el cuerpo crudo de cada aviso antes de procesarlo y después
+anota el resultado. Si un bug o una caída rompió el procesamiento, los avisos
+de un rango se vuelven a pasar por la misma lógica del webhook
+(process_payment_notification) con replay_webhooks.py.
+
+Con WEBHOOK_PROCESSING=queue el webhook sólo guarda el aviso y encola un
+trabajo en la cola "webhooks" (job_queue); lo procesa el worker de cualquier
+instancia que lo tome.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.webhook_inbox import WebhookInbox
+from app.services import json_codec
+from app.services.event_outbox import OutboxRelay
+from app.services.job_queue import enqueue, job_runner
+from app.services.metrics import metrics
+from app.services.webhook_service import process_payment_notification
+
+load_dotenv()
+
+# Pagos reprocesados en paralelo
+WEBHOOK_REPLAY_CONCURRENCY = int(os.getenv("WEBHOOK_REPLAY_CONCURRENCY", "16"))
+# Pagos por segundo como máximo (consultas a MercadoPago); 0 = sin límite
+WEBHOOK_REPLAY_RATE = float(os.getenv("WEBHOOK_REPLAY_RATE", "50"))
+# inline: se procesa en el request; queue: se encola y lo procesa un worker
+WEBHOOK_PROCESSING = os.getenv("WEBHOOK_PROCESSING", "inline").lower()
+WEBHOOK_QUEUE = "webhooks"
+
+RECEIVED = "received"
+PROCESSED = "processed"  # la transición se aplicó
+SKIPPED = "skipped"      # pago sin cambios (aviso repetido o fuera de orden)
+IGNORED = "ignored"      # aviso que no es de un pago
+ERROR = "error"
+
+inbox_outcomes = metrics.counter(
+    "webhook_inbox_outcomes_total",
+    "Avisos del inbox por resultado de procesamiento",
+)
+
+
+def parse_notification(body: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (topic, payment_id) del aviso; None en lo que no se pueda leer.
+    """
+    try:
+        data = json_codec.loads(body)
+    except Exception:
+        return None, None
+    if not isinstance(data, dict):
+        return None, None
+    topic = data.get("type")
+    resource = data.get("data")
+    payment_id = resource.get("id") if isinstance(resource, dict) else None
+    return topic, str(payment_id) if payment_id is not None else None
+
+
+def record_notification(db: Session, body: bytes, queue_job: bool = False) -> int:
+    """
+    Guarda el aviso tal como llegó (commit inmediato) y devuelve su id. Con
+    `queue_job` encola su procesamiento en la misma transacción.
+    """
+    topic, payment_id = parse_notification(body)
+    entry = WebhookInbox(
+        topic=topic, payment_id=payment_id, body=body, outcome=RECEIVED
+    )
+    db.add(entry)
+    if queue_job:
+        db.flush()
+        enqueue(db, WEBHOOK_QUEUE, {"inbox_id": entry.id})
+    db.commit()
+    return entry.id
+
+
+def outcome_for(result) -> str:
+    if result is None or not result.applied:
+        return SKIPPED
+    return PROCESSED
+
+
+def record_outcome(
+    db: Session,
+    entry_ids: Sequence[int],
+    outcome: str,
+    detail: Optional[str] = None,
+) -> None:
+    # Lo que haya quedado a medias tras un error de procesamiento se descarta
+    db.rollback()
+    db.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.id.in_(list(entry_ids)))
+        .values(
+            outcome=outcome,
+            detail=detail,
+            attempts=WebhookInbox.attempts + 1,
+            processed_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+    inbox_outcomes.inc(len(entry_ids), outcome=outcome)
+
+
+def process_entry(db: Session, payload: Dict[str, Any]) -> None:
+    """
+    Handler de la cola "webhooks": procesa el aviso del inbox. Si falla, el
+    error queda anotado y la cola lo reintenta. Si falló después del commit
+    de la transición, el reintento la ve aplicada (SKIPPED) y el evento lo
+    publica el relay del outbox, donde quedó junto con la transición.
+    """
+    entry = db.get(WebhookInbox, payload["inbox_id"])
+    if entry is None:
+        return
+    entry_id, topic, payment_id = entry.id, entry.topic, entry.payment_id
+    if topic != "payment" or not payment_id:
+        record_outcome(db, [entry_id], IGNORED)
+        return
+    try:
+        result = process_payment_notification(db, payment_id)
+    except Exception as e:
+        record_outcome(db, [entry_id], ERROR, str(e))
+        raise
+    record_outcome(db, [entry_id], outcome_for(result))
+
+
+if WEBHOOK_PROCESSING == "queue":
+    job_runner.register(WEBHOOK_QUEUE, process_entry)
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+def select_entries(
+    db: Session,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    outcomes: Optional[Sequence[str]] = None,
+    ids: Optional[Sequence[int]] = None,
+) -> List[WebhookInbox]:
+    query = select(WebhookInbox).order_by(WebhookInbox.id)
+    if since is not None:
+        query = query.where(WebhookInbox.received_at >= since)
+    if until is not None:
+        query = query.where(WebhookInbox.received_at < until)
+    if outcomes:
+        query = query.where(WebhookInbox.outcome.in_(list(outcomes)))
+    if ids:
+        query = query.where(WebhookInbox.id.in_(list(ids)))
+    return list(db.scalars(query))
+
+
+def group_by_payment(entries: Sequence[WebhookInbox]) -> Dict[str, List[int]]:
+    """
+    Avisos de pago agrupados por payment_id. El procesamiento consulta el
+    estado actual del pago en MercadoPago, así que cada pago se reprocesa una
+    sola vez aunque tenga varios avisos.
+    """
+    payments: Dict[str, List[int]] = {}
+    for entry in entries:
+        if entry.topic == "payment" and entry.payment_id:
+            payments.setdefault(entry.payment_id, []).append(entry.id)
+    return payments
+
+
+class RateLimiter:
+    """
+    Espacia las llamadas a `rate` por segundo entre todos los hilos.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+@dataclass
+class ReplayResult:
+    selected: int = 0
+    payments: int = 0
+    outcomes: Dict[str, int] = field(default_factory=dict)
+    events: int = 0  # eventos pendientes del outbox publicados al terminar
+
+
+def replay(
+    db: Session,
+    session_factory: Callable[[], Session],
+    entries: Sequence[WebhookInbox],
+    concurrency: int = WEBHOOK_REPLAY_CONCURRENCY,
+    rate: float = WEBHOOK_REPLAY_RATE,
+    dry_run: bool = False,
+    process: Callable = process_payment_notification,
+) -> ReplayResult:
+    """
+    Reprocesa los avisos con la lógica del webhook, `concurrency` pagos en
+    paralelo (cada uno en su sesión) y como máximo `rate` por segundo. El
+    resultado se anota en los avisos desde `db`. En dry-run sólo cuenta.
+
+    Un aviso cuyo procesamiento falló después del commit de la transición se
+    reprocesa como repetido (SKIPPED): su evento quedó en el outbox con la
+    transición, y al terminar se publican los pendientes sin esperar al relay.
+    """
+    payments = group_by_payment(entries)
+    result = ReplayResult(selected=len(entries), payments=len(payments))
+    if dry_run or not payments:
+        return result
+
+    limiter = RateLimiter(rate)
+
+    def run(payment_id: str) -> Tuple[str, Optional[str]]:
+        limiter.acquire()
+        session = session_factory()
+        try:
+            return outcome_for(process(session, payment_id)), None
+        except Exception as e:
+            return ERROR, str(e)
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(run, payment_id): payment_id for payment_id in payments}
+        for future in as_completed(futures):
+            outcome, detail = future.result()
+            record_outcome(db, payments[futures[future]], outcome, detail)
+            result.outcomes[outcome] = result.outcomes.get(outcome, 0) + 1
+
+    result.events = OutboxRelay(session_factory).relay(min_age=0)
+    return result
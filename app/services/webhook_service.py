@@ -0,0 +1,114 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.pubsub.pubsub_client import publish_event
+from app.services.event_outbox import dispatch
+from app.services.group_commit import WEBHOOK_GROUP_COMMIT, transition_writer
+from app.services import json_codec
+from app.services.payment_lookup import payment_lookup
+from app.services.payment_stats import charged_amount
+from app.services.status_broker import status_event
+from app.services.status_notify import status_notifier
+from app.services.payment_state import (
+    APPROVED,
+    FAILED,
+    PAYMENT_STATUS_CHANGED,
+    TransitionResult,
+    apply_transition,
+    target_status,
+)
+
+
+def event_payload(result: TransitionResult, mp_status: str) -> dict:
+    """
+    Payload del evento payment_status_changed: mismo formato para todos los
+    estados. `version` (de la transición) permite descartar repetidos.
+    """
+    return {
+        "email": result.email,
+        "credits": result.credits,
+        "session_id": result.session_id,
+        "status": result.status,
+        "mp_status": mp_status,
+        "payment_id": result.payment_id,
+        "version": result.version,
+    }
+
+
+def process_payment_notification(
+    db: Session,
+    payment_id,
+    payment_info: Optional[Dict[str, Any]] = None,
+) -> Optional[TransitionResult]:
+    """
+    Procesa un aviso de pago: consulta MercadoPago (si no se pasó ya la
+    respuesta), aplica la transición de estado y publica el evento si la
+    transición se aplicó. El evento se guarda en el outbox con la transición:
+    si Pub/Sub falla, lo publica el relay (app/services/event_outbox.py).
+    """
+    if payment_info is None:
+        payment_info = payment_lookup.get(payment_id)
+
+    status = payment_info.get("status")
+    external_reference = payment_info.get("external_reference")
+    ref_data = json_codec.loads(external_reference)
+    session_id = ref_data.get("sessionId")
+
+    print(f"La sesión es: {session_id} | Status del pago: {status}")
+
+    target = target_status(status)
+    if target is None:
+        print(f"Estado {status} sin transición para la sesión {session_id}")
+        return None
+
+    def event(applied: TransitionResult) -> dict:
+        return event_payload(applied, status)
+
+    # Lo que cobró MercadoPago, para el revenue de las estadísticas
+    amount = charged_amount(
+        payment_info.get("transaction_amount"), payment_info.get("currency_id")
+    )
+    args = (session_id, target, str(payment_id), event, amount)
+    if WEBHOOK_GROUP_COMMIT:
+        # Escrita en el próximo lote; vuelve cuando el lote ya hizo commit
+        result = transition_writer.apply(*args)
+    else:
+        result = apply_transition(db, *args)
+    if not result.applied:
+        print(
+            f"Transición a {target} ignorada: "
+            f"la sesión {session_id} está en {result.status}"
+        )
+        return result
+
+    if result.status == APPROVED:
+        print(f"Créditos aprobados para {result.email}")
+    elif result.status == FAILED:
+        print(f"Pago fallido para {result.email}")
+    else:
+        print(f"Pago pendiente para {result.email}")
+
+    # Clientes esperando el estado (subscription / SSE / long-poll), en
+    # cualquier instancia. La transición ya está commiteada: si el aviso falla
+    # los clientes la ven al reconectar o al vencer el long-poll.
+    try:
+        status_notifier.notify(
+            db, status_event(session_id, result.status, result.payment_id)
+        )
+    except Exception as e:
+        print(f"Error difundiendo el estado de la sesión {session_id}: {e}")
+
+    payload = event_payload(result, status)
+    # Si falla, el evento queda en el outbox y lo publica el relay
+    published = dispatch(
+        db,
+        result.event_id,
+        PAYMENT_STATUS_CHANGED,
+        payload,
+        ordering_key=session_id,
+        publish=publish_event,
+    )
+    if published:
+        print(f"Evento publicado en Pub/Sub: {payload}")
+    return result
@@ -12,6 +12,11 @@ import os
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 os.environ["MP_ACCESS_TOKEN"] = "TEST_MP_TOKEN"
 os.environ["AUTH_SERVICE_URL"] = "http://localhost:8001"
+os.environ["EXPORT_API_TOKEN"] = "TEST_EXPORT_TOKEN"
+os.environ["STATS_API_TOKEN"] = "TEST_STATS_TOKEN"
+os.environ["PROFILER_ADMIN_TOKEN"] = "TEST_PROFILER_TOKEN"
+os.environ["FX_PROVIDER"] = "static"
+os.environ["FX_STATIC_RATES"] = "ARS=1000,BRL=5.1234,CLP=950.5"
 
 from unittest.mock import Mock, patch
 from sqlalchemy import create_engine
@@ -102,10 +107,51 @@ def sample_credit_transaction_data():
     }
 
 
+@pytest.fixture(scope="session")
+def auth_signing_key():
+    """Clave RSA del servicio de auth simulado"""
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def auth_jwks(auth_signing_key):
+    """JWKS con la clave pública cargado en el verificador de tokens"""
+    import json
+    from jwt.algorithms import RSAAlgorithm
+    from app.services.jwt_auth import jwks_cache, token_verifier
+
+    jwk = json.loads(RSAAlgorithm.to_jwk(auth_signing_key.public_key()))
+    jwks = {"keys": [{**jwk, "kid": "test-key", "alg": "RS256", "use": "sig"}]}
+    jwks_cache.load(jwks)
+    yield jwks
+    token_verifier.clear()
+
+
+@pytest.fixture
+def make_jwt(auth_signing_key, auth_jwks):
+    """Firma tokens como el servicio de auth"""
+    import time
+    import jwt
+
+    def _make(**claims):
+        payload = {
+            "user_id": 1,
+            "email": "test@test.com",
+            "exp": int(time.time()) + 3600,
+            **claims,
+        }
+        return jwt.encode(
+            payload, auth_signing_key, algorithm="RS256", headers={"kid": "test-key"}
+        )
+
+    return _make
+
+
 @pytest.fixture
-def valid_jwt_token():
-    """Token JWT válido simulado"""
-    return "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJ1c2VyX2lkIjoxLCJlbWFpbCI6InRlc3RAdGVzdC5jb20ifQ.test"
+def valid_jwt_token(make_jwt):
+    """Token JWT válido firmado con la clave de prueba"""
+    return make_jwt()
 
 
 @pytest.fixture
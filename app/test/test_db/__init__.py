@@ -0,0 +1 @@
+# Tests para la capa de base de datos
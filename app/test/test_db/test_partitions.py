@@ -0,0 +1,55 @@
+"""
+Pruebas unitarias para las particiones mensuales de credit_transactions
+- Nombres y rangos mensuales
+- Meses a crear según lo ya cubierto
+- Sin efecto fuera de Postgres
+"""
+
+from datetime import date, datetime, timedelta
+from app.db.partitions import (
+    ensure_partitions,
+    lookup_since,
+    missing_months,
+    next_month,
+    partition_name,
+)
+
+
+class TestPartitions:
+    """Pruebas del mantenimiento de particiones"""
+
+    def test_nombre_y_mes_siguiente(self):
+        """✅ Un nombre por mes y el cambio de año se respeta"""
+        assert partition_name(date(2026, 3, 1)) == "credit_transactions_2026_03"
+        assert next_month(date(2026, 12, 1)) == date(2027, 1, 1)
+
+    def test_meses_a_crear_sin_particiones(self):
+        """✅ Sin particiones se crea el mes actual y los siguientes"""
+        ranges = missing_months(date(2026, 11, 15), None, 2)
+
+        assert ranges == [
+            (date(2026, 11, 1), date(2026, 12, 1)),
+            (date(2026, 12, 1), date(2027, 1, 1)),
+            (date(2027, 1, 1), date(2027, 2, 1)),
+        ]
+
+    def test_saltea_meses_ya_cubiertos(self):
+        """✅ Lo cubierto por particiones existentes no se vuelve a crear"""
+        ranges = missing_months(date(2026, 11, 15), date(2027, 1, 1), 2)
+
+        assert ranges == [(date(2027, 1, 1), date(2027, 2, 1))]
+
+    def test_todo_cubierto(self):
+        """✅ Si ya está todo creado no hay nada que hacer"""
+        assert missing_months(date(2026, 11, 15), date(2027, 6, 1), 3) == []
+
+    def test_sin_postgres_no_hace_nada(self, test_engine):
+        """✅ En SQLite (tabla sin particionar) no se crean particiones"""
+        assert ensure_partitions(test_engine, today=date(2026, 11, 15)) == []
+
+    def test_ventana_de_busqueda(self):
+        """✅ La ventana acota created_at y 0 la deshabilita"""
+        since = lookup_since(31)
+
+        assert datetime.utcnow() - since - timedelta(days=31) < timedelta(seconds=5)
+        assert lookup_since(0) is None
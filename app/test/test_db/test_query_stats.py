@@ -0,0 +1,103 @@
+"""
+Pruebas de la instrumentación de sentencias SQL
+- Fingerprints sin literales ni parámetros
+- Conteo y tiempo por bloque / request
+- Log de queries lentas y aviso de N+1
+- Cantidad de sentencias de las rutas calientes
+"""
+
+from unittest.mock import patch
+from sqlalchemy import text
+from app.db.query_stats import (
+    fingerprint,
+    n_plus_one_warnings,
+    request_queries,
+    track_queries,
+)
+from app.services.payment_state import apply_transition
+
+
+class TestFingerprint:
+    """Pruebas de fingerprint"""
+
+    def test_normaliza_literales_y_parametros(self):
+        """✅ Sentencias que sólo difieren en valores tienen el mismo fingerprint"""
+        a = fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'ana'  -- x")
+        b = fingerprint("SELECT *\n FROM t WHERE id = 42 AND name = 'o''brien'")
+        assert a == b == "SELECT * FROM t WHERE id = ? AND name = ?"
+
+    def test_colapsa_listas(self):
+        """✅ Las listas IN y las filas VALUES no cambian la forma"""
+        in_list = "SELECT * FROM t WHERE id IN (?)"
+        assert fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?)") == in_list
+        named = fingerprint("SELECT * FROM t WHERE id IN (%(id_1)s, %(id_2)s)")
+        assert named == in_list
+        values = fingerprint("INSERT INTO t VALUES (:a0, :b0), (:a1, :b1)")
+        assert values == "INSERT INTO t VALUES (?), ..."
+        assert fingerprint("SELECT x::text FROM t") == "SELECT x::text FROM t"
+
+
+class TestTrackQueries:
+    """Pruebas de track_queries"""
+
+    def test_cuenta_sentencias_y_tiempo(self, test_db):
+        """✅ Cuenta las sentencias del bloque y las agrupa por forma"""
+        with track_queries() as stats:
+            for i in range(3):
+                test_db.execute(text(f"SELECT {i}"))
+
+        assert stats.count == 3
+        assert stats.total_time > 0
+        assert stats.fingerprints == {"SELECT ?": 3}
+
+    def test_aviso_de_n_mas_uno(self, test_db):
+        """❌ Repetir la misma forma más de N veces dispara un único aviso"""
+        before = n_plus_one_warnings.value()
+        with track_queries("GET /x", n_plus_one_threshold=2) as stats:
+            for i in range(5):
+                test_db.execute(text("SELECT :n"), {"n": i})
+
+        assert stats.n_plus_one == ["SELECT ?"]
+        assert stats.repeated() == [("SELECT ?", 5)]
+        assert n_plus_one_warnings.value() == before + 1
+
+    def test_query_lenta(self, test_db):
+        """✅ Las sentencias sobre el umbral van al log de lentas"""
+        with patch("app.db.query_stats.SLOW_QUERY_MS", 0), track_queries() as stats:
+            test_db.execute(text("SELECT 1"))
+
+        assert [fp for fp, _ in stats.slow] == ["SELECT ?"]
+
+    def test_fuera_de_un_bloque_no_acumula(self, test_db):
+        """✅ Sin request en curso sólo se actualizan las métricas globales"""
+        with track_queries() as outer:
+            pass
+        test_db.execute(text("SELECT 1"))
+        assert outer.count == 0
+
+    def test_transicion_de_pago_acotada(self, test_db, create_test_transaction):
+        """✅ Una transición aplicada es UPDATE + delta de estadísticas + commit"""
+        create_test_transaction(session_id="s1", status="pending", payment_id="")
+
+        with track_queries() as stats:
+            apply_transition(test_db, "s1", "approved", "MP_1")
+
+        assert stats.count <= 2
+        assert not any(fp.startswith("SELECT") for fp in stats.fingerprints)
+
+
+class TestQueryStatsMiddleware:
+    """Pruebas del middleware"""
+
+    def test_reporta_por_request(self, test_client):
+        """✅ Cada request reporta sus sentencias en el histograma"""
+        before_count, before_sum = request_queries.count(), request_queries.sum()
+
+        test_client.post(
+            "/webhooks/mercadopago",
+            json={"type": "merchant_order", "data": {"id": 1}},
+        )
+
+        assert request_queries.count() == before_count + 1
+        # INSERT en el inbox y UPDATE del resultado
+        assert request_queries.sum() - before_sum >= 2
@@ -0,0 +1,202 @@
+"""
+Pruebas unitarias para el ruteo a réplicas de lectura
+- Health check y expulsión por lag o error
+- RoutingSession: lecturas a réplica, escrituras y read-your-writes al primario
+- Extensión GraphQL que marca las queries como de sólo lectura
+"""
+
+import asyncio
+import time
+from unittest.mock import Mock, patch
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db import session as db_session
+from app.db.replicas import RecentWrites, ReplicaSet
+from app.db.session import Base, RoutingSession
+from app.models.credit_transaction import CreditTransaction
+
+
+def _sqlite_engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+class LaggingReplicaSet(ReplicaSet):
+    def __init__(self, engines, lags, **kwargs):
+        super().__init__(engines, **kwargs)
+        self.lags = lags
+
+    def measure_lag(self, engine):
+        lag = self.lags[engine]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+
+@pytest.fixture
+def replica_engine(sample_credit_transaction_data):
+    engine = _sqlite_engine()
+    with sessionmaker(bind=engine)() as db:
+        data = {**sample_credit_transaction_data, "session_id": "en-replica"}
+        db.add(CreditTransaction(**data))
+        db.commit()
+    return engine
+
+
+class TestReplicaSet:
+    """Pruebas de ReplicaSet"""
+
+    def test_sin_chequeo_va_al_primario(self, replica_engine):
+        """✅ Una réplica todavía no chequeada no recibe lecturas"""
+        assert ReplicaSet([replica_engine]).pick() is None
+
+    def test_replica_sana_recibe_lecturas(self, replica_engine):
+        """✅ Tras el chequeo la réplica entra en rotación"""
+        replicas = ReplicaSet([replica_engine])
+        replicas.refresh()
+
+        assert replicas.pick() is replica_engine
+        assert replicas.status()[0]["healthy"] is True
+
+    def test_expulsa_por_lag_y_por_error(self):
+        """❌ Lag excesivo o error sacan a la réplica de la rotación"""
+        lagging, broken = Mock(), Mock()
+        replicas = LaggingReplicaSet(
+            [lagging, broken], {lagging: 30.0, broken: RuntimeError("down")}, max_lag=5
+        )
+        replicas.refresh()
+
+        assert replicas.pick() is None
+        assert [r["healthy"] for r in replicas.status()] == [False, False]
+        assert replicas.status()[1]["error"] == "down"
+
+    def test_round_robin(self):
+        """✅ Las lecturas se reparten entre réplicas sanas"""
+        a, b = Mock(), Mock()
+        replicas = LaggingReplicaSet([a, b], {a: 0.0, b: 0.0})
+        replicas.refresh()
+
+        assert {replicas.pick(), replicas.pick()} == {a, b}
+
+    def test_read_your_writes(self):
+        """✅ Una escritura posterior al último chequeo lee del primario"""
+        replica = Mock()
+        replicas = LaggingReplicaSet([replica], {replica: 0.0})
+        replicas.refresh()
+
+        assert replicas.pick(wrote_at=time.monotonic() - 60) is replica
+        assert replicas.pick(wrote_at=time.monotonic()) is None
+
+
+class TestRecentWrites:
+    """Pruebas de RecentWrites"""
+
+    def test_ventana_y_tamano(self):
+        """✅ Las escrituras vencen y la memoria queda acotada"""
+        writes = RecentWrites(window=0, max_keys=2)
+        for key in ("a", "b", "c"):
+            writes.mark(key)
+
+        assert len(writes._writes) == 2
+        time.sleep(0.001)
+        assert writes.get("c") is None
+
+
+class TestRoutingSession:
+    """Pruebas de RoutingSession"""
+
+    def test_lectura_va_a_replica_y_escritura_al_primario(
+        self, replica_engine, sample_credit_transaction_data
+    ):
+        """✅ Sólo lectura lee de la réplica; después de escribir, del primario"""
+        primary = _sqlite_engine()
+        replicas = ReplicaSet([replica_engine])
+        replicas.refresh()
+
+        with patch.object(db_session, "replica_set", replicas):
+            db = sessionmaker(class_=RoutingSession, bind=primary)()
+            db.info["read_only"] = True
+            assert db.query(CreditTransaction.session_id).scalar() == "en-replica"
+
+            data = {**sample_credit_transaction_data, "session_id": "en-primario"}
+            db.add(CreditTransaction(**data))
+            db.commit()
+
+            assert db.query(CreditTransaction.session_id).scalar() == "en-primario"
+            db.close()
+
+    def test_sin_marca_usa_primario(self, replica_engine):
+        """✅ Sesiones sin read_only (mutations, webhook) no usan réplicas"""
+        primary = _sqlite_engine()
+        replicas = ReplicaSet([replica_engine])
+        replicas.refresh()
+
+        with patch.object(db_session, "replica_set", replicas):
+            db = sessionmaker(class_=RoutingSession, bind=primary)()
+            assert db.query(CreditTransaction).count() == 0
+            db.close()
+
+
+class TestReadReplicaRouting:
+    """Pruebas de la extensión GraphQL"""
+
+    def test_query_marca_sesion_de_lectura(self):
+        """✅ Una query marca la sesión como de sólo lectura; una mutation no"""
+        from app.schemas.schema import schema
+
+        query_db, mutation_db = Mock(info={}), Mock(info={})
+        request = Mock(headers={}, client=Mock(host="10.0.0.1"))
+
+        schema.execute_sync(
+            "{ ping }", context_value={"db": query_db, "request": request}
+        )
+        asyncio.run(schema.execute(
+            'mutation { createSession(authToken: "", credits: 250) { sessionId } }',
+            context_value={"db": mutation_db, "request": request},
+        ))
+
+        assert query_db.info["read_only"] is True
+        assert "read_only" not in mutation_db.info
+
+    def test_clave_del_cliente(self):
+        """✅ Bearer en Authorization → hash del token; sin token → IP"""
+        from app.schemas.replica_routing import client_key
+        from app.services.tokens import hash_token
+
+        client = Mock(host="10.0.0.1")
+        with_token = Mock(headers={"authorization": "Bearer tok"}, client=client)
+        without_token = Mock(headers={}, client=client)
+
+        assert client_key(with_token) == hash_token("tok")
+        assert client_key(without_token) == "10.0.0.1"
+
+    def test_create_session_recuerda_el_token_verificado(self):
+        """✅ createSession recuerda la escritura por IP y por el token verificado"""
+        from app.schemas import replica_routing
+        from app.schemas.schema import schema
+        from app.services.tokens import hash_token
+
+        writes = RecentWrites()
+        db = Mock(info={"wrote": True})
+        request = Mock(headers={}, client=Mock(host="10.0.0.1"))
+
+        with patch.object(replica_routing, "recent_writes", writes), patch(
+            "app.mutations.session_mutation.token_verifier.verify",
+            return_value={"email": "a@b.com"},
+        ):
+            result = asyncio.run(schema.execute(
+                'mutation { createSession(authToken: "tok", credits: 250) '
+                "{ sessionId } }",
+                context_value={"db": db, "request": request},
+            ))
+
+        assert result.errors is None
+        assert writes.get(hash_token("tok")) is not None
+        assert writes.get("10.0.0.1") is not None
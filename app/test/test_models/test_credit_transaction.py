@@ -10,6 +10,7 @@ import pytest
 from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 from app.models.credit_transaction import CreditTransaction
+from app.services.tokens import hash_token
 
 
 class TestCreditTransactionModel:
@@ -33,7 +34,7 @@ class TestCreditTransactionModel:
         assert transaction.status == data["status"]
         assert transaction.payment_id == data["payment_id"]
         assert transaction.session_id == data["session_id"]
-        assert transaction.token == data["token"]
+        assert transaction.token_hash == hash_token(data["token"])
         assert transaction.created_at is not None
         assert isinstance(transaction.created_at, datetime)
     
@@ -264,4 +265,33 @@ class TestCreditTransactionModel:
         # Assert
         assert transaction1.session_id != transaction2.session_id
         assert transaction1.session_id == "session_123"
-        assert transaction2.session_id == "session_456"
\ No newline at end of file
+        assert transaction2.session_id == "session_456"
+    
+    def test_token_se_guarda_como_hash(self, test_db, sample_credit_transaction_data):
+        """✅ El token no queda en la fila: sólo su hash de 32 bytes"""
+        # Arrange
+        data = sample_credit_transaction_data
+        
+        # Act
+        transaction = CreditTransaction(**data)
+        test_db.add(transaction)
+        test_db.commit()
+        
+        # Assert
+        assert len(transaction.token_hash) == 32
+        assert data["token"].encode() not in transaction.token_hash
+        with pytest.raises(AttributeError):
+            transaction.token
+    
+    def test_campos_requeridos_token(self, test_db, sample_credit_transaction_data):
+        """❌ Debe fallar si no se proporciona token"""
+        # Arrange
+        data = sample_credit_transaction_data.copy()
+        del data["token"]
+        
+        # Act & Assert
+        transaction = CreditTransaction(**data)
+        test_db.add(transaction)
+        
+        with pytest.raises(IntegrityError):
+            test_db.commit()
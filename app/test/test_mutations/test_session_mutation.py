@@ -6,30 +6,35 @@ Pruebas unitarias para SessionMutation (GraphQL)
 - Guardar correctamente en BD
 """
 
+import asyncio
 import pytest
 import uuid
-from unittest.mock import Mock
+import threading
+from unittest.mock import Mock, patch
 from app.mutations.session_mutation import SessionMutation, SessionType
 from app.models.credit_transaction import CreditTransaction
+from app.services.jwt_auth import InvalidAuthToken
+from app.services.tokens import hash_token
 
 
 class TestSessionMutation:
     """Pruebas para las mutations de sesión"""
     
-    def test_crear_sesion_valida(self, mock_info, test_db, valid_jwt_token):
+    def test_crear_sesion_valida(self, mock_info, test_db, make_jwt):
         """✅ Debe crear sesión con datos válidos correctamente"""
         # Arrange
         mutation = SessionMutation()
         email = "test@example.com"
         credits = 100
+        token = make_jwt(email=email)
         
         # Act
-        result = mutation.create_session(
+        result = asyncio.run(mutation.create_session(
             info=mock_info,
-            authToken=valid_jwt_token,
+            authToken=token,
             credits=credits,
             email=email
-        )
+        ))
         
         # Assert
         assert isinstance(result, SessionType)
@@ -45,25 +50,43 @@ class TestSessionMutation:
         assert saved_transaction.email == email
         assert saved_transaction.credits == credits
         assert saved_transaction.status == "pending"
-        assert saved_transaction.token == valid_jwt_token
+        assert saved_transaction.token_hash == hash_token(token)
         assert saved_transaction.payment_id == ""
     
-    def test_validar_token_requerido(self, mock_info):
-        """✅ Debe aceptar authToken vacío (sin validación en código)"""
+    def test_validar_token_requerido(self, mock_info, auth_jwks):
+        """❌ Debe rechazar authToken vacío"""
         # Arrange
         mutation = SessionMutation()
         
-        # Act - el código actual acepta token vacío
-        result = mutation.create_session(
-            info=mock_info,
-            authToken="",  # Token vacío - aceptado por el código actual
-            credits=100,
-            email="test@example.com"
-        )
+        # Act & Assert
+        with pytest.raises(InvalidAuthToken):
+            asyncio.run(mutation.create_session(
+                info=mock_info,
+                authToken="",
+                credits=100,
+                email="test@example.com"
+            ))
+    
+    def test_verificacion_fuera_del_event_loop(self, mock_info, test_db):
+        """✅ Verificar el token (y refrescar el JWKS) corre en el threadpool"""
+        # Arrange
+        mutation = SessionMutation()
+        threads = []
         
-        # Assert - debería funcionar sin errores
-        assert isinstance(result, SessionType)
-        assert result.session_id is not None
+        def verify(token):
+            threads.append(threading.current_thread())
+            return {"email": "thread@test.com"}
+        
+        # Act
+        with patch(
+            "app.mutations.session_mutation.token_verifier.verify", side_effect=verify
+        ):
+            asyncio.run(
+                mutation.create_session(info=mock_info, authToken="token", credits=100)
+            )
+        
+        # Assert
+        assert threads and threads[0] is not threading.main_thread()
     
     def test_validar_email_requerido(self, mock_info, valid_jwt_token):
         """✅ Debe aceptar email vacío (sin validación en código)"""
@@ -71,12 +94,12 @@ class TestSessionMutation:
         mutation = SessionMutation()
         
         # Act - el código actual acepta email vacío
-        result = mutation.create_session(
+        result = asyncio.run(mutation.create_session(
             info=mock_info,
             authToken=valid_jwt_token,
             credits=100,
             email=""  # Email vacío - aceptado por el código actual
-        )
+        ))
         
         # Assert - debería funcionar sin errores
         assert isinstance(result, SessionType)
@@ -89,12 +112,12 @@ class TestSessionMutation:
         credits_positivos = 250
         
         # Act
-        result = mutation.create_session(
+        result = asyncio.run(mutation.create_session(
             info=mock_info,
             authToken=valid_jwt_token,
             credits=credits_positivos,
             email="test@example.com"
-        )
+        ))
         
         # Assert
         assert result.session_id is not None
@@ -111,19 +134,19 @@ class TestSessionMutation:
         mutation = SessionMutation()
         
         # Act - crear dos sesiones
-        result1 = mutation.create_session(
+        result1 = asyncio.run(mutation.create_session(
             info=mock_info,
             authToken=valid_jwt_token,
             credits=100,
             email="user1@example.com"
-        )
+        ))
         
-        result2 = mutation.create_session(
+        result2 = asyncio.run(mutation.create_session(
             info=mock_info,
             authToken=valid_jwt_token,
             credits=200,
             email="user2@example.com"
-        )
+        ))
         
         # Assert
         assert result1.session_id != result2.session_id
@@ -134,21 +157,21 @@ class TestSessionMutation:
         uuid.UUID(result1.session_id)  # No debe lanzar excepción
         uuid.UUID(result2.session_id)  # No debe lanzar excepción
     
-    def test_guardar_en_bd_correctamente(self, mock_info, valid_jwt_token, test_db):
+    def test_guardar_en_bd_correctamente(self, mock_info, make_jwt, test_db):
         """✅ Debe guardar todos los campos correctamente en BD"""
         # Arrange
         mutation = SessionMutation()
         test_data = {
             "email": "detailed@test.com",
             "credits": 500,
-            "authToken": valid_jwt_token
+            "authToken": make_jwt(email="detailed@test.com")
         }
         
         # Act
-        result = mutation.create_session(
+        result = asyncio.run(mutation.create_session(
             info=mock_info,
             **test_data
-        )
+        ))
         
         # Assert - verificar en base de datos
         saved = test_db.query(CreditTransaction).filter_by(
@@ -158,32 +181,32 @@ class TestSessionMutation:
         assert saved is not None
         assert saved.email == test_data["email"]
         assert saved.credits == test_data["credits"]
-        assert saved.token == test_data["authToken"]
+        assert saved.token_hash == hash_token(test_data["authToken"])
         assert saved.session_id == result.session_id
         assert saved.payment_id == ""  # Inicialmente vacío
         assert saved.status == "pending"  # Estado inicial
         assert saved.created_at is not None  # Timestamp automático
     
-    def test_multiples_sesiones_mismo_email(self, mock_info, valid_jwt_token, test_db):
+    def test_multiples_sesiones_mismo_email(self, mock_info, make_jwt, test_db):
         """✅ Un mismo email puede crear múltiples sesiones"""
         # Arrange
         mutation = SessionMutation()
         email = "multiple@sessions.com"
         
         # Act - crear múltiples sesiones para mismo email
-        result1 = mutation.create_session(
+        result1 = asyncio.run(mutation.create_session(
             info=mock_info,
-            authToken=valid_jwt_token,
+            authToken=make_jwt(email=email),
             credits=100,
             email=email
-        )
+        ))
         
-        result2 = mutation.create_session(
+        result2 = asyncio.run(mutation.create_session(
             info=mock_info,
-            authToken=valid_jwt_token,
+            authToken=make_jwt(email=email),
             credits=200,
             email=email
-        )
+        ))
         
         # Assert
         assert result1.session_id != result2.session_id
@@ -204,12 +227,12 @@ class TestSessionMutation:
         
         # Act & Assert
         with pytest.raises(KeyError):  # Al intentar acceder a info.context["db"]
-            mutation.create_session(
+            asyncio.run(mutation.create_session(
                 info=mock_info_sin_db,
                 authToken=valid_jwt_token,
                 credits=100,
                 email="test@example.com"
-            )
+            ))
     
     def test_transaction_rollback_en_error(self, mock_info, valid_jwt_token, test_db):
         """✅ Debe hacer rollback si hay error durante commit"""
@@ -225,12 +248,12 @@ class TestSessionMutation:
         
         # Act & Assert
         with pytest.raises(Exception):
-            mutation.create_session(
+            asyncio.run(mutation.create_session(
                 info=mock_info,
                 authToken=valid_jwt_token,
                 credits=100,
                 email="rollback@test.com"
-            )
+            ))
         
         # Restaurar el método original
         test_db.add = original_add
\ No newline at end of file
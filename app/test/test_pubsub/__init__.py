@@ -0,0 +1 @@
+# Tests para publicación de eventos en Pub/Sub
@@ -0,0 +1,95 @@
+"""
+Pruebas unitarias para la publicación de eventos en Pub/Sub
+- Envelope msgpack versionado
+- Atributos para filtrar del lado del servidor
+- Ordering keys por session_id
+"""
+
+import json
+from unittest.mock import Mock, patch
+import pytest
+from app.pubsub import pubsub_client
+from app.pubsub.envelope import SCHEMA_VERSION, decode_event, encode_event
+
+PAYLOAD = {
+    "email": "test@example.com",
+    "credits": 250,
+    "session_id": "session-123",
+    "status": "approved",
+    "mp_status": "approved",
+    "payment_id": "123456",
+}
+
+
+@pytest.fixture
+def mock_publisher():
+    publisher = Mock()
+    publisher.publish.return_value.result.return_value = "message-id"
+    with patch.object(pubsub_client, "get_publisher", return_value=publisher):
+        yield publisher
+
+
+class TestEnvelope:
+    """Pruebas del envelope de eventos"""
+
+    def test_envelope_msgpack(self):
+        """✅ El cuerpo es msgpack con versión, tipo y datos"""
+        data, attributes = encode_event("payment_status_changed", PAYLOAD)
+
+        decoded = decode_event(data, attributes)
+
+        assert attributes["content_type"] == "application/x-msgpack"
+        assert decoded["v"] == SCHEMA_VERSION
+        assert decoded["event"] == "payment_status_changed"
+        assert decoded["data"] == PAYLOAD
+        envelope = {"event": "payment_status_changed", "data": PAYLOAD}
+        assert len(data) < len(json.dumps(envelope))
+
+    def test_atributos_para_filtrar(self):
+        """✅ Tipo de evento, estado y versión viajan como atributos"""
+        _, attributes = encode_event("payment_status_changed", PAYLOAD)
+
+        assert attributes["event_type"] == "payment_status_changed"
+        assert attributes["status"] == "approved"
+        assert attributes["schema_version"] == str(SCHEMA_VERSION)
+
+    def test_encoding_json_para_migracion(self):
+        """✅ Con encoding json el envelope se decodifica igual"""
+        data, attributes = encode_event(
+            "payment_status_changed", PAYLOAD, encoding="json"
+        )
+
+        assert attributes["content_type"] == "application/json"
+        assert decode_event(data, attributes)["data"] == PAYLOAD
+
+
+class TestPublishEvent:
+    """Pruebas de publish_event"""
+
+    def test_publica_con_ordering_key_y_atributos(self, mock_publisher):
+        """✅ Se publica con el session_id como ordering key"""
+        result = pubsub_client.publish_event(
+            "payment_status_changed", PAYLOAD, ordering_key="session-123"
+        )
+
+        assert result == "message-id"
+        _, kwargs = mock_publisher.publish.call_args
+        assert kwargs["ordering_key"] == "session-123"
+        assert kwargs["event_type"] == "payment_status_changed"
+        assert kwargs["status"] == "approved"
+        assert pubsub_client.get_backlog() == 0
+
+    def test_error_reanuda_ordering_key(self, mock_publisher):
+        """❌ Un fallo de publicación reanuda la ordering key y propaga el error"""
+        publish_result = mock_publisher.publish.return_value.result
+        publish_result.side_effect = RuntimeError("Pub/Sub caído")
+
+        with pytest.raises(RuntimeError, match="Pub/Sub caído"):
+            pubsub_client.publish_event(
+                "payment_status_changed", PAYLOAD, ordering_key="session-123"
+            )
+
+        mock_publisher.resume_publish.assert_called_once_with(
+            pubsub_client.topic_path, "session-123"
+        )
+        assert pubsub_client.get_backlog() == 0
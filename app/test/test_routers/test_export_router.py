@@ -0,0 +1,98 @@
+"""
+Pruebas del endpoint de export para conciliación
+- Autenticación por token
+- CSV y NDJSON en streaming con filtros de fecha y estado
+- Reanudación con after_id
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from app.main import app
+from app.routers.export_router import get_export_engine
+
+AUTH = {"Authorization": "Bearer TEST_EXPORT_TOKEN"}
+NOW = datetime.utcnow()
+RANGE = {
+    "from": (NOW - timedelta(days=1)).isoformat(),
+    "to": (NOW + timedelta(days=1)).isoformat(),
+}
+
+
+@pytest.fixture
+def export_client(test_client, test_engine, create_test_transaction):
+    app.dependency_overrides[get_export_engine] = lambda: test_engine
+    for i in range(3):
+        create_test_transaction(session_id=f"ok-{i}", status="approved")
+    create_test_transaction(session_id="fail", status="failed")
+    create_test_transaction(
+        session_id="old", status="approved", created_at=NOW - timedelta(days=30)
+    )
+    return test_client
+
+
+class TestExportRouter:
+    """Pruebas de /exports/transactions"""
+
+    def test_sin_token(self, export_client):
+        """❌ Sin token válido responde 401"""
+        response = export_client.get("/exports/transactions", params=RANGE)
+        assert response.status_code == 401
+
+        response = export_client.get(
+            "/exports/transactions",
+            params=RANGE,
+            headers={"Authorization": "Bearer otro"},
+        )
+        assert response.status_code == 401
+
+    def test_csv_por_rango(self, export_client):
+        """✅ CSV con encabezado y sólo las filas del rango, sin token"""
+        response = export_client.get(
+            "/exports/transactions", params=RANGE, headers=AUTH
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert {r["session_id"] for r in rows} == {"ok-0", "ok-1", "ok-2", "fail"}
+        assert "token" not in rows[0]
+
+    def test_ndjson_filtrado_por_estado(self, export_client):
+        """✅ NDJSON con una transacción por línea"""
+        response = export_client.get(
+            "/exports/transactions",
+            params={**RANGE, "format": "ndjson", "status": "approved"},
+            headers=AUTH,
+        )
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["session_id"] for line in lines] == ["ok-0", "ok-1", "ok-2"]
+
+    def test_reanudar_desde_ultimo_id(self, export_client):
+        """✅ after_id retoma después del último id recibido"""
+        first = export_client.get(
+            "/exports/transactions",
+            params={**RANGE, "format": "ndjson"},
+            headers=AUTH,
+        )
+        ids = [json.loads(line)["id"] for line in first.text.splitlines()]
+
+        resumed = export_client.get(
+            "/exports/transactions",
+            params={**RANGE, "format": "ndjson", "after_id": ids[1]},
+            headers=AUTH,
+        )
+
+        assert [json.loads(line)["id"] for line in resumed.text.splitlines()] == ids[2:]
+
+    def test_rango_invalido(self, export_client):
+        """❌ 'to' anterior a 'from' responde 422"""
+        response = export_client.get(
+            "/exports/transactions",
+            params={"from": RANGE["to"], "to": RANGE["from"]},
+            headers=AUTH,
+        )
+        assert response.status_code == 422
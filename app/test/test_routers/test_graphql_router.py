@@ -0,0 +1,150 @@
+"""
+Pruebas unitarias para el endpoint GraphQL con persisted queries
+- Registro automático hash → documento (APQ)
+- Errores que esperan los clientes APQ
+- Modo allow-list, también por WebSocket
+"""
+
+import json
+from unittest.mock import patch
+import pytest
+from app.routers.graphql_router import PersistedQueryRouter
+from app.schemas.persisted_only import PersistedQueryAllowList
+from app.services.persisted_queries import PersistedQueryRegistry, query_hash
+
+PING = "query Ping { ping }"
+
+
+def _ws_subscribe(test_client, query):
+    """
+    Ejecuta una operación por graphql-transport-ws y devuelve el primer mensaje.
+    """
+    with test_client.websocket_connect(
+        "/payments-be", subprotocols=["graphql-transport-ws"]
+    ) as ws:
+        ws.send_json({"type": "connection_init"})
+        assert ws.receive_json()["type"] == "connection_ack"
+        ws.send_json({"id": "1", "type": "subscribe", "payload": {"query": query}})
+        return ws.receive_json()
+
+
+def _apq(sha256, query=None):
+    body = {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": sha256}}}
+    if query is not None:
+        body["query"] = query
+    return body
+
+
+@pytest.fixture
+def registry():
+    registry = PersistedQueryRegistry()
+    with patch.object(PersistedQueryRouter, "registry", registry):
+        yield registry
+
+
+class TestPersistedQueries:
+    """Pruebas de Automatic Persisted Queries"""
+
+    def test_query_completa_sigue_funcionando(self, test_client, registry):
+        """✅ Un request normal con la query completa no cambia"""
+        response = test_client.post("/payments-be", json={"query": PING})
+
+        assert response.status_code == 200
+        assert response.json()["data"] == {"ping": "pong"}
+
+    def test_hash_desconocido(self, test_client, registry):
+        """❌ Un hash no registrado devuelve PersistedQueryNotFound"""
+        response = test_client.post("/payments-be", json=_apq(query_hash(PING)))
+
+        assert response.status_code == 200
+        error = response.json()["errors"][0]
+        assert error["message"] == "PersistedQueryNotFound"
+        assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+    def test_registra_y_reutiliza_hash(self, test_client, registry):
+        """✅ Tras registrar la query, alcanza con mandar el hash"""
+        sha256 = query_hash(PING)
+        test_client.post("/payments-be", json=_apq(sha256, PING))
+
+        response = test_client.post("/payments-be", json=_apq(sha256))
+
+        assert response.json()["data"] == {"ping": "pong"}
+
+    def test_hash_por_get(self, test_client, registry):
+        """✅ Las queries persistidas pueden enviarse por GET"""
+        sha256 = query_hash(PING)
+        registry.register(sha256, PING)
+
+        response = test_client.get(
+            "/payments-be",
+            params={"extensions": json.dumps(_apq(sha256)["extensions"])},
+        )
+
+        assert response.json()["data"] == {"ping": "pong"}
+
+    def test_hash_no_coincide(self, test_client, registry):
+        """❌ Se rechaza un hash que no corresponde a la query enviada"""
+        response = test_client.post("/payments-be", json=_apq("0" * 64, PING))
+
+        error = response.json()["errors"][0]
+        assert error["extensions"]["code"] == "PERSISTED_QUERY_HASH_MISMATCH"
+        assert registry.lookup("0" * 64) is None
+
+
+class TestAllowList:
+    """Pruebas del modo allow-list"""
+
+    def test_acepta_operaciones_del_manifest(self, test_client):
+        """✅ Las operaciones del manifest se ejecutan por hash o texto"""
+        registry = PersistedQueryRegistry(
+            {query_hash(PING): PING}, allow_list_only=True
+        )
+        with patch.object(PersistedQueryRouter, "registry", registry):
+            by_hash = test_client.post("/payments-be", json=_apq(query_hash(PING)))
+            by_text = test_client.post("/payments-be", json={"query": PING})
+
+        assert by_hash.json()["data"] == {"ping": "pong"}
+        assert by_text.json()["data"] == {"ping": "pong"}
+
+    def test_rechaza_operaciones_no_registradas(self, test_client):
+        """❌ Una query fuera del manifest no se ejecuta ni se registra"""
+        registry = PersistedQueryRegistry(
+            {query_hash(PING): PING}, allow_list_only=True
+        )
+        otra = "{ price(credits: 250) { cost } }"
+        with patch.object(PersistedQueryRouter, "registry", registry):
+            response = test_client.post(
+                "/payments-be", json=_apq(query_hash(otra), otra)
+            )
+
+        error = response.json()["errors"][0]
+        assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_ALLOWED"
+        assert registry.lookup(query_hash(otra)) is None
+
+    def test_websocket_respeta_el_allow_list(self, test_client):
+        """❌ Por WebSocket tampoco se ejecuta lo que no está en el manifest"""
+        registry = PersistedQueryRegistry(
+            {query_hash(PING): PING}, allow_list_only=True
+        )
+        mutation = (
+            'mutation { createSession(authToken: "x", credits: 250) { sessionId } }'
+        )
+        with patch.object(PersistedQueryAllowList, "registry", registry):
+            allowed = _ws_subscribe(test_client, PING)
+            rejected = [_ws_subscribe(test_client, q) for q in ("{ ping }", mutation)]
+
+        assert allowed["type"] == "next"
+        assert allowed["payload"]["data"] == {"ping": "pong"}
+        for message in rejected:
+            assert message["type"] == "error"
+            error = message["payload"][0]
+            assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_ALLOWED"
+
+    def test_lru_de_registro_automatico(self):
+        """✅ El registro automático está acotado"""
+        registry = PersistedQueryRegistry(max_entries=1)
+        registry.register("a", "{ a }")
+        registry.register("b", "{ b }")
+
+        assert registry.lookup("a") is None
+        assert registry.lookup("b") == "{ b }"
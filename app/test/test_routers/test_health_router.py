@@ -0,0 +1,88 @@
+"""
+Pruebas unitarias para los probes de salud
+- /healthz siempre responde mientras el proceso viva
+- /readyz refleja el snapshot en segundo plano
+- Checks de DB, pool y backlog de Pub/Sub
+"""
+
+import time
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+from app.services.health_service import HealthMonitor, health_monitor
+
+
+class TestHealthRouter:
+    """Pruebas de los endpoints /healthz y /readyz"""
+
+    def test_liveness_ok(self, test_client):
+        """✅ /healthz responde 200 sin consultar dependencias"""
+        response = test_client.get("/healthz")
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    def test_readiness_reporta_checks(self, test_client):
+        """✅ /readyz devuelve el snapshot con DB, pool y publisher"""
+        response = test_client.get("/readyz")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["ready"] is True
+        assert set(body["checks"]) == {"database", "pool", "publisher"}
+        assert body["checks"]["database"]["ok"] is True
+
+    def test_readiness_503_si_no_esta_listo(self, test_client):
+        """❌ /readyz responde 503 cuando el snapshot marca una falla"""
+        snapshot = {"ready": False, "checks": {}}
+        with patch.object(health_monitor, "snapshot", return_value=snapshot):
+            response = test_client.get("/readyz")
+
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+
+class TestHealthMonitor:
+    """Pruebas del monitor de dependencias"""
+
+    def test_db_inaccesible_no_esta_listo(self):
+        """❌ Una DB que no conecta marca el snapshot como no listo"""
+        engine = create_engine("sqlite:////ruta/inexistente/db.sqlite")
+        monitor = HealthMonitor(engine=engine)
+
+        snapshot = monitor.refresh()
+
+        assert snapshot["ready"] is False
+        assert snapshot["checks"]["database"]["ok"] is False
+
+    def test_backlog_publisher_excedido(self, test_engine):
+        """❌ Demasiados eventos sin confirmar marcan el snapshot como no listo"""
+        monitor = HealthMonitor(engine=test_engine)
+
+        with patch("app.pubsub.pubsub_client.get_backlog", return_value=10_000):
+            snapshot = monitor.refresh()
+
+        assert snapshot["ready"] is False
+        assert snapshot["checks"]["publisher"]["backlog"] == 10_000
+
+    def test_pool_saturado_omite_consulta(self):
+        """❌ Con el pool agotado no se intenta conectar"""
+        engine = create_engine(
+            "sqlite:///:memory:", poolclass=QueuePool, pool_size=1, max_overflow=0
+        )
+        conn = engine.connect()
+        try:
+            snapshot = HealthMonitor(engine=engine).refresh()
+        finally:
+            conn.close()
+
+        assert snapshot["checks"]["pool"]["ok"] is False
+        assert snapshot["checks"]["database"]["error"] == "pool saturado"
+
+    def test_snapshot_vencido_no_esta_listo(self, test_engine):
+        """❌ Un snapshot más viejo que max_staleness no se considera listo"""
+        monitor = HealthMonitor(engine=test_engine, max_staleness=1)
+        monitor.refresh()
+        monitor._snapshot["checked_at"] = time.time() - 60
+
+        assert monitor.snapshot()["ready"] is False
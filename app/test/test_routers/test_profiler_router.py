@@ -0,0 +1,104 @@
+"""
+Pruebas del profiling bajo demanda
+- Sólo se perfila con el header de admin o por muestreo
+- Ring buffer acotado
+- Endpoint de admin con token
+"""
+
+import asyncio
+import json
+import pytest
+from app.services.profiler import ProfilerMiddleware, ProfileStore, profile_store
+
+AUTH = {"Authorization": "Bearer TEST_PROFILER_TOKEN"}
+PROFILE = {"X-Profile": "TEST_PROFILER_TOKEN"}
+
+
+@pytest.fixture(autouse=True)
+def empty_store():
+    profile_store.clear()
+    yield
+    profile_store.clear()
+
+
+async def _app(scope, receive, send):
+    await asyncio.sleep(0.002)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _call(middleware, headers=()):
+    scope = {"type": "http", "method": "GET", "path": "/x", "headers": list(headers)}
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+
+class TestProfilerMiddleware:
+    """Pruebas de ProfilerMiddleware"""
+
+    def test_sin_header_no_perfila(self):
+        """✅ Sin header ni muestreo el request pasa directo"""
+        store = ProfileStore()
+        middleware = ProfilerMiddleware(_app, store, token="secreto")
+        _call(middleware, [(b"x-profile", b"otro")])
+        assert store.list() == []
+
+    def test_header_de_admin(self):
+        """✅ Con el header y el token correcto se guarda el perfil"""
+        store = ProfileStore()
+        middleware = ProfilerMiddleware(_app, store, token="secreto")
+        _call(middleware, [(b"x-profile", b"secreto")])
+
+        [record] = store.list()
+        assert (record.path, record.trigger, record.status_code) == (
+            "/x",
+            "header",
+            200,
+        )
+        assert record.duration > 0
+
+    def test_muestreo_y_ring_buffer(self):
+        """✅ Con sample rate 1 se perfila todo y el buffer guarda los últimos"""
+        store = ProfileStore(size=2)
+        middleware = ProfilerMiddleware(_app, store, token=None, sample_rate=1.0)
+        for _ in range(3):
+            _call(middleware)
+
+        assert [r.id for r in store.list()] == [3, 2]
+        assert all(r.trigger == "sample" for r in store.list())
+        assert middleware._sampled == 0
+
+
+class TestProfilerRouter:
+    """Pruebas de /admin/profiles"""
+
+    def test_requiere_token(self, test_client):
+        """❌ Sin token de admin responde 401"""
+        assert test_client.get("/admin/profiles").status_code == 401
+
+    def test_perfil_de_un_request(self, test_client):
+        """✅ Un request con X-Profile se puede ver como texto y speedscope"""
+        test_client.get("/", headers=PROFILE)
+
+        [summary] = test_client.get("/admin/profiles", headers=AUTH).json()
+        assert (summary["method"], summary["path"], summary["trigger"]) == (
+            "GET",
+            "/",
+            "header",
+        )
+
+        url = f"/admin/profiles/{summary['id']}"
+        text = test_client.get(url, params={"format": "text"}, headers=AUTH)
+        assert text.status_code == 200
+        speedscope = test_client.get(url, params={"format": "speedscope"}, headers=AUTH)
+        assert "profiles" in json.loads(speedscope.content)
+
+    def test_perfil_inexistente(self, test_client):
+        """❌ Un id que ya salió del buffer responde 404"""
+        assert test_client.get("/admin/profiles/999", headers=AUTH).status_code == 404
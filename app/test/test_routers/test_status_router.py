@@ -0,0 +1,41 @@
+"""
+Pruebas del endpoint SSE de estado de pago
+- Sesión inexistente
+- Estado actual en formato text/event-stream
+"""
+
+import json
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.services import status_stream
+
+
+@pytest.fixture
+def status_client(test_client, test_engine, monkeypatch):
+    monkeypatch.setattr(status_stream, "SessionLocal", sessionmaker(bind=test_engine))
+    return test_client
+
+
+class TestStatusRouter:
+    """Pruebas de /payments/{session_id}/events"""
+
+    def test_sesion_inexistente(self, status_client):
+        """❌ Una sesión que no existe responde 404"""
+        response = status_client.get("/payments/no-existe/events")
+        assert response.status_code == 404
+
+    def test_estado_terminal_cierra_el_stream(
+        self, status_client, create_test_transaction
+    ):
+        """✅ Emite el estado actual y cierra si ya es terminal"""
+        create_test_transaction(session_id="s-ok", status="approved", payment_id="MP_1")
+
+        response = status_client.get("/payments/s-ok/events")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event, data = response.text.strip().split("\n")
+        assert event == "event: status"
+        assert json.loads(data[len("data: "):]) == {
+            "session_id": "s-ok", "status": "approved", "payment_id": "MP_1",
+        }
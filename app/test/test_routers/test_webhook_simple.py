@@ -157,4 +157,36 @@ class TestWebhookRouterSimple:
         assert response.status_code == 200
         response_json = response.json()
         assert response_json["status"] == "error"
-        assert "Sesión no encontrada" in response_json["detail"]
\ No newline at end of file
+        assert "Sesión no encontrada" in response_json["detail"]
+    
+    @patch('app.services.webhook_service.publish_event')
+    @patch('requests.get')
+    def test_pago_rechazado_publica_payload_estructurado(
+        self, mock_get, mock_publish, test_client, create_test_transaction
+    ):
+        """✅ Un pago rechazado publica el mismo payload estructurado con ordering key"""
+        # Arrange
+        session_id = "test-session-rejected"
+        create_test_transaction(session_id=session_id, status="pending")
+
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            "id": 123456,
+            "status": "rejected",
+            "external_reference": json.dumps({"sessionId": session_id})
+        }
+        mock_response.raise_for_status.return_value = None
+        mock_get.return_value = mock_response
+
+        # Act
+        body = {"type": "payment", "data": {"id": 123456}}
+        response = test_client.post("/webhooks/mercadopago", json=body)
+
+        # Assert
+        assert response.json()["status"] == "ok"
+        event_type, payload = mock_publish.call_args[0]
+        assert event_type == "payment_status_changed"
+        assert payload["status"] == "failed"
+        assert payload["mp_status"] == "rejected"
+        assert payload["session_id"] == session_id
+        assert mock_publish.call_args[1]["ordering_key"] == session_id
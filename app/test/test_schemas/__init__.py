@@ -0,0 +1 @@
+# Tests para schema GraphQL y extensiones
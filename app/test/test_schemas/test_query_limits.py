@@ -0,0 +1,119 @@
+"""
+Pruebas unitarias para los límites de queries GraphQL
+- Modelo de costo por campo
+- Rechazo de operaciones costosas antes de ejecutar
+- Límites de profundidad y alias
+- Reporte del costo en métricas
+"""
+
+import asyncio
+from unittest.mock import patch
+from graphql import parse
+from app.schemas.schema import schema
+from app.schemas.query_limits import (
+    FIELD_COSTS,
+    GRAPHQL_MAX_COST,
+    operation_cost,
+    query_cost_histogram,
+)
+
+CREATE_PREFERENCE = """
+    {alias}: createPreference(
+        input: {{items: [{{title: "t", quantity: 1, unitPrice: 5}}]}}
+    ) {{
+        id
+        items {{ title }}
+    }}
+"""
+
+
+def _mutations(copies):
+    aliases = (CREATE_PREFERENCE.format(alias=f"a{i}") for i in range(copies))
+    return "mutation {" + "".join(aliases) + "}"
+
+
+def _cost(query, variables=None, operation_name=None):
+    return operation_cost(schema._schema, parse(query), operation_name, variables or {})
+
+
+def _execute(query):
+    return asyncio.run(schema.execute(query))
+
+
+class TestOperationCost:
+    """Pruebas del cálculo de costo"""
+
+    def test_escalares_no_suman(self):
+        """✅ Una query de escalares tiene costo cero"""
+        assert _cost("{ ping }") == 0
+
+    def test_campos_de_mercadopago_pesan_mas(self):
+        """✅ createPreference usa el peso configurado más sus objetos anidados"""
+        query = "mutation {" + CREATE_PREFERENCE.format(alias="a") + "}"
+
+        # createPreference + items (lista de objetos)
+        assert _cost(query) == FIELD_COSTS["Mutation.createPreference"] + 1
+
+    def test_alias_multiplican_el_costo(self):
+        """✅ Cada alias de un campo costoso se cobra por separado"""
+        query = _mutations(3)
+
+        assert _cost(query) == 3 * (FIELD_COSTS["Mutation.createPreference"] + 1)
+
+    def test_fragmentos_cuentan(self):
+        """✅ Los campos dentro de fragmentos se incluyen en el costo"""
+        query = """
+            mutation { createPreference(input: {items: []}) { ...Pago } }
+            fragment Pago on Payment { payer { email } }
+        """
+
+        assert _cost(query) == FIELD_COSTS["Mutation.createPreference"] + 1
+
+
+class TestQueryCostLimiter:
+    """Pruebas de la extensión de costo en el schema"""
+
+    def test_rechaza_operacion_costosa_sin_ejecutar(self):
+        """❌ Una operación sobre el máximo no llega a MercadoPago"""
+        copies = GRAPHQL_MAX_COST // FIELD_COSTS["Mutation.createPreference"] + 1
+        query = _mutations(copies)
+
+        with patch(
+            "app.mutations.payment_mutation.mp_service.create_preference"
+        ) as create:
+            result = _execute(query)
+
+        create.assert_not_called()
+        assert result.data is None
+        assert result.errors[0].extensions["code"] == "QUERY_TOO_EXPENSIVE"
+
+    def test_reporta_costo_en_metricas_y_extensiones(self):
+        """✅ El costo se observa en el histograma y vuelve en extensions"""
+        before = query_cost_histogram.count(operation_type="query")
+
+        result = _execute("{ price(credits: 250) { cost } }")
+
+        assert result.errors is None
+        assert query_cost_histogram.count(operation_type="query") == before + 1
+        assert result.extensions["cost"] == {
+            "requested": 1,
+            "maximum": GRAPHQL_MAX_COST,
+        }
+
+    def test_limite_de_alias(self):
+        """❌ Demasiados alias se rechazan en la validación"""
+        query = "{" + " ".join(f"p{i}: ping" for i in range(50)) + "}"
+
+        result = _execute(query)
+
+        assert result.errors
+        assert "aliases" in result.errors[0].message
+
+    def test_metricas_expuestas(self, test_client):
+        """✅ /metrics expone el histograma de costo en formato Prometheus"""
+        test_client.post("/payments-be", json={"query": "{ ping }"})
+
+        response = test_client.get("/metrics")
+
+        assert response.status_code == 200
+        assert 'graphql_query_cost_count{operation_type="query"}' in response.text
@@ -0,0 +1,96 @@
+"""
+Pruebas de la query paymentStats
+- Respuesta desde los rollups con conversión (por cohorte) y revenue
+- Requiere token
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from app.schemas.schema import schema
+from app.services.payment_state import APPROVED, apply_transition
+from app.services.payment_stats import CONVERTED, CREATED, fold_deltas, record_event
+
+QUERY = """
+query Stats($from: DateTime!, $to: DateTime!) {
+  paymentStats(from: $from, to: $to, granularity: DAY) {
+    bucketStart tier created approved revenue converted conversionRate
+  }
+}
+"""
+VARIABLES = {"from": "2026-10-01T00:00:00", "to": "2026-11-01T00:00:00"}
+
+
+def _context(test_db, token):
+    request = Mock()
+    request.headers = {"authorization": f"Bearer {token}"}
+    return {"db": test_db, "request": request}
+
+
+class TestPaymentStatsQuery:
+    """Pruebas de paymentStats"""
+
+    def test_estadisticas_por_dia(self, test_db):
+        """✅ Devuelve sesiones, aprobados, revenue y conversión por paquete"""
+        at = datetime(2026, 10, 19, 12)
+        for _ in range(4):
+            record_event(test_db, CREATED, 250, at=at)
+        record_event(test_db, APPROVED, 250, at=at)
+        record_event(test_db, CONVERTED, 250, at=at)
+        test_db.commit()
+        fold_deltas(test_db)
+
+        result = schema.execute_sync(
+            QUERY, VARIABLES, context_value=_context(test_db, "TEST_STATS_TOKEN")
+        )
+
+        assert result.errors is None
+        assert result.data["paymentStats"] == [{
+            "bucketStart": "2026-10-19T00:00:00",
+            "tier": 250,
+            "created": 4,
+            "approved": 1,
+            "revenue": 5.0,
+            "converted": 1,
+            "conversionRate": 0.25,
+        }]
+
+    def test_conversion_por_cohorte(self, test_db, create_test_transaction):
+        """✅ Una sesión aprobada al día siguiente convierte en el día en que se creó"""
+        created_at = datetime(2026, 10, 19, 23)
+        create_test_transaction(
+            session_id="s1", status="pending", credits=250, created_at=created_at
+        )
+        record_event(test_db, CREATED, 250, at=created_at)
+        with patch(
+            "app.services.payment_state.utcnow",
+            return_value=created_at + timedelta(hours=2),
+        ), patch(
+            "app.services.payment_stats.utcnow",
+            return_value=created_at + timedelta(hours=2),
+        ):
+            apply_transition(test_db, "s1", APPROVED, "MP_1", amount=4.5)
+        fold_deltas(test_db)
+
+        result = schema.execute_sync(
+            QUERY, VARIABLES, context_value=_context(test_db, "TEST_STATS_TOKEN")
+        )
+
+        assert result.errors is None
+        by_day = {b["bucketStart"]: b for b in result.data["paymentStats"]}
+        created_day = by_day["2026-10-19T00:00:00"]
+        approved_day = by_day["2026-10-20T00:00:00"]
+        assert (created_day["created"], created_day["approved"]) == (1, 0)
+        assert (created_day["converted"], created_day["conversionRate"]) == (1, 1.0)
+        assert (approved_day["created"], approved_day["approved"]) == (0, 1)
+        assert (approved_day["converted"], approved_day["conversionRate"]) == (0, None)
+        # Revenue con lo cobrado, no con el precio del paquete
+        assert approved_day["revenue"] == 4.5
+
+    def test_sin_token(self, test_db):
+        """❌ Sin token válido no devuelve datos"""
+        result = schema.execute_sync(
+            QUERY, VARIABLES, context_value=_context(test_db, "otro")
+        )
+
+        assert result.data is None
+        assert "No autorizado" in result.errors[0].message
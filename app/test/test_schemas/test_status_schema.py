@@ -0,0 +1,146 @@
+"""
+Pruebas de la query awaitSessionStatus (long-poll)
+- Responde apenas cambia el estado
+- Estado actual al vencer el timeout o si ya es terminal
+- Sesión inexistente
+- Subscription paymentStatus por WebSocket con GRAPHQL_PERSISTED_ONLY
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.schemas.persisted_only import PersistedQueryAllowList
+from app.schemas.schema import schema
+from app.services import status_stream
+from app.services.persisted_queries import PersistedQueryRegistry, query_hash
+from app.services.status_broker import status_broker, status_event
+
+QUERY = """
+query Await($sessionId: String!, $timeout: Float!) {
+  awaitSessionStatus(sessionId: $sessionId, timeout: $timeout) {
+    sessionId status paymentId
+  }
+}
+"""
+
+SUBSCRIPTION = """
+subscription Status($sessionId: String!) {
+  paymentStatus(sessionId: $sessionId) { sessionId status paymentId }
+}
+"""
+
+
+@pytest.fixture(autouse=True)
+def status_db(test_engine, monkeypatch):
+    monkeypatch.setattr(status_stream, "SessionLocal", sessionmaker(bind=test_engine))
+
+
+def _await(session_id, timeout):
+    variables = {"sessionId": session_id, "timeout": timeout}
+    return asyncio.run(schema.execute(QUERY, variables))
+
+
+class TestAwaitSessionStatus:
+    """Pruebas de awaitSessionStatus"""
+
+    def test_responde_al_cambiar_el_estado(self, create_test_transaction):
+        """✅ Devuelve el nuevo estado apenas se publica"""
+        create_test_transaction(session_id="s-wait", status="pending", payment_id="")
+
+        def publish_when_waiting():
+            while len(status_broker) == 0:
+                time.sleep(0.001)
+            status_broker.publish("s-wait", status_event("s-wait", "approved", "MP_1"))
+
+        thread = threading.Thread(target=publish_when_waiting)
+        thread.start()
+        result = _await("s-wait", 5)
+        thread.join()
+
+        assert result.errors is None
+        assert result.data["awaitSessionStatus"] == {
+            "sessionId": "s-wait",
+            "status": "approved",
+            "paymentId": "MP_1",
+        }
+
+    def test_timeout_devuelve_estado_actual(self, create_test_transaction):
+        """✅ Sin cambios devuelve el estado actual al vencer el timeout"""
+        create_test_transaction(session_id="s-idle", status="pending", payment_id="")
+
+        result = _await("s-idle", 0.05)
+
+        assert result.data["awaitSessionStatus"]["status"] == "pending"
+        assert len(status_broker) == 0
+
+    def test_estado_terminal_responde_enseguida(self, create_test_transaction):
+        """✅ Una sesión ya terminada responde sin esperar"""
+        create_test_transaction(
+            session_id="s-done", status="approved", payment_id="MP_9"
+        )
+
+        result = _await("s-done", 30)
+
+        assert result.data["awaitSessionStatus"]["paymentId"] == "MP_9"
+
+    def test_sesion_inexistente(self):
+        """❌ Una sesión que no existe devuelve error"""
+        result = _await("no-existe", 0.05)
+
+        assert result.errors and "Sesión no encontrada" in result.errors[0].message
+
+
+class TestPaymentStatusSubscriptionAllowList:
+    """Pruebas de paymentStatus por WebSocket en modo allow-list"""
+
+    @pytest.fixture(autouse=True)
+    def persisted_only(self):
+        # Como GRAPHQL_PERSISTED_ONLY=true con la subscription en el manifest
+        registry = PersistedQueryRegistry(
+            {query_hash(SUBSCRIPTION): SUBSCRIPTION}, allow_list_only=True
+        )
+        with patch.object(PersistedQueryAllowList, "registry", registry):
+            yield
+
+    def _subscribe(self, test_client, query, session_id):
+        with test_client.websocket_connect(
+            "/payments-be", subprotocols=["graphql-transport-ws"]
+        ) as ws:
+            ws.send_json({"type": "connection_init"})
+            assert ws.receive_json()["type"] == "connection_ack"
+            ws.send_json({
+                "id": "1",
+                "type": "subscribe",
+                "payload": {"query": query, "variables": {"sessionId": session_id}},
+            })
+            return ws.receive_json()
+
+    def test_subscription_del_manifest(self, test_client, create_test_transaction):
+        """✅ La subscription registrada recibe el estado de la sesión"""
+        create_test_transaction(session_id="s-ws", status="approved", payment_id="MP")
+
+        message = self._subscribe(test_client, SUBSCRIPTION, "s-ws")
+
+        assert message["type"] == "next"
+        assert message["payload"]["data"]["paymentStatus"] == {
+            "sessionId": "s-ws",
+            "status": "approved",
+            "paymentId": "MP",
+        }
+
+    def test_subscription_fuera_del_manifest(
+        self, test_client, create_test_transaction
+    ):
+        """❌ Otra subscription sobre el mismo campo se rechaza sin ejecutarse"""
+        create_test_transaction(session_id="s-ws", status="approved", payment_id="MP")
+        query = 'subscription { paymentStatus(sessionId: "s-ws") { status } }'
+
+        message = self._subscribe(test_client, query, "s-ws")
+
+        # Strawberry manda el error de una subscription como resultado sin datos
+        assert message["payload"]["data"] is None
+        error = message["payload"]["errors"][0]
+        assert error["extensions"]["code"] == "PERSISTED_QUERY_NOT_ALLOWED"
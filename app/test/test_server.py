@@ -0,0 +1,73 @@
+"""
+Pruebas unitarias para el entrypoint de producción
+- Cantidad de workers según CPUs / cgroup
+- Configuración de uvicorn desde variables de entorno
+"""
+
+from unittest.mock import patch
+import pytest
+from app import server
+
+
+class TestServerConfig:
+    """Pruebas de la configuración del servidor"""
+
+    def test_workers_por_defecto_segun_cpus(self):
+        """✅ Un worker por CPU cuando no hay límite de cgroup"""
+        with patch("os.sched_getaffinity", return_value={0, 1, 2, 3}), \
+             patch.object(server, "_cgroup_cpu_limit", return_value=None):
+            assert server.default_workers() == 4
+
+    def test_workers_respetan_limite_cgroup(self):
+        """✅ El límite de CPU del contenedor acota los workers"""
+        with patch("os.sched_getaffinity", return_value=set(range(16))), \
+             patch.object(server, "_cgroup_cpu_limit", return_value=2.0):
+            assert server.default_workers() == 2
+
+    def test_cgroup_fraccionario_usa_un_worker(self):
+        """✅ Medio CPU asignado sigue siendo al menos un worker"""
+        with patch("os.sched_getaffinity", return_value={0, 1}), \
+             patch.object(server, "_cgroup_cpu_limit", return_value=0.5):
+            assert server.default_workers() == 1
+
+    def test_config_desde_entorno(self):
+        """✅ Keep-alive, backlog y graceful timeout se leen del entorno"""
+        env = {
+            "PORT": "9000",
+            "WEB_CONCURRENCY": "3",
+            "KEEP_ALIVE_TIMEOUT": "75",
+            "BACKLOG": "4096",
+            "GRACEFUL_TIMEOUT": "10",
+        }
+        with patch.dict("os.environ", env):
+            config = server.build_config()
+
+        assert config["app"] == "app.main:app"
+        assert config["port"] == 9000
+        assert config["workers"] == 3
+        assert config["timeout_keep_alive"] == 75
+        assert config["backlog"] == 4096
+        assert config["timeout_graceful_shutdown"] == 10
+        expected_loop = "uvloop" if server._available("uvloop") else "auto"
+        expected_http = "httptools" if server._available("httptools") else "auto"
+        assert config["loop"] == expected_loop
+        assert config["http"] == expected_http
+
+    def test_proxies_de_confianza(self):
+        """✅ Por defecto sólo localhost; los CIDRs del entorno se expanden"""
+        with patch.dict("os.environ", {}, clear=True):
+            assert server.build_config()["forwarded_allow_ips"] == ["127.0.0.1"]
+
+        env = {"FORWARDED_ALLOW_IPS": "10.0.0.0/30, 192.168.1.7"}
+        with patch.dict("os.environ", env):
+            config = server.build_config()
+
+        assert config["forwarded_allow_ips"] == [
+            "10.0.0.0", "10.0.0.1", "10.0.0.2", "10.0.0.3", "192.168.1.7",
+        ]
+
+    @pytest.mark.parametrize("value", ["*", "10.0.0.0/8"])
+    def test_proxies_demasiado_amplios(self, value):
+        """❌ '*' o un CIDR enorme no se aceptan"""
+        with pytest.raises(ValueError):
+            server.forwarded_allow_ips(value)
@@ -0,0 +1,102 @@
+"""
+Pruebas unitarias para el archivado de transacciones
+- Sólo se archivan transacciones terminadas y viejas
+- Archivo .csv.gz verificado antes de borrar
+- Borrado en lotes
+"""
+
+import csv
+import gzip
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import pytest
+from app.models.credit_transaction import CreditTransaction
+from app.services.archive_service import ArchiveError, archive_transactions, stream_rows
+
+OLD = datetime.utcnow() - timedelta(days=400)
+CUTOFF = datetime.utcnow() - timedelta(days=180)
+
+
+@pytest.fixture
+def old_transactions(create_test_transaction):
+    for i in range(5):
+        create_test_transaction(
+            session_id=f"old-ok-{i}", status="approved", created_at=OLD
+        )
+    create_test_transaction(session_id="old-failed", status="failed", created_at=OLD)
+    create_test_transaction(session_id="old-pending", status="pending", created_at=OLD)
+    create_test_transaction(session_id="new-ok", status="approved")
+
+
+def _remaining(test_db):
+    test_db.expire_all()
+    return {t.session_id for t in test_db.query(CreditTransaction)}
+
+
+class TestArchiveService:
+    """Pruebas de archive_transactions"""
+
+    def test_archiva_y_borra_terminadas_viejas(
+        self, test_db, test_engine, old_transactions, tmp_path
+    ):
+        """✅ approved/failed viejas van al archivo y salen de la tabla"""
+        result = archive_transactions(
+            test_engine, CUTOFF, output_dir=tmp_path, batch_size=2, pause_ms=0
+        )
+
+        assert result.archived == 6
+        assert result.deleted == 6
+        assert _remaining(test_db) == {"old-pending", "new-ok"}
+
+        with gzip.open(result.path, "rt", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 6
+        assert {r["status"] for r in rows} == {"approved", "failed"}
+        assert "token" not in rows[0]
+
+    def test_sin_borrar(self, test_db, test_engine, old_transactions, tmp_path):
+        """✅ Con delete_rows=False sólo se genera el archivo"""
+        result = archive_transactions(
+            test_engine, CUTOFF, output_dir=tmp_path, delete_rows=False
+        )
+
+        assert result.archived == 6
+        assert result.deleted == 0
+        assert len(_remaining(test_db)) == 8
+
+    def test_nada_para_archivar(self, test_engine, tmp_path):
+        """✅ Sin filas viejas no queda archivo vacío"""
+        result = archive_transactions(test_engine, CUTOFF, output_dir=tmp_path)
+
+        assert result.path is None
+        assert list(tmp_path.iterdir()) == []
+
+    def test_verificacion_fallida_no_borra(
+        self, test_db, test_engine, old_transactions, tmp_path
+    ):
+        """❌ Si el archivo no tiene todas las filas no se borra nada"""
+        with patch(
+            "app.services.archive_service.read_archive_ids", return_value=iter([1])
+        ):
+            with pytest.raises(ArchiveError):
+                archive_transactions(test_engine, CUTOFF, output_dir=tmp_path)
+
+        assert len(_remaining(test_db)) == 8
+
+    def test_filas_faltantes_en_el_archivo_no_borra(
+        self, test_db, test_engine, old_transactions, tmp_path
+    ):
+        """❌ Si al archivo le faltan filas respecto de la tabla no se borra nada"""
+        def stream_sin_la_primera(*args, **kwargs):
+            rows = stream_rows(*args, **kwargs)
+            next(rows)
+            yield from rows
+
+        with patch(
+            "app.services.archive_service.stream_rows",
+            side_effect=stream_sin_la_primera,
+        ):
+            with pytest.raises(ArchiveError, match="5 filas y la tabla 6"):
+                archive_transactions(test_engine, CUTOFF, output_dir=tmp_path)
+
+        assert len(_remaining(test_db)) == 8
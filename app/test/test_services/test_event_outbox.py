@@ -0,0 +1,165 @@
+"""
+Pruebas unitarias para el outbox de eventos
+- El evento se guarda con la transición, en la misma transacción
+- Publicación en el request y, si falla, desde el relay
+- El relay respeta el orden por ordering key
+"""
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from app.models.event_outbox import OutboxEvent
+from app.services.event_outbox import add_event, dispatch, relay_pending
+from app.services.group_commit import PendingTransition, write_batch
+from app.services.payment_state import (
+    APPROVED,
+    PAYMENT_STATUS_CHANGED,
+    apply_transition,
+)
+
+WEBHOOK_BODY = {"type": "payment", "data": {"id": 123456}}
+
+
+def _payload(result):
+    return {"session_id": result.session_id, "version": result.version}
+
+
+def _mp_response(session_id, status="approved"):
+    response = Mock()
+    response.json.return_value = {
+        "id": 123456,
+        "status": status,
+        "external_reference": json.dumps({"sessionId": session_id}),
+    }
+    response.raise_for_status.return_value = None
+    return response
+
+
+class TestOutbox:
+    """Pruebas del outbox"""
+
+    def test_evento_con_la_transicion(self, test_db, create_test_transaction):
+        """✅ Una transición aplicada deja su evento en el outbox"""
+        create_test_transaction(session_id="s1", status="pending")
+
+        result = apply_transition(test_db, "s1", APPROVED, "MP_1", _payload)
+
+        event = test_db.get(OutboxEvent, result.event_id)
+        assert event.event_type == PAYMENT_STATUS_CHANGED
+        assert event.ordering_key == "s1"
+        assert json.loads(event.payload) == {"session_id": "s1", "version": 2}
+
+    def test_sin_transicion_no_hay_evento(self, test_db, create_test_transaction):
+        """❌ Un aviso repetido no agrega otro evento"""
+        create_test_transaction(session_id="s1", status="approved", payment_id="MP_1")
+
+        result = apply_transition(test_db, "s1", APPROVED, "MP_1", _payload)
+
+        assert result.event_id is None
+        assert test_db.query(OutboxEvent).count() == 0
+
+    def test_evento_en_el_lote(self, test_db, create_test_transaction):
+        """✅ En group commit cada transición aplicada guarda su evento"""
+        for i in range(2):
+            create_test_transaction(session_id=f"s{i}", status="pending", payment_id="")
+
+        results = write_batch(test_db, [
+            PendingTransition(f"s{i}", APPROVED, f"MP_{i}", _payload) for i in range(2)
+        ])
+        test_db.commit()
+
+        events = test_db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+        assert [e.id for e in events] == [results[0].event_id, results[1].event_id]
+        assert [e.ordering_key for e in events] == ["s0", "s1"]
+
+    def test_dispatch_publica_y_borra(self, test_db):
+        """✅ El evento publicado sale del outbox"""
+        event = add_event(test_db, "e", {"n": 1}, ordering_key="k")
+        test_db.commit()
+        publish = Mock()
+
+        published = dispatch(
+            test_db, event.id, "e", {"n": 1}, ordering_key="k", publish=publish
+        )
+
+        assert published is True
+        publish.assert_called_once_with("e", {"n": 1}, ordering_key="k")
+        assert test_db.query(OutboxEvent).count() == 0
+
+    def test_dispatch_fallido_queda_para_el_relay(self, test_db):
+        """❌ Si Pub/Sub falla el evento queda con el error, sin propagarlo"""
+        event = add_event(test_db, "e", {"n": 1}, ordering_key="k")
+        test_db.commit()
+        publish = Mock(side_effect=RuntimeError("caído"))
+
+        published = dispatch(test_db, event.id, "e", {"n": 1}, publish=publish)
+
+        assert published is False
+        test_db.refresh(event)
+        assert (event.attempts, event.last_error) == (1, "caído")
+
+    def test_relay_en_orden_y_por_antiguedad(self, test_db):
+        """✅ El relay publica por id sólo los eventos con la antigüedad mínima"""
+        old = datetime.utcnow() - timedelta(minutes=1)
+        for n in range(2):
+            add_event(test_db, "e", {"n": n}, ordering_key=f"k{n}").created_at = old
+        add_event(test_db, "e", {"n": 2}, ordering_key="k2")
+        test_db.commit()
+        publish = Mock()
+
+        assert relay_pending(test_db, publish=publish, min_age=10) == 2
+
+        assert [c.args[1] for c in publish.call_args_list] == [{"n": 0}, {"n": 1}]
+        pending = [json.loads(e.payload) for e in test_db.query(OutboxEvent)]
+        assert pending == [{"n": 2}]
+
+    def test_relay_no_adelanta_eventos_de_la_misma_key(self, test_db):
+        """❌ Si un evento falla, los siguientes de su key esperan; los demás salen"""
+        for n, key in enumerate(("a", "a", "b")):
+            add_event(test_db, "e", {"n": n}, ordering_key=key)
+        test_db.commit()
+
+        def publish(event_type, payload, ordering_key=None):
+            if payload["n"] == 0:
+                raise RuntimeError("caído")
+
+        publish = Mock(side_effect=publish)
+
+        assert relay_pending(test_db, publish=publish, min_age=0) == 1
+
+        assert [c.args[1]["n"] for c in publish.call_args_list] == [0, 2]
+        pending = test_db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+        assert [(json.loads(e.payload)["n"], e.attempts) for e in pending] == [
+            (0, 1),
+            (1, 0),
+        ]
+
+
+class TestWebhookOutbox:
+    """Pruebas del evento del webhook cuando Pub/Sub falla"""
+
+    @patch(
+        "app.services.webhook_service.publish_event",
+        side_effect=RuntimeError("Pub/Sub caído"),
+    )
+    @patch("requests.get")
+    def test_publicacion_fallida_la_entrega_el_relay(
+        self, mock_get, mock_publish, test_client, test_db, create_test_transaction
+    ):
+        """✅ La transición se confirma aunque Pub/Sub falle y el relay publica"""
+        create_test_transaction(session_id="s-outbox", status="pending", credits=250)
+        mock_get.return_value = _mp_response("s-outbox")
+
+        response = test_client.post("/webhooks/mercadopago", json=WEBHOOK_BODY)
+
+        assert response.json()["status"] == "ok"
+        assert test_db.query(OutboxEvent).one().last_error == "Pub/Sub caído"
+
+        publish = Mock()
+        assert relay_pending(test_db, publish=publish, min_age=0) == 1
+        event_type, payload = publish.call_args.args
+        assert event_type == PAYMENT_STATUS_CHANGED
+        assert (payload["status"], payload["credits"]) == ("approved", 250)
+        assert (payload["session_id"], payload["version"]) == ("s-outbox", 2)
+        assert publish.call_args.kwargs["ordering_key"] == "s-outbox"
+        assert test_db.query(OutboxEvent).count() == 0
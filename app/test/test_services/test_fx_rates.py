@@ -0,0 +1,189 @@
+"""
+Pruebas unitarias para tipos de cambio y precios por moneda
+- Proveedor local (fake) y stale-while-revalidate
+- Precios precalculados y redondeados por moneda
+- Query price/prices con moneda destino
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+import pytest
+from app.services import fx_rates
+from app.services.fx_rates import (
+    FxRateUnavailable,
+    RateTable,
+    default_provider,
+    rate_table,
+    static_provider,
+)
+from app.services.price_catalog import PriceCatalog
+
+
+def _wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class TestRateTable:
+    """Pruebas de RateTable"""
+
+    def test_proveedor_local(self):
+        """✅ El proveedor fake se configura con un string"""
+        table = RateTable(static_provider("ARS=1000, brl=5.5"))
+        table.refresh()
+
+        assert table.rate("ars") == 1000
+        assert table.rate("BRL") == 5.5
+        assert table.rate("USD") == 1.0
+
+    def test_moneda_desconocida(self):
+        """❌ Una moneda sin tipo de cambio se rechaza"""
+        table = RateTable(static_provider({"ARS": 1000}))
+        table.refresh()
+
+        with pytest.raises(ValueError, match="Moneda no soportada"):
+            table.rate("XYZ")
+
+    def test_stale_while_revalidate(self):
+        """✅ Con la tabla vencida se responde la vieja y se refresca en segundo plano"""
+        release = threading.Event()
+        rates = iter([{"ARS": 1000}, {"ARS": 1100}])
+
+        def provider():
+            table = next(rates)
+            if table["ARS"] == 1100:
+                release.wait(1)
+            return table
+
+        table = RateTable(provider, interval=0, max_staleness=60)
+        table.refresh()
+
+        assert table.rate("ARS") == 1000  # vieja, sin esperar a la red
+        release.set()
+        assert _wait_for(lambda: table.rate("ARS") == 1100)
+
+    def test_falla_del_proveedor_mantiene_tabla(self):
+        """✅ Si el refresco falla se sigue usando la tabla anterior"""
+        provider = Mock(side_effect=[{"ARS": 1000}, RuntimeError("API caída")])
+        table = RateTable(provider, interval=0, max_staleness=60)
+        table.refresh()
+
+        table.rate("ARS")
+        assert _wait_for(lambda: provider.call_count == 2)
+        assert table.rate("ARS") == 1000
+
+    def test_sin_tabla_no_espera_a_la_red(self):
+        """✅ Sin tabla la lectura falla enseguida; el refresco va en segundo plano"""
+        release = threading.Event()
+
+        def provider():
+            release.wait(1)
+            return {"ARS": 1000}
+
+        table = RateTable(provider)
+
+        started = time.monotonic()
+        with pytest.raises(FxRateUnavailable):
+            table.rate("ARS")
+        assert time.monotonic() - started < 0.5
+        release.set()
+        assert _wait_for(lambda: table._snapshot is not None)
+        assert table.rate("ARS") == 1000
+
+    def test_sin_tabla_y_proveedor_caido(self):
+        """❌ Sin ninguna tabla cargada y el proveedor caído no hay precio"""
+        provider = Mock(side_effect=RuntimeError("API caída"))
+        table = RateTable(provider, failure_backoff=60)
+
+        with pytest.raises(FxRateUnavailable):
+            table.rate("ARS")
+        assert _wait_for(lambda: provider.call_count == 1 and not table._revalidating)
+
+        # Durante el backoff los requests no vuelven a intentar
+        for _ in range(5):
+            with pytest.raises(FxRateUnavailable):
+                table.rate("ARS")
+        time.sleep(0.05)
+        assert provider.call_count == 1
+
+    def test_sin_proveedor_configurado(self):
+        """❌ Sin FX_PROVIDER sólo hay moneda base: no se consulta ningún endpoint"""
+        with patch.object(fx_rates, "FX_PROVIDER", ""):
+            assert default_provider() is None
+        with patch.object(fx_rates, "FX_PROVIDER", "http"), patch.object(
+            fx_rates, "FX_RATES_URL", ""
+        ):
+            with pytest.raises(ValueError, match="FX_RATES_URL"):
+                default_provider()
+
+        table = RateTable(None)
+        with pytest.raises(FxRateUnavailable, match="FX_PROVIDER"):
+            table.rate("ARS")
+        assert PriceCatalog(table).price(250, "USD") == 5.0
+
+
+class TestPriceCatalog:
+    """Pruebas de PriceCatalog"""
+
+    def test_precios_convertidos_y_redondeados(self):
+        """✅ Se convierte y redondea según los decimales de la moneda"""
+        rates = RateTable(static_provider({"BRL": 5.1234, "CLP": 950.5}))
+        rates.refresh()
+        catalog = PriceCatalog(rates)
+
+        assert catalog.prices("BRL") == {250: 25.62, 750: 61.48, 1500: 102.47}
+        assert catalog.price(250, "CLP") == 4753.0
+
+    def test_precalcula_por_version(self):
+        """✅ La tabla de una moneda se calcula una vez por refresco"""
+        rates = RateTable(static_provider({"ARS": 1000}))
+        rates.refresh()
+        catalog = PriceCatalog(rates)
+
+        first = catalog.prices("ARS")
+        assert catalog.prices("ARS") is first
+        rates.refresh()
+        assert catalog.prices("ARS") is not first
+
+    def test_moneda_base_sin_tipos_de_cambio(self):
+        """✅ USD responde aunque el proveedor no esté disponible"""
+        catalog = PriceCatalog(RateTable(Mock(side_effect=RuntimeError("API caída"))))
+
+        assert catalog.price(750, "USD") == 12.0
+
+
+class TestPriceQuery:
+    """Pruebas de price/prices con moneda"""
+
+    @pytest.fixture(autouse=True)
+    def rates(self):
+        rate_table.refresh()
+
+    def test_price_en_moneda_destino(self):
+        """✅ price acepta la moneda destino"""
+        from app.schemas.schema import schema
+
+        result = asyncio.run(
+            schema.execute('{ price(credits: 250, currency: "ARS") { cost currency } }')
+        )
+
+        assert result.errors is None
+        assert result.data["price"] == {"cost": 5000.0, "currency": "ARS"}
+
+    def test_prices_lista_todos_los_paquetes(self):
+        """✅ prices devuelve todos los paquetes en la moneda pedida"""
+        from app.schemas.schema import schema
+
+        result = asyncio.run(
+            schema.execute('{ prices(currency: "ARS") { credits cost } }')
+        )
+
+        assert result.data["prices"] == [
+            {"credits": 250, "cost": 5000.0},
+            {"credits": 750, "cost": 12000.0},
+            {"credits": 1500, "cost": 20000.0},
+        ]
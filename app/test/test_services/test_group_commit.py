@@ -0,0 +1,216 @@
+"""
+Pruebas unitarias para el group commit de transiciones
+- Varias sesiones en un único UPDATE ... FROM (VALUES ...)
+- Transiciones sucesivas de la misma sesión dentro del lote
+- Avisos repetidos y sesiones inexistentes
+- Writer: lote por tiempo/tamaño y futures resueltos después del commit
+- Timeout de apply: se cancela lo encolado, no lo que ya está en un lote
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from app.models.credit_transaction import CreditTransaction
+from app.models.payment_stats_delta import PaymentStatsDelta
+from app.services.group_commit import GroupCommitWriter, PendingTransition, write_batch
+from app.services.payment_stats import CONVERTED, DAY, fold_deltas, query_stats
+
+
+class TestWriteBatch:
+    """Pruebas de write_batch"""
+
+    def test_un_update_para_todo_el_lote(
+        self, test_db, test_engine, create_test_transaction
+    ):
+        """✅ Las transiciones de sesiones distintas van en un único UPDATE"""
+        for i in range(3):
+            create_test_transaction(session_id=f"s{i}", status="pending", payment_id="")
+        updates = []
+
+        def capture(conn, cursor, statement, *args):
+            if statement.startswith("UPDATE"):
+                updates.append(statement)
+
+        event.listen(test_engine, "before_cursor_execute", capture)
+
+        items = [PendingTransition(f"s{i}", "approved", f"MP_{i}") for i in range(3)]
+        results = write_batch(test_db, items)
+        test_db.commit()
+
+        assert len(updates) == 1 and "FROM (VALUES" in updates[0]
+        assert [results[i].applied for i in range(3)] == [True, True, True]
+        assert results[1].payment_id == "MP_1" and results[1].version == 2
+        rows = (
+            test_db.query(CreditTransaction.session_id, CreditTransaction.status)
+            .order_by(CreditTransaction.session_id)
+            .all()
+        )
+        assert [tuple(r) for r in rows] == [
+            ("s0", "approved"),
+            ("s1", "approved"),
+            ("s2", "approved"),
+        ]
+
+    def test_misma_sesion_en_orden(self, test_db, create_test_transaction):
+        """✅ Dos transiciones de la misma sesión se aplican en orden de llegada"""
+        create_test_transaction(session_id="s1", status="pending", payment_id="")
+
+        results = write_batch(test_db, [
+            PendingTransition("s1", "pending", "MP_1"),
+            PendingTransition("s1", "approved", "MP_1"),
+        ])
+
+        assert (results[0].applied, results[1].applied) == (True, True)
+        assert results[1].version == 3
+
+    def test_repetidos_e_inexistentes(self, test_db, create_test_transaction):
+        """❌ Un aviso repetido no se aplica y una sesión inexistente no da resultado"""
+        create_test_transaction(session_id="done", status="approved", payment_id="MP_1")
+
+        results = write_batch(test_db, [
+            PendingTransition("done", "failed", "MP_1"),
+            PendingTransition("no-existe", "approved", "MP_2"),
+        ])
+
+        assert (results[0].applied, results[0].status) == (False, "approved")
+        assert 1 not in results
+
+    def test_rechazado_y_aprobado_con_otro_pago(self, test_db, create_test_transaction):
+        """✅ failed → approved se aplica sólo con un payment_id nuevo"""
+        create_test_transaction(session_id="r1", status="failed", payment_id="MP_1")
+        create_test_transaction(session_id="r2", status="failed", payment_id="MP_2")
+
+        results = write_batch(test_db, [
+            PendingTransition("r1", "approved", "MP_1"),
+            PendingTransition("r2", "approved", "MP_3"),
+        ])
+
+        assert (results[0].applied, results[0].status) == (False, "failed")
+        assert (results[1].applied, results[1].payment_id) == (True, "MP_3")
+
+    def test_rollups_agrupados(self, test_db, create_test_transaction):
+        """✅ Los rollups suman las transiciones del lote"""
+        for i in range(3):
+            create_test_transaction(
+                session_id=f"s{i}", status="pending", payment_id="", credits=250
+            )
+
+        write_batch(
+            test_db,
+            [PendingTransition(f"s{i}", "approved", f"MP_{i}") for i in range(3)],
+        )
+        test_db.commit()
+        fold_deltas(test_db)
+
+        now = datetime.utcnow()
+        stats = query_stats(test_db, now.replace(hour=0), now.replace(hour=23), DAY)
+        assert stats[0].counts["approved"] == 3
+
+    def test_conversion_por_cohorte_y_monto_cobrado(
+        self, test_db, create_test_transaction
+    ):
+        """✅ Las conversiones van a la hora de creación y suman lo cobrado"""
+        created_at = datetime(2026, 10, 1, 9, 30)
+        for i in range(2):
+            create_test_transaction(
+                session_id=f"s{i}",
+                status="pending",
+                payment_id="",
+                credits=250,
+                created_at=created_at,
+            )
+
+        write_batch(test_db, [
+            PendingTransition("s0", "approved", "MP_0", amount=4.0),
+            PendingTransition("s1", "approved", "MP_1"),
+        ])
+
+        converted = test_db.query(PaymentStatsDelta).filter_by(status=CONVERTED).one()
+        assert (converted.at, converted.count) == (datetime(2026, 10, 1, 9), 2)
+        # s1 sin monto: precio del paquete
+        assert converted.amount == 9.0
+
+
+class TestGroupCommitWriter:
+    """Pruebas de GroupCommitWriter"""
+
+    @pytest.fixture
+    def writer(self, test_engine):
+        writer = GroupCommitWriter(
+            sessionmaker(bind=test_engine), max_delay_ms=100, max_batch=10
+        )
+        yield writer
+        writer.close()
+
+    def test_junta_las_transiciones_en_un_lote(self, writer, create_test_transaction):
+        """✅ Transiciones concurrentes se escriben en un solo commit"""
+        for i in range(4):
+            create_test_transaction(session_id=f"s{i}", status="pending", payment_id="")
+        batches = []
+        flush = writer.flush
+        writer.flush = lambda items: (batches.append(len(items)), flush(items))
+
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(
+                lambda i: writer.apply(f"s{i}", "approved", f"MP_{i}"), range(4)
+            ))
+
+        assert batches == [4]
+        assert all(r.applied for r in results)
+
+    def test_sesion_inexistente(self, writer):
+        """❌ Una sesión inexistente falla como apply_transition"""
+        with pytest.raises(Exception, match="Sesión no encontrada"):
+            writer.apply("no-existe", "approved", "MP_1")
+
+    def test_error_del_lote(self, writer):
+        """❌ Si el lote falla, todas las transiciones reciben el error"""
+        with patch(
+            "app.services.group_commit.write_batch",
+            side_effect=RuntimeError("DB caída"),
+        ):
+            futures = [writer.submit(f"s{i}", "approved", "MP") for i in range(2)]
+            errors = [f.exception(timeout=1) for f in futures]
+
+        assert [str(e) for e in errors] == ["DB caída", "DB caída"]
+
+    def test_estado_destino_invalido(self, writer):
+        """❌ Un estado destino desconocido se rechaza al encolar"""
+        with pytest.raises(ValueError):
+            writer.submit("s1", "refunded", "MP_1")
+
+    def test_timeout_con_el_lote_en_curso(
+        self, test_engine, test_db, create_test_transaction
+    ):
+        """✅ Si el timeout vence con el lote escribiéndose, apply espera su commit"""
+        for i in range(2):
+            create_test_transaction(
+                session_id=f"s{i}", status="pending", payment_id=""
+            )
+        writer = GroupCommitWriter(
+            sessionmaker(bind=test_engine), max_delay_ms=0, max_batch=1
+        )
+        entered, release = threading.Event(), threading.Event()
+        flush = writer.flush
+        writer.flush = lambda items: (entered.set(), release.wait(5), flush(items))
+
+        with ThreadPoolExecutor(1) as pool:
+            running = pool.submit(writer.apply, "s0", "approved", "MP_0", timeout=0.05)
+            assert entered.wait(5)
+            # s1 queda en la cola detrás del lote bloqueado y se cancela
+            with pytest.raises(TimeoutError):
+                writer.apply("s1", "approved", "MP_1", timeout=0.05)
+            release.set()
+            result = running.result(timeout=5)
+        writer.close()
+
+        assert (result.applied, result.status) == (True, "approved")
+        rows = test_db.query(CreditTransaction.session_id, CreditTransaction.status)
+        assert sorted(tuple(r) for r in rows) == [
+            ("s0", "approved"),
+            ("s1", "pending"),
+        ]
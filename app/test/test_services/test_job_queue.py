@@ -0,0 +1,248 @@
+"""
+Pruebas unitarias para la cola de trabajos en la DB
+- Toma exclusiva y visibility timeout
+- Reintentos con backoff y dead-letter
+- Runner con handlers por cola
+- Avisos de MercadoPago procesados desde la cola
+- Un aviso que falló después del commit no pierde su evento
+"""
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.models.event_outbox import OutboxEvent
+from app.models.job import Job
+from app.models.webhook_inbox import WebhookInbox
+from app.services.event_outbox import OutboxRelay
+from app.services.job_queue import (
+    DEAD,
+    DONE,
+    QUEUED,
+    RUNNING,
+    JobRunner,
+    claim,
+    complete,
+    enqueue,
+    fail,
+    parse_concurrency,
+    retry_delay,
+)
+from app.services.webhook_inbox import (
+    ERROR,
+    PROCESSED,
+    SKIPPED,
+    WEBHOOK_QUEUE,
+    process_entry,
+    record_notification,
+)
+
+
+def _enqueue(db, queue="q", payload=None, **kwargs):
+    job = enqueue(db, queue, payload or {"n": 1}, **kwargs)
+    db.commit()
+    return job
+
+
+class TestJobQueue:
+    """Pruebas de la cola"""
+
+    def test_configuracion_de_concurrencia(self):
+        """✅ La concurrencia por cola se lee de un string"""
+        assert parse_concurrency("webhooks=8, emails=2") == {"webhooks": 8, "emails": 2}
+        assert parse_concurrency("") == {}
+
+    def test_backoff_exponencial_con_tope(self):
+        """✅ La espera crece por intento, con jitter y tope"""
+        assert 1 <= retry_delay(1, base=2, cap=100) <= 2
+        assert 8 <= retry_delay(4, base=2, cap=100) <= 16
+        assert retry_delay(30, base=2, cap=100) <= 100
+
+    def test_un_trabajo_se_toma_una_vez(self, test_db):
+        """✅ Un trabajo tomado no lo ve otro worker"""
+        _enqueue(test_db)
+        _enqueue(test_db, queue="otra")
+
+        jobs = claim(test_db, "q", "w1", limit=5)
+
+        assert len(jobs) == 1
+        job = jobs[0]
+        assert (job.status, job.attempts, job.locked_by) == (RUNNING, 1, "w1")
+        assert claim(test_db, "q", "w2") == []
+
+    def test_visibility_timeout(self, test_db):
+        """✅ Si el worker no termina a tiempo, otro retoma el trabajo"""
+        _enqueue(test_db)
+        job = claim(test_db, "q", "w1", visibility_timeout=-1)[0]
+
+        retaken = claim(test_db, "q", "w2")
+
+        assert [j.id for j in retaken] == [job.id]
+        assert retaken[0].attempts == 2
+        assert complete(test_db, job, "w1") is False
+        assert complete(test_db, retaken[0], "w2") is True
+        assert test_db.get(Job, job.id).status == DONE
+
+    def test_visibility_timeout_sin_intentos_va_a_dead_letter(self, test_db):
+        """❌ Un trabajo que agota sus intentos por visibility timeout no se retoma"""
+        _enqueue(test_db, max_attempts=2)
+        claim(test_db, "q", "w1", visibility_timeout=-1)
+        job = claim(test_db, "q", "w2", visibility_timeout=-1)[0]
+        assert job.attempts == 2
+
+        assert claim(test_db, "q", "w3") == []
+        test_db.refresh(job)
+        assert (job.status, job.attempts, job.locked_by) == (DEAD, 2, None)
+        assert "Visibility timeout" in job.last_error
+        assert claim(test_db, "q", "w3") == []
+
+    def test_no_se_toma_antes_de_run_at(self, test_db):
+        """✅ Un trabajo programado a futuro no se toma todavía"""
+        _enqueue(test_db, run_at=datetime.utcnow() + timedelta(minutes=5))
+
+        assert claim(test_db, "q", "w1") == []
+
+    def test_reintento_y_dead_letter(self, test_db):
+        """❌ Un trabajo que falla se reprograma y, sin intentos, va a dead-letter"""
+        _enqueue(test_db, max_attempts=2)
+
+        job = claim(test_db, "q", "w1")[0]
+        assert fail(test_db, job, "w1", "boom") == "retry"
+        test_db.refresh(job)
+        assert (job.status, job.last_error) == (QUEUED, "boom")
+        assert job.run_at > datetime.utcnow()
+
+        job.run_at = datetime.utcnow()
+        test_db.commit()
+        job = claim(test_db, "q", "w1")[0]
+        assert fail(test_db, job, "w1", "boom otra vez") == DEAD
+        test_db.refresh(job)
+        assert (job.status, job.attempts, job.last_error) == (DEAD, 2, "boom otra vez")
+        assert claim(test_db, "q", "w1") == []
+
+
+class TestJobRunner:
+    """Pruebas de JobRunner"""
+
+    @pytest.fixture
+    def runner(self, test_engine):
+        return JobRunner(
+            session_factory=sessionmaker(bind=test_engine), concurrency={"q": 2}
+        )
+
+    def test_ejecuta_el_handler(self, runner, test_db):
+        """✅ El handler recibe el payload y el trabajo queda terminado"""
+        handler = Mock()
+        runner.register("q", handler)
+        job = _enqueue(test_db, payload={"inbox_id": 7})
+
+        assert runner.run_once("q", "w1") is True
+        assert runner.run_once("q", "w1") is False
+        assert handler.call_args.args[1] == {"inbox_id": 7}
+        test_db.refresh(job)
+        assert job.status == DONE
+
+    def test_error_del_handler_reprograma(self, runner, test_db):
+        """❌ Si el handler falla el trabajo vuelve a la cola con el error"""
+        runner.register("q", Mock(side_effect=RuntimeError("falló")))
+        job = _enqueue(test_db)
+
+        runner.run_once("q", "w1")
+
+        test_db.refresh(job)
+        assert (job.status, job.last_error) == (QUEUED, "falló")
+
+
+class TestWebhookQueue:
+    """Pruebas de los avisos procesados desde la cola"""
+
+    def test_webhook_encola_el_aviso(self, test_client, test_db):
+        """✅ En modo cola el webhook guarda y encola sin procesar"""
+        body = json.dumps({"type": "payment", "data": {"id": 55}}).encode()
+
+        with patch("app.routers.webhook_router.WEBHOOK_PROCESSING", "queue"), patch(
+            "app.routers.webhook_router.process_payment_notification"
+        ) as process:
+            response = test_client.post("/webhooks/mercadopago", content=body)
+
+        assert response.json() == {"status": "ok"}
+        process.assert_not_called()
+        entry = test_db.query(WebhookInbox).one()
+        job = test_db.query(Job).one()
+        assert (job.queue, json.loads(job.payload)) == (
+            WEBHOOK_QUEUE,
+            {"inbox_id": entry.id},
+        )
+
+    def test_handler_procesa_el_aviso(self, test_db):
+        """✅ El handler procesa el pago y anota el resultado en el inbox"""
+        entry = WebhookInbox(topic="payment", payment_id="55", body=b"{}")
+        test_db.add(entry)
+        test_db.commit()
+
+        with patch(
+            "app.services.webhook_inbox.process_payment_notification",
+            return_value=Mock(applied=True),
+        ) as process:
+            process_entry(test_db, {"inbox_id": entry.id})
+
+        assert process.call_args.args[1] == "55"
+        test_db.refresh(entry)
+        assert entry.outcome == PROCESSED
+
+    def test_handler_anota_y_propaga_errores(self, test_db):
+        """❌ Un error queda anotado en el inbox y se propaga para reintentar"""
+        entry = WebhookInbox(topic="payment", payment_id="55", body=b"{}")
+        test_db.add(entry)
+        test_db.commit()
+
+        with patch(
+            "app.services.webhook_inbox.process_payment_notification",
+            side_effect=RuntimeError("MP caído"),
+        ):
+            with pytest.raises(RuntimeError):
+                process_entry(test_db, {"inbox_id": entry.id})
+
+        test_db.refresh(entry)
+        assert (entry.outcome, entry.detail) == (ERROR, "MP caído")
+
+    @patch("app.services.event_outbox.publish_event")
+    @patch("requests.get")
+    def test_reintento_despues_del_commit_publica_el_evento(
+        self, mock_get, mock_publish, test_db, test_engine, create_test_transaction
+    ):
+        """✅ El reintento de un aviso caído después del commit no pierde el evento"""
+        create_test_transaction(session_id="s-cola", status="pending", credits=250)
+        mock_get.return_value = Mock(json=Mock(return_value={
+            "id": 55,
+            "status": "approved",
+            "external_reference": json.dumps({"sessionId": "s-cola"}),
+        }))
+        body = json.dumps({"type": "payment", "data": {"id": 55}}).encode()
+        entry_id = record_notification(test_db, body, queue_job=True)
+        session_factory = sessionmaker(bind=test_engine)
+        runner = JobRunner(session_factory=session_factory)
+        runner.register(WEBHOOK_QUEUE, process_entry)
+
+        # La transición y su evento se confirman; el worker cae antes de publicar
+        with patch(
+            "app.services.webhook_service.dispatch",
+            side_effect=RuntimeError("caída después del commit"),
+        ):
+            runner.run_once(WEBHOOK_QUEUE, "w1")
+        job = test_db.query(Job).one()
+        job.run_at = datetime.utcnow()
+        test_db.commit()
+        runner.run_once(WEBHOOK_QUEUE, "w1")
+
+        test_db.expire_all()
+        assert (job.status, job.attempts) == (DONE, 2)
+        assert test_db.get(WebhookInbox, entry_id).outcome == SKIPPED
+        assert test_db.query(OutboxEvent).count() == 1
+
+        assert OutboxRelay(session_factory).relay(min_age=0) == 1
+        event_type, payload = mock_publish.call_args.args
+        assert event_type == "payment_status_changed"
+        assert (payload["session_id"], payload["credits"]) == ("s-cola", 250)
+        assert test_db.query(OutboxEvent).count() == 0
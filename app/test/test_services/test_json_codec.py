@@ -0,0 +1,77 @@
+"""
+Pruebas unitarias para el codec JSON
+- Ida y vuelta con orjson
+- Tipos extra (Decimal, datetime)
+- Errores de parseo compatibles con json
+- Respuestas HTTP serializadas con el codec
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from app.services import json_codec
+
+
+class TestJsonCodec:
+    """Pruebas del codec JSON"""
+
+    def test_usa_orjson_por_defecto(self):
+        """✅ orjson es el backend por defecto"""
+        assert json_codec.USE_ORJSON is True
+
+    def test_ida_y_vuelta(self):
+        """✅ dumps/loads preservan los datos, con UTF-8 sin escapar"""
+        payload = {
+            "email": "ñandú@example.com",
+            "credits": 750,
+            "ok": True,
+            "extra": None,
+        }
+
+        encoded = json_codec.dumps(payload)
+
+        assert isinstance(encoded, bytes)
+        assert "ñandú".encode("utf-8") in encoded
+        assert json_codec.loads(encoded) == payload
+        assert json.loads(encoded) == payload
+
+    def test_tipos_extra(self):
+        """✅ Decimal y datetime se serializan"""
+        encoded = json_codec.dumps(
+            {"monto": Decimal("12.5"), "fecha": datetime(2025, 1, 2, 3, 4, 5)}
+        )
+
+        assert json_codec.loads(encoded) == {
+            "monto": 12.5,
+            "fecha": "2025-01-02T03:04:05",
+        }
+
+    def test_error_de_parseo_compatible(self):
+        """❌ JSON inválido lanza json.JSONDecodeError"""
+        with pytest.raises(json.JSONDecodeError):
+            json_codec.loads("not-valid-json")
+
+    def test_respuestas_rest_usan_el_codec(self, test_client):
+        """✅ Las respuestas de FastAPI se serializan con el codec"""
+        response = test_client.get("/healthz")
+
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == json_codec.dumps({"status": "ok"})
+
+    def test_respuesta_graphql(self, test_client):
+        """✅ La respuesta GraphQL se serializa con el codec"""
+        response = test_client.post("/payments-be", json={"query": "{ ping }"})
+
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["data"] == {"ping": "pong"}
+
+    def test_graphql_body_invalido(self, test_client):
+        """❌ Un body que no es JSON devuelve 400"""
+        response = test_client.post(
+            "/payments-be",
+            content="{no json",
+            headers={"content-type": "application/json"},
+        )
+
+        assert response.status_code == 400
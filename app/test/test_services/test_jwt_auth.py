@@ -0,0 +1,95 @@
+"""
+Pruebas unitarias para la verificación local de JWT
+- Firma contra el JWKS en memoria, sin llamadas de red
+- LRU de claims por hash del token
+- Rotación de claves y tokens inválidos
+"""
+
+import time
+from unittest.mock import Mock
+import jwt
+import pytest
+from app.services.jwt_auth import InvalidAuthToken, JWKSCache, TokenVerifier
+
+
+@pytest.fixture
+def verifier(auth_jwks):
+    fetch = Mock(return_value=auth_jwks)
+    jwks = JWKSCache(fetch=fetch, min_interval=0)
+    jwks.refresh()
+    return TokenVerifier(jwks, issuer=None, audience=None, cache_size=2)
+
+
+class TestTokenVerifier:
+    """Pruebas de TokenVerifier"""
+
+    def test_token_valido_devuelve_claims(self, verifier, make_jwt):
+        """✅ La firma se valida localmente y se devuelven los claims"""
+        claims = verifier.verify(make_jwt(email="a@b.com"))
+
+        assert claims["email"] == "a@b.com"
+
+    def test_cache_de_claims(self, verifier, make_jwt):
+        """✅ El mismo token no se vuelve a verificar"""
+        token = make_jwt()
+        verifier.verify(token)
+
+        with pytest.MonkeyPatch.context() as mp:
+            decode = Mock(side_effect=AssertionError("no debería verificar"))
+            mp.setattr(jwt, "decode", decode)
+            assert verifier.verify(token)["email"] == "test@test.com"
+
+    def test_lru_acotado(self, verifier, make_jwt):
+        """✅ El cache no crece más allá de su tamaño"""
+        for i in range(5):
+            verifier.verify(make_jwt(user_id=i))
+
+        assert len(verifier._cache) == 2
+
+    def test_token_vencido(self, verifier, make_jwt):
+        """❌ Un token vencido se rechaza"""
+        with pytest.raises(InvalidAuthToken):
+            verifier.verify(make_jwt(exp=int(time.time()) - 3600))
+
+    def test_firma_de_otra_clave(self, verifier):
+        """❌ Un token firmado con otra clave se rechaza"""
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        other = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        token = jwt.encode(
+            {"email": "x@y.com", "exp": int(time.time()) + 60}, other,
+            algorithm="RS256", headers={"kid": "test-key"},
+        )
+
+        with pytest.raises(InvalidAuthToken):
+            verifier.verify(token)
+
+    def test_algoritmo_none_rechazado(self, verifier):
+        """❌ Un token sin firma (alg none) se rechaza"""
+        claims = {"email": "x@y.com", "exp": int(time.time()) + 60}
+        token = jwt.encode(claims, None, algorithm="none")
+
+        with pytest.raises(InvalidAuthToken):
+            verifier.verify(token)
+
+    def test_kid_desconocido_refresca_jwks(self, auth_jwks, make_jwt):
+        """✅ Un kid nuevo (rotación) fuerza un refresco del JWKS"""
+        fetch = Mock(return_value=auth_jwks)
+        jwks = JWKSCache(fetch=fetch, min_interval=0)
+        verifier = TokenVerifier(jwks, issuer=None, audience=None)
+
+        verifier.verify(make_jwt())
+
+        assert fetch.call_count == 1
+
+    def test_refresco_limitado(self, auth_jwks):
+        """❌ Kids desconocidos no disparan refrescos sin límite"""
+        fetch = Mock(return_value=auth_jwks)
+        jwks = JWKSCache(fetch=fetch, min_interval=60)
+        jwks.refresh()
+
+        for _ in range(3):
+            with pytest.raises(InvalidAuthToken):
+                jwks.get_key("otro-kid")
+
+        assert fetch.call_count == 1
@@ -0,0 +1,91 @@
+"""
+Pruebas unitarias para las colas por pago del webhook
+- Avisos del mismo pago en orden y sin solaparse
+- Pagos distintos en paralelo
+- Memoria acotada y métricas de contención
+"""
+
+import asyncio
+from app.services.keyed_lanes import KeyedLanes, lane_waits
+
+
+async def _worker(lanes, key, label, log, delay=0.01):
+    async with lanes.lane(key):
+        log.append(("start", label))
+        await asyncio.sleep(delay)
+        log.append(("end", label))
+
+
+class TestKeyedLanes:
+    """Pruebas de KeyedLanes"""
+
+    def test_mismo_pago_en_orden(self):
+        """✅ Los avisos de un pago se procesan de a uno en orden de llegada"""
+        lanes, log = KeyedLanes("test"), []
+
+        async def run():
+            await asyncio.gather(*(_worker(lanes, "pago-1", i, log) for i in range(3)))
+
+        asyncio.run(run())
+
+        assert log == [
+            ("start", 0), ("end", 0),
+            ("start", 1), ("end", 1),
+            ("start", 2), ("end", 2),
+        ]
+
+    def test_pagos_distintos_en_paralelo(self):
+        """✅ Pagos distintos no se esperan entre sí"""
+        lanes, log = KeyedLanes("test"), []
+
+        async def run():
+            await asyncio.gather(
+                _worker(lanes, "pago-1", "a", log), _worker(lanes, "pago-2", "b", log)
+            )
+
+        asyncio.run(run())
+
+        assert log[:2] == [("start", "a"), ("start", "b")]
+
+    def test_libera_memoria_al_terminar(self):
+        """✅ No quedan locks para pagos sin trabajo pendiente"""
+        lanes = KeyedLanes("test")
+
+        async def run():
+            await asyncio.gather(
+                *(_worker(lanes, f"pago-{i % 3}", i, []) for i in range(9))
+            )
+
+        asyncio.run(run())
+
+        assert len(lanes) == 0
+
+    def test_metrica_de_contencion(self):
+        """✅ Cada espera por otro aviso del mismo pago se cuenta"""
+        lanes = KeyedLanes("contention")
+
+        async def run():
+            await asyncio.gather(*(_worker(lanes, "pago-1", i, []) for i in range(3)))
+
+        asyncio.run(run())
+
+        assert lane_waits.value(lanes="contention") == 2
+
+    def test_libera_la_cola_ante_errores(self):
+        """❌ Si el procesamiento falla la cola del pago se libera igual"""
+        lanes = KeyedLanes("test")
+
+        async def failing():
+            async with lanes.lane("pago-1"):
+                raise RuntimeError("MP caído")
+
+        async def run():
+            try:
+                await failing()
+            except RuntimeError:
+                pass
+            await _worker(lanes, "pago-1", "next", [])
+
+        asyncio.run(run())
+
+        assert len(lanes) == 0
@@ -0,0 +1,29 @@
+"""
+Pruebas unitarias para las métricas en formato Prometheus
+- Escape de los valores de labels
+- Tipos de métrica
+"""
+
+import pytest
+from app.services.metrics import MetricsRegistry, _Metric
+
+
+class TestMetricsFormat:
+    """Pruebas del formato de texto"""
+
+    def test_escapa_valores_de_labels(self):
+        """✅ Barra invertida, comillas y saltos de línea se escapan en los labels"""
+        registry = MetricsRegistry()
+        counter = registry.counter("errores_total", "Errores")
+
+        counter.inc(detail='C:\\tmp "x"\nfin')
+
+        assert 'errores_total{detail="C:\\\\tmp \\"x\\"\\nfin"} 1' in registry.render()
+
+    def test_metrica_sin_muestras_no_se_instancia(self):
+        """❌ Un tipo de métrica sin _samples falla al crearse, no al renderizar"""
+        class Summary(_Metric):
+            kind = "summary"
+
+        with pytest.raises(TypeError):
+            Summary("latencia", "Latencia")
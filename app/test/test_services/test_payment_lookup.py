@@ -0,0 +1,159 @@
+"""
+Pruebas unitarias para las consultas de pago a MercadoPago
+- Single-flight de consultas concurrentes del mismo pago
+- Debounce de avisos en ráfaga (también con la configuración por defecto)
+- Polls que se suman a una llamada ya enviada
+- Errores y métricas
+"""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+import pytest
+from app.services.payment_lookup import PaymentLookup, fetch_payment
+
+
+def _concurrent(lookup, payment_ids, stagger=0.0):
+    results = []
+    threads = []
+    for payment_id in payment_ids:
+        t = threading.Thread(target=lambda p=payment_id: results.append(lookup.get(p)))
+        t.start()
+        threads.append(t)
+        time.sleep(stagger)
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestPaymentLookup:
+    """Pruebas de PaymentLookup"""
+
+    def test_consultas_antes_del_envio_comparten_llamada(self):
+        """✅ Las consultas que llegan mientras la llamada espera la comparten"""
+        fetch_mock = Mock(return_value={"id": "123", "status": "approved"})
+        lookup = PaymentLookup(fetch=fetch_mock, debounce_ms=200)
+
+        results = _concurrent(lookup, ["123"] * 5)
+
+        assert fetch_mock.call_count == 1
+        assert [r["status"] for r in results] == ["approved"] * 5
+
+    def test_consulta_despues_del_envio_no_reusa_la_llamada(self):
+        """✅ Un aviso que llega con el GET ya enviado consulta de nuevo"""
+        sent = threading.Event()
+        release = threading.Event()
+        statuses = iter(["pending", "approved"])
+
+        def fetch(payment_id):
+            status = next(statuses)
+            if status == "pending":
+                sent.set()
+                release.wait(1)
+            return {"id": payment_id, "status": status}
+
+        fetch_mock = Mock(side_effect=fetch)
+        lookup = PaymentLookup(fetch=fetch_mock)
+        first = []
+        t = threading.Thread(target=lambda: first.append(lookup.get("123")))
+        t.start()
+        sent.wait(1)
+
+        second = lookup.get("123")
+        release.set()
+        t.join()
+
+        assert fetch_mock.call_count == 2
+        assert first[0]["status"] == "pending"
+        assert second["status"] == "approved"
+
+    def test_configuracion_por_defecto_junta_avisos_simultaneos(self):
+        """✅ Con el debounce por defecto avisos simultáneos comparten la llamada"""
+        fetch_mock = Mock(return_value={"id": "123", "status": "approved"})
+        lookup = PaymentLookup(fetch=fetch_mock)
+        barrier = threading.Barrier(5)
+
+        def get():
+            barrier.wait()
+            return lookup.get("123")
+
+        threads = [threading.Thread(target=get) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert fetch_mock.call_count == 1
+
+    def test_poll_se_suma_a_una_llamada_enviada(self):
+        """✅ Un poll (fresh=False) usa la llamada en curso aunque ya haya salido"""
+        sent = threading.Event()
+        release = threading.Event()
+
+        def fetch(payment_id):
+            sent.set()
+            release.wait(1)
+            return {"id": payment_id, "status": "approved"}
+
+        fetch_mock = Mock(side_effect=fetch)
+        lookup = PaymentLookup(fetch=fetch_mock)
+        first = []
+        t = threading.Thread(target=lambda: first.append(lookup.get("123")))
+        t.start()
+        sent.wait(1)
+
+        poll = []
+        p = threading.Thread(target=lambda: poll.append(lookup.get("123", fresh=False)))
+        p.start()
+        time.sleep(0.05)
+        release.set()
+        t.join()
+        p.join()
+
+        assert fetch_mock.call_count == 1
+        assert poll[0] is first[0]
+
+    def test_pagos_distintos_no_se_mezclan(self):
+        """✅ Cada pago tiene su propia llamada"""
+        fetch_mock = Mock(side_effect=lambda p: {"id": p})
+        lookup = PaymentLookup(fetch=fetch_mock)
+
+        results = _concurrent(lookup, ["1", "2", "3"])
+
+        assert fetch_mock.call_count == 3
+        assert sorted(r["id"] for r in results) == ["1", "2", "3"]
+
+    def test_debounce_junta_avisos_en_rafaga(self):
+        """✅ Avisos que llegan dentro de la ventana se unen a la misma llamada"""
+        fetch_mock = Mock(return_value={"id": "123", "status": "approved"})
+        lookup = PaymentLookup(fetch=fetch_mock, debounce_ms=100)
+
+        _concurrent(lookup, ["123"] * 4, stagger=0.01)
+
+        assert fetch_mock.call_count == 1
+
+    def test_consultas_secuenciales_no_se_cachean(self):
+        """✅ Sin concurrencia cada consulta va a MercadoPago (datos frescos)"""
+        fetch_mock = Mock(return_value={"id": "123"})
+        lookup = PaymentLookup(fetch=fetch_mock)
+
+        lookup.get("123")
+        lookup.get("123")
+
+        assert fetch_mock.call_count == 2
+
+    def test_error_se_propaga(self):
+        """❌ Un error de MercadoPago llega a quien consultó"""
+        lookup = PaymentLookup(fetch=Mock(side_effect=RuntimeError("API Error")))
+
+        with pytest.raises(RuntimeError, match="API Error"):
+            lookup.get("123")
+
+    @patch("requests.get")
+    def test_fetch_usa_api_de_pagos(self, mock_get):
+        """✅ fetch_payment consulta /v1/payments/{id}"""
+        mock_get.return_value.json.return_value = {"id": 123}
+
+        assert fetch_payment(123) == {"id": 123}
+        assert mock_get.call_args[0][0] == "https://api.mercadopago.com/v1/payments/123"
+        assert mock_get.call_args[1]["timeout"] > 0
@@ -0,0 +1,151 @@
+"""
+Pruebas unitarias para la máquina de estados del pago
+- Transiciones válidas con un único UPDATE condicional
+- Duplicados y transiciones inválidas no escriben
+- Columna de versión
+"""
+
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+from app.models.credit_transaction import CreditTransaction
+from app.services.payment_state import (
+    APPROVED,
+    FAILED,
+    PENDING,
+    apply_transition,
+    can_transition,
+    target_status,
+)
+
+
+class TestPaymentStateMachine:
+    """Pruebas de la máquina de estados"""
+
+    def test_mapeo_de_estados_mercadopago(self):
+        """✅ Los estados de MP se traducen a estados de la transacción"""
+        assert target_status("approved") == APPROVED
+        assert target_status("rejected") == FAILED
+        assert target_status("cancelled") == FAILED
+        assert target_status("in_process") == PENDING
+        assert target_status("refunded") is None
+
+    def test_estados_terminales(self):
+        """✅ approved no tiene salida; failed sólo pasa a approved con otro pago"""
+        assert can_transition(PENDING, APPROVED)
+        assert not can_transition(APPROVED, PENDING)
+        assert not can_transition(APPROVED, FAILED)
+        assert not can_transition(FAILED, PENDING)
+        assert can_transition(FAILED, APPROVED)
+        assert not can_transition(FAILED, APPROVED, new_payment=False)
+
+    def test_aprueba_pendiente(self, test_db, create_test_transaction):
+        """✅ pending → approved se aplica y sube la versión"""
+        transaction = create_test_transaction(session_id="s-1", status=PENDING)
+
+        result = apply_transition(test_db, "s-1", APPROVED, "MP_1")
+
+        assert result.applied is True
+        assert result.email == transaction.email
+        assert result.credits == transaction.credits
+        assert result.version == 2
+        test_db.expire_all()
+        saved = test_db.query(CreditTransaction).filter_by(session_id="s-1").one()
+        assert (saved.status, saved.payment_id, saved.version) == (APPROVED, "MP_1", 2)
+        assert saved.status_changed_at is not None
+
+    def test_aviso_duplicado_no_escribe(self, test_db, create_test_transaction):
+        """✅ Un segundo approved no vuelve a aplicar ni sube la versión"""
+        create_test_transaction(session_id="s-2", status=PENDING)
+        apply_transition(test_db, "s-2", APPROVED, "MP_2")
+
+        result = apply_transition(test_db, "s-2", APPROVED, "MP_2")
+
+        assert result.applied is False
+        assert result.status == APPROVED
+        test_db.expire_all()
+        saved = test_db.query(CreditTransaction).filter_by(session_id="s-2").one()
+        assert saved.version == 2
+
+    def test_pending_tardio_no_pisa_approved(self, test_db, create_test_transaction):
+        """❌ Un pending que llega tarde no sobrescribe approved"""
+        create_test_transaction(session_id="s-3", status=PENDING)
+        apply_transition(test_db, "s-3", APPROVED, "MP_3")
+
+        result = apply_transition(test_db, "s-3", PENDING, "MP_3")
+
+        assert result.applied is False
+        test_db.expire_all()
+        saved = test_db.query(CreditTransaction).filter_by(session_id="s-3").one()
+        assert saved.status == APPROVED
+
+    def test_pending_registra_payment_id_una_vez(
+        self, test_db, create_test_transaction
+    ):
+        """✅ El primer pending asocia el pago; los repetidos se ignoran"""
+        create_test_transaction(session_id="s-4", status=PENDING, payment_id="")
+
+        first = apply_transition(test_db, "s-4", PENDING, "MP_4")
+        second = apply_transition(test_db, "s-4", PENDING, "MP_4")
+
+        assert first.applied is True
+        assert second.applied is False
+
+    def test_rechazado_y_aprobado_con_otro_pago(self, test_db, create_test_transaction):
+        """✅ Un pago nuevo aprobado después de un rechazo acredita la sesión"""
+        create_test_transaction(session_id="s-8", status=PENDING, payment_id="")
+        apply_transition(test_db, "s-8", FAILED, "MP_8")
+
+        result = apply_transition(test_db, "s-8", APPROVED, "MP_9")
+
+        assert result.applied is True
+        assert result.payment_id == "MP_9"
+        test_db.expire_all()
+        saved = test_db.query(CreditTransaction).filter_by(session_id="s-8").one()
+        assert (saved.status, saved.payment_id, saved.version) == (APPROVED, "MP_9", 3)
+
+    def test_rechazado_no_se_aprueba_con_el_mismo_pago(
+        self, test_db, create_test_transaction
+    ):
+        """❌ Un approved del mismo pago rechazado no se aplica"""
+        create_test_transaction(session_id="s-9", status=FAILED, payment_id="MP_10")
+
+        result = apply_transition(test_db, "s-9", APPROVED, "MP_10")
+
+        assert result.applied is False
+        assert result.status == FAILED
+
+    def test_sesion_inexistente(self, test_db):
+        """❌ Una sesión que no existe lanza error"""
+        with pytest.raises(Exception, match="Sesión no encontrada"):
+            apply_transition(test_db, "no-existe", APPROVED, "MP_5")
+
+    def test_version_concurrencia_optimista(
+        self, test_db, test_engine, create_test_transaction
+    ):
+        """❌ Un flush del ORM con versión vieja falla en lugar de pisar datos"""
+        transaction = create_test_transaction(session_id="s-6", status=PENDING)
+        # Otro proceso aplica la transición mientras tenemos la fila cargada
+        with test_engine.begin() as conn:
+            conn.exec_driver_sql(
+                "UPDATE credit_transactions "
+                "SET status = 'approved', version = version + 1 "
+                "WHERE session_id = 's-6'"
+            )
+
+        transaction.status = FAILED
+        with pytest.raises(StaleDataError):
+            test_db.commit()
+
+    def test_sesion_fuera_de_la_ventana(self, test_db, create_test_transaction):
+        """✅ Una sesión más vieja que la ventana reciente igual se encuentra"""
+        create_test_transaction(
+            session_id="s-7",
+            status=PENDING,
+            created_at=datetime.utcnow() - timedelta(days=400),
+        )
+
+        result = apply_transition(test_db, "s-7", APPROVED, "MP_7")
+
+        assert result.applied is True
+        assert result.status == APPROVED
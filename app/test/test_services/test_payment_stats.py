@@ -0,0 +1,180 @@
+"""
+Pruebas unitarias para los rollups de estadísticas de pago
+- Deltas plegados con UPSERT incremental por hora y día
+- Alimentados por createSession y por las transiciones del webhook
+- Consulta por rango y granularidad
+- Revenue con el monto cobrado y conversión por cohorte
+"""
+
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.models.payment_stats_delta import PaymentStatsDelta
+from app.models.payment_stats_rollup import PaymentStatsRollup
+from app.services.payment_state import APPROVED, apply_transition
+from app.services.fx_rates import RateTable, static_provider
+from app.services.payment_stats import (
+    CONVERTED,
+    CREATED,
+    DAY,
+    HOUR,
+    StatsFolder,
+    bucket_start,
+    charged_amount,
+    fold_deltas,
+    query_stats,
+    record_event,
+)
+from app.services.pricing import PRICE_TABLE
+from app.services.webhook_service import process_payment_notification
+
+BACKFILL = Path(__file__).parents[3] / "migrations" / "012_payment_stats_backfill.sql"
+
+AT = datetime(2026, 10, 19, 14, 35, 12)
+
+
+class TestPaymentStats:
+    """Pruebas de record_event y query_stats"""
+
+    def test_bucket_por_hora_y_dia(self):
+        """✅ Los eventos se agrupan al inicio de la hora y del día"""
+        assert bucket_start(AT, HOUR) == datetime(2026, 10, 19, 14)
+        assert bucket_start(AT, DAY) == datetime(2026, 10, 19)
+
+    def test_evento_es_un_delta(self, test_db):
+        """✅ record_event sólo inserta un delta: no toca filas de rollups compartidas"""
+        record_event(test_db, APPROVED, 750, at=AT, count=2)
+        test_db.commit()
+
+        delta = test_db.query(PaymentStatsDelta).one()
+        assert (delta.status, delta.tier, delta.count, delta.amount) == (
+            APPROVED,
+            750,
+            2,
+            24.0,
+        )
+        assert test_db.query(PaymentStatsRollup).count() == 0
+
+    def test_upsert_incremental(self, test_db):
+        """✅ Eventos del mismo bucket suman sobre la misma fila"""
+        for _ in range(3):
+            record_event(test_db, APPROVED, 750, at=AT)
+        test_db.commit()
+        fold_deltas(test_db)
+
+        rows = test_db.query(PaymentStatsRollup).filter_by(status=APPROVED).all()
+        assert {(r.granularity, r.count, r.amount) for r in rows} == {
+            (HOUR, 3, 36.0),
+            (DAY, 3, 36.0),
+        }
+
+    def test_consulta_por_paquete(self, test_db):
+        """✅ La consulta agrupa por bucket y paquete"""
+        record_event(test_db, CREATED, 250, at=AT)
+        record_event(test_db, CREATED, 250, at=AT)
+        record_event(test_db, APPROVED, 250, at=AT)
+        record_event(test_db, CREATED, 1500, at=AT + timedelta(hours=2))
+        test_db.commit()
+        fold_deltas(test_db)
+
+        buckets = query_stats(
+            test_db, datetime(2026, 10, 19), datetime(2026, 10, 20), HOUR
+        )
+
+        assert [(b.bucket_start.hour, b.tier) for b in buckets] == [
+            (14, 250),
+            (16, 1500),
+        ]
+        assert buckets[0].counts == {CREATED: 2, APPROVED: 1}
+        assert buckets[0].amounts[APPROVED] == 5.0
+
+    def test_rango_demasiado_grande(self, test_db):
+        """❌ Un rango con demasiados buckets se rechaza"""
+        with pytest.raises(ValueError, match="buckets"):
+            query_stats(test_db, datetime(2020, 1, 1), datetime(2026, 1, 1), HOUR)
+
+    def test_transicion_alimenta_rollup(self, test_db, create_test_transaction):
+        """✅ Una transición aplicada suma al rollup; un duplicado no"""
+        create_test_transaction(session_id="s-1", status="pending", credits=750)
+
+        apply_transition(test_db, "s-1", APPROVED, "MP_1")
+        apply_transition(test_db, "s-1", APPROVED, "MP_1")
+        fold_deltas(test_db)
+
+        row = (
+            test_db.query(PaymentStatsRollup)
+            .filter_by(granularity=DAY, status=APPROVED)
+            .one()
+        )
+        assert (row.tier, row.count) == (750, 1)
+
+    def test_transicion_guarda_lo_cobrado(self, test_db, create_test_transaction):
+        """✅ El delta de la aprobación lleva el monto cobrado, no el precio actual"""
+        create_test_transaction(
+            session_id="s-1", status="pending", credits=750, created_at=AT
+        )
+
+        apply_transition(test_db, "s-1", APPROVED, "MP_1", amount=10.0)
+
+        deltas = {d.status: d for d in test_db.query(PaymentStatsDelta)}
+        assert deltas[APPROVED].amount == 10.0
+        # La conversión va al bucket de creación de la sesión
+        assert (deltas[CONVERTED].at, deltas[CONVERTED].amount) == (AT, 10.0)
+
+    @patch("app.services.webhook_service.publish_event")
+    def test_webhook_usa_el_monto_de_mercadopago(
+        self, mock_publish, test_db, create_test_transaction
+    ):
+        """✅ El webhook anota transaction_amount del pago como revenue"""
+        create_test_transaction(session_id="s-1", status="pending", credits=750)
+        payment = {
+            "status": "approved",
+            "external_reference": '{"sessionId": "s-1"}',
+            "transaction_amount": 11.5,
+            "currency_id": "USD",
+        }
+
+        process_payment_notification(test_db, 123, payment)
+
+        delta = test_db.query(PaymentStatsDelta).filter_by(status=APPROVED).one()
+        assert delta.amount == 11.5
+
+    def test_monto_cobrado_en_moneda_base(self):
+        """✅ Lo cobrado en otra moneda se convierte a BASE_CURRENCY"""
+        rates = RateTable(static_provider({"ARS": 1000}))
+        rates.refresh()
+
+        with patch("app.services.payment_stats.rate_table", rates):
+            assert charged_amount(5, "USD") == 5.0
+            assert charged_amount(5000, "ars") == 5.0
+            # Sin tipo de cambio (o sin monto) se usa el precio del paquete
+            assert charged_amount(5000, "BRL") is None
+            assert charged_amount(None, "USD") is None
+
+    def test_plegado_por_lotes(self, test_db, test_engine):
+        """✅ StatsFolder pliega todos los deltas por lotes y los borra"""
+        for i in range(5):
+            record_event(test_db, CREATED, 250, at=AT + timedelta(minutes=i))
+        test_db.commit()
+
+        folder = StatsFolder(sessionmaker(bind=test_engine), batch=2)
+
+        assert folder.fold() == 5
+        assert test_db.query(PaymentStatsDelta).count() == 0
+        row = (
+            test_db.query(PaymentStatsRollup)
+            .filter_by(granularity=HOUR, status=CREATED)
+            .one()
+        )
+        assert row.count == 5
+        assert folder.fold() == 0
+
+    def test_backfill_usa_la_tabla_de_precios(self):
+        """✅ Los precios del backfill (012) coinciden con PRICE_TABLE"""
+        backfill = BACKFILL.read_text(encoding="utf-8")
+        prices = re.findall(r"WHEN (\d+) THEN ([\d.]+)", backfill)
+
+        assert {int(credits): float(price) for credits, price in prices} == PRICE_TABLE
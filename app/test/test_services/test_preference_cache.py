@@ -0,0 +1,182 @@
+"""
+Pruebas unitarias para el cache de preferencias de MercadoPago
+- Clave normalizada de (items, external_reference)
+- Reutilización y vencimiento
+- Coalescencia de requests concurrentes
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+from app.services.preference_cache import PreferenceCache, preference_key
+from app.services.single_flight import SingleFlight
+
+
+def _respuesta(pref_id="pref_123", **extra):
+    return {
+        "status": 201,
+        "response": {
+            "id": pref_id,
+            "init_point": f"https://mp/checkout?pref_id={pref_id}",
+            **extra,
+        },
+    }
+
+
+ITEMS = [
+    {"title": "250 créditos", "quantity": 1, "unit_price": 5.0, "currency_id": "ARS"}
+]
+
+
+class TestPreferenceKey:
+    """Pruebas de la clave normalizada"""
+
+    def test_misma_clave_con_formato_distinto(self):
+        """✅ Espacios, orden de claves y tipos numéricos no cambian la clave"""
+        item = {"title": " 250 créditos ", "quantity": 1, "unit_price": 5}
+        items = [{**item, "currency_id": "ars"}]
+
+        assert preference_key(
+            ITEMS, '{"sessionId": "s1", "userId": 2}'
+        ) == preference_key(items, '{"userId":2,"sessionId":"s1"}')
+
+    def test_orden_de_items_no_importa(self):
+        """✅ El orden de los items no cambia la clave"""
+        otro = {
+            "title": "750 créditos",
+            "quantity": 1,
+            "unit_price": 12.0,
+            "currency_id": "ARS",
+        }
+
+        assert preference_key(ITEMS + [otro], None) == preference_key(
+            [otro] + ITEMS, None
+        )
+
+    def test_sesiones_distintas_claves_distintas(self):
+        """✅ Otra sesión genera otra preferencia"""
+        first = preference_key(ITEMS, '{"sessionId": "s1"}')
+        assert first != preference_key(ITEMS, '{"sessionId": "s2"}')
+
+
+class TestPreferenceCache:
+    """Pruebas del cache de preferencias"""
+
+    def test_reutiliza_preferencia(self):
+        """✅ El segundo request devuelve la preferencia existente sin llamar a MP"""
+        cache = PreferenceCache(ttl=60)
+        create = Mock(return_value=_respuesta())
+
+        first = cache.get_or_create("k", create)
+        second = cache.get_or_create("k", create)
+
+        assert first is second
+        create.assert_called_once()
+
+    def test_no_cachea_errores(self):
+        """❌ Una respuesta de error de MP no se reutiliza"""
+        cache = PreferenceCache(ttl=60)
+        error = {"status": 400, "response": {"message": "bad_request"}}
+        create = Mock(return_value=error)
+
+        cache.get_or_create("k", create)
+        cache.get_or_create("k", create)
+
+        assert create.call_count == 2
+
+    def test_ttl_vencido(self):
+        """✅ Pasado el TTL se crea una preferencia nueva"""
+        cache = PreferenceCache(ttl=0.05)
+        create = Mock(side_effect=[_respuesta("a"), _respuesta("b")])
+
+        cache.get_or_create("k", create)
+        time.sleep(0.1)
+        result = cache.get_or_create("k", create)
+
+        assert result["response"]["id"] == "b"
+
+    def test_respeta_vencimiento_de_mp(self):
+        """✅ No se cachea una preferencia que MP da por vencida antes del TTL"""
+        cache = PreferenceCache(ttl=600)
+        expira = (datetime.now(timezone.utc) + timedelta(seconds=30)).isoformat()
+        create = Mock(return_value=_respuesta(expiration_date_to=expira))
+
+        cache.get_or_create("k", create)
+        cache.get_or_create("k", create)
+
+        assert create.call_count == 2
+
+    def test_limite_de_entradas(self):
+        """✅ Se descartan las entradas menos usadas al superar el máximo"""
+        cache = PreferenceCache(ttl=60, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, _respuesta(key))
+
+        assert cache.get("a") is None
+        assert cache.get("c") is not None
+
+    def test_requests_concurrentes_coalescen(self):
+        """✅ Requests idénticos simultáneos hacen una sola llamada a MP"""
+        cache = PreferenceCache(ttl=60)
+        release = threading.Event()
+        calls = []
+
+        def create():
+            calls.append(1)
+            release.wait(1)
+            return _respuesta()
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_create("k", create))
+            )
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert len(results) == 5
+        assert all(r["response"]["id"] == "pref_123" for r in results)
+
+
+class TestSingleFlight:
+    """Pruebas de la coalescencia genérica"""
+
+    def test_propaga_excepcion_a_todos(self):
+        """❌ Si la llamada falla, la excepción le llega a todos los que esperaban"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fail():
+            calls.append(1)
+            release.wait(1)
+            raise RuntimeError("MP caído")
+
+        errors = []
+
+        def run():
+            try:
+                flight.do("k", fail)
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert len(errors) == 4
+        assert all(str(e) == "MP caído" for e in errors)
+        assert flight.in_flight() == 0
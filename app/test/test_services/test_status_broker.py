@@ -0,0 +1,164 @@
+"""
+Pruebas unitarias para el fan-out de estados de pago
+- Entrega a varios suscriptores de la misma sesión
+- Cola acotada que descarta lo más viejo
+- Límite de suscriptores, idle timeout y fin en approved (failed sigue abierto)
+- Publicación desde otro hilo (webhook en el threadpool)
+"""
+
+import asyncio
+import threading
+import pytest
+from app.services.status_broker import StatusBroker, TooManySubscribers, status_event
+
+
+async def _collect(stream, limit=10):
+    events = []
+    async for event in stream:
+        events.append(event)
+        if len(events) >= limit:
+            break
+    return events
+
+
+async def _initial(event):
+    return event
+
+
+class TestStatusBroker:
+    """Pruebas de StatusBroker"""
+
+    def test_fan_out_a_todos_los_suscriptores(self):
+        """✅ Todos los suscriptores de la sesión reciben el evento"""
+        broker = StatusBroker()
+
+        async def run():
+            a = broker.subscribe("s1")
+            b = broker.subscribe("s1")
+            other = broker.subscribe("s2")
+            sent = broker.publish("s1", status_event("s1", "approved", "MP_1"))
+            return sent, a.queue.qsize(), b.queue.qsize(), other.queue.qsize()
+
+        assert asyncio.run(run()) == (2, 1, 1, 0)
+
+    def test_cola_llena_descarta_lo_mas_viejo(self):
+        """✅ Un suscriptor lento sólo pierde los eventos más viejos"""
+        broker = StatusBroker(queue_size=2)
+
+        async def run():
+            sub = broker.subscribe("s1")
+            for status in ("pending", "in_process", "approved"):
+                broker.publish("s1", status_event("s1", status))
+            return [sub.queue.get_nowait()["status"] for _ in range(sub.queue.qsize())]
+
+        assert asyncio.run(run()) == ["in_process", "approved"]
+
+    def test_limite_de_suscriptores(self):
+        """❌ Superado el máximo se rechazan nuevos suscriptores"""
+        broker = StatusBroker(max_subscribers=1)
+
+        async def run():
+            sub = broker.subscribe("s1")
+            with pytest.raises(TooManySubscribers):
+                broker.subscribe("s2")
+            broker.unsubscribe(sub)
+            broker.subscribe("s2")
+
+        asyncio.run(run())
+        assert len(broker) == 1
+
+    def test_stream_termina_en_estado_terminal(self):
+        """✅ El stream arranca con el estado actual y termina en uno terminal"""
+        broker = StatusBroker()
+
+        async def run():
+            task = asyncio.create_task(_collect(broker.stream(
+                "s1", lambda: _initial(status_event("s1", "pending")), idle_timeout=5,
+            )))
+            while len(broker) == 0:
+                await asyncio.sleep(0)
+            broker.publish("s1", status_event("s1", "approved", "MP_1"))
+            return await asyncio.wait_for(task, timeout=1)
+
+        events = asyncio.run(run())
+
+        assert [e["status"] for e in events] == ["pending", "approved"]
+        assert len(broker) == 0
+
+    def test_stream_de_sesion_ya_aprobada(self):
+        """✅ Si la sesión ya está aprobada sólo se emite ese estado"""
+        broker = StatusBroker()
+
+        events = asyncio.run(_collect(broker.stream(
+            "s1", lambda: _initial(status_event("s1", "approved", "MP_1")),
+        )))
+
+        assert [e["status"] for e in events] == ["approved"]
+
+    def test_failed_sigue_hasta_el_reintento_aprobado(self):
+        """✅ Un failed no cierra el stream: llega el approved del reintento"""
+        broker = StatusBroker()
+
+        async def run():
+            task = asyncio.create_task(_collect(broker.stream(
+                "s1", lambda: _initial(status_event("s1", "pending")), idle_timeout=5,
+            )))
+            while len(broker) == 0:
+                await asyncio.sleep(0)
+            broker.publish("s1", status_event("s1", "failed", "MP_1"))
+            await asyncio.sleep(0)
+            broker.publish("s1", status_event("s1", "approved", "MP_2"))
+            return await asyncio.wait_for(task, timeout=1)
+
+        events = asyncio.run(run())
+
+        assert [(e["status"], e["payment_id"]) for e in events] == [
+            ("pending", None),
+            ("failed", "MP_1"),
+            ("approved", "MP_2"),
+        ]
+        assert len(broker) == 0
+
+    def test_wait_en_failed_espera_el_reintento(self):
+        """✅ El long-poll de una sesión failed devuelve el approved que llega"""
+        broker = StatusBroker()
+
+        async def run():
+            current = status_event("s1", "failed", "MP_1")
+            task = asyncio.create_task(
+                broker.wait("s1", lambda: _initial(current), timeout=5)
+            )
+            while len(broker) == 0:
+                await asyncio.sleep(0)
+            broker.publish("s1", status_event("s1", "approved", "MP_2"))
+            return await asyncio.wait_for(task, timeout=1)
+
+        assert asyncio.run(run()) == status_event("s1", "approved", "MP_2")
+
+    def test_idle_timeout_con_latidos(self):
+        """✅ Sin eventos se emiten latidos y el stream se cierra por inactividad"""
+        broker = StatusBroker()
+
+        stream = broker.stream("s1", idle_timeout=0.05, heartbeat=0.02)
+        events = asyncio.run(_collect(stream))
+
+        assert events and all(e is None for e in events)
+        assert len(broker) == 0
+
+    def test_publicar_desde_otro_hilo(self):
+        """✅ Un evento publicado desde otro hilo llega al loop del suscriptor"""
+        broker = StatusBroker()
+
+        async def run():
+            task = asyncio.create_task(_collect(broker.stream("s1", idle_timeout=5)))
+            while len(broker) == 0:
+                await asyncio.sleep(0)
+            thread = threading.Thread(
+                target=broker.publish,
+                args=("s1", status_event("s1", "approved", "MP_1")),
+            )
+            thread.start()
+            thread.join()
+            return await asyncio.wait_for(task, timeout=1)
+
+        assert asyncio.run(run()) == [status_event("s1", "approved", "MP_1")]
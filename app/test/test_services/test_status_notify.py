@@ -0,0 +1,58 @@
+"""
+Pruebas unitarias para la difusión de estados entre instancias
+- Backend local (entrega directa en el proceso)
+- NOTIFY de Postgres con el evento serializado
+- Reparto de los avisos recibidos por LISTEN
+"""
+
+import asyncio
+import json
+from unittest.mock import Mock
+from app.services.status_broker import StatusBroker, status_event
+from app.services.status_notify import LocalNotifier, PostgresNotifier, create_notifier
+
+
+class TestStatusNotifier:
+    """Pruebas de los notifiers"""
+
+    def test_backend_local_en_sqlite(self):
+        """✅ Sin Postgres se usa la entrega en el proceso"""
+        assert isinstance(create_notifier("auto"), LocalNotifier)
+        assert isinstance(create_notifier("postgres"), PostgresNotifier)
+
+    def test_local_entrega_al_broker(self):
+        """✅ El backend local publica directo en el broker"""
+        broker = StatusBroker()
+
+        async def run():
+            sub = broker.subscribe("s1")
+            LocalNotifier(broker).notify(Mock(), status_event("s1", "approved", "MP_1"))
+            return sub.queue.get_nowait()
+
+        assert asyncio.run(run()) == status_event("s1", "approved", "MP_1")
+
+    def test_postgres_notify(self):
+        """✅ El aviso sale con pg_notify en el canal configurado"""
+        db = Mock()
+        notifier = PostgresNotifier(Mock(), StatusBroker(), channel="estados")
+
+        notifier.notify(db, status_event("s1", "approved", "MP_1"))
+
+        statement, params = db.execute.call_args.args
+        assert "pg_notify" in str(statement)
+        assert params["channel"] == "estados"
+        assert json.loads(params["payload"]) == status_event("s1", "approved", "MP_1")
+        db.commit.assert_called_once()
+
+    def test_listen_reparte_a_suscriptores(self):
+        """✅ Un aviso recibido por LISTEN llega a los suscriptores de la sesión"""
+        broker = StatusBroker()
+        notifier = PostgresNotifier(Mock(), broker)
+
+        async def run():
+            sub = broker.subscribe("s1")
+            notifier.dispatch(json.dumps(status_event("s1", "failed", "MP_1")))
+            notifier.dispatch("no es json")
+            return [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+
+        assert asyncio.run(run()) == [status_event("s1", "failed", "MP_1")]
@@ -0,0 +1,191 @@
+"""
+Pruebas unitarias para el inbox de avisos y el replay
+- El webhook guarda cada aviso y su resultado
+- Selección por rango y resultado
+- Replay agrupado por pago, con dry-run y errores anotados
+- Replay de un aviso que falló después del commit: el evento sale del outbox
+- Rate limit entre hilos
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from sqlalchemy.orm import sessionmaker
+from app.models.event_outbox import OutboxEvent
+from app.models.webhook_inbox import WebhookInbox
+from app.services.webhook_inbox import (
+    ERROR,
+    IGNORED,
+    PROCESSED,
+    SKIPPED,
+    RateLimiter,
+    parse_notification,
+    record_notification,
+    record_outcome,
+    replay,
+    select_entries,
+)
+
+
+def _notification(payment_id, topic="payment"):
+    return json.dumps({"type": topic, "data": {"id": payment_id}}).encode()
+
+
+class TestWebhookInbox:
+    """Pruebas del inbox"""
+
+    def test_parse_notification(self):
+        """✅ Extrae tipo y payment_id, tolera cuerpos inválidos"""
+        assert parse_notification(_notification(123)) == ("payment", "123")
+        assert parse_notification(b"no es json") == (None, None)
+        assert parse_notification(b"[]") == (None, None)
+
+    def test_webhook_guarda_aviso_y_resultado(self, test_client, test_db):
+        """✅ El aviso queda guardado crudo con su resultado"""
+        body = _notification(99, topic="merchant_order")
+
+        response = test_client.post("/webhooks/mercadopago", content=body)
+
+        assert response.status_code == 200
+        entry = test_db.query(WebhookInbox).one()
+        assert entry.body == body
+        assert (entry.topic, entry.payment_id, entry.outcome, entry.attempts) == (
+            "merchant_order",
+            "99",
+            IGNORED,
+            1,
+        )
+
+    def test_webhook_anota_errores(self, test_client, test_db):
+        """❌ Un error de procesamiento queda anotado en el aviso"""
+        with patch("app.routers.webhook_router.payment_lookup") as lookup:
+            lookup.get.side_effect = RuntimeError("MP caído")
+            test_client.post("/webhooks/mercadopago", content=_notification(1))
+
+        entry = test_db.query(WebhookInbox).one()
+        assert entry.outcome == ERROR
+        assert "MP caído" in entry.detail
+
+    def test_seleccion_por_rango_y_resultado(self, test_db):
+        """✅ Filtra por fecha de recepción, resultado e ids"""
+        old = record_notification(test_db, _notification(1))
+        two_days_ago = datetime.utcnow() - timedelta(days=2)
+        test_db.get(WebhookInbox, old).received_at = two_days_ago
+        failed = record_notification(test_db, _notification(2))
+        record_outcome(test_db, [failed], ERROR, "x")
+        ok = record_notification(test_db, _notification(3))
+        record_outcome(test_db, [ok], PROCESSED)
+
+        since = datetime.utcnow() - timedelta(days=1)
+        assert [e.id for e in select_entries(test_db, since=since)] == [failed, ok]
+        assert [e.id for e in select_entries(test_db, outcomes=[ERROR])] == [failed]
+        assert [e.id for e in select_entries(test_db, ids=[old, ok])] == [old, ok]
+
+
+class TestReplay:
+    """Pruebas del replay"""
+
+    def test_replay_una_vez_por_pago(self, test_db, test_engine):
+        """✅ Cada pago se reprocesa una vez y el resultado va a todos sus avisos"""
+        ids = [record_notification(test_db, _notification(p)) for p in (1, 1, 2)]
+        record_notification(test_db, _notification(5, topic="merchant_order"))
+        process = Mock(
+            side_effect=lambda db, payment_id: Mock(applied=payment_id == "1")
+        )
+
+        result = replay(
+            test_db,
+            sessionmaker(bind=test_engine),
+            select_entries(test_db),
+            concurrency=2,
+            rate=0,
+            process=process,
+        )
+
+        assert (result.selected, result.payments) == (4, 2)
+        assert result.outcomes == {PROCESSED: 1, SKIPPED: 1}
+        assert sorted(call.args[1] for call in process.call_args_list) == ["1", "2"]
+        entries = select_entries(test_db, ids=ids)
+        outcomes = {e.id: (e.outcome, e.attempts) for e in entries}
+        assert outcomes == {
+            ids[0]: (PROCESSED, 1),
+            ids[1]: (PROCESSED, 1),
+            ids[2]: (SKIPPED, 1),
+        }
+
+    def test_replay_anota_errores(self, test_db, test_engine):
+        """❌ Un pago que vuelve a fallar queda en error con el detalle"""
+        entry_id = record_notification(test_db, _notification(7))
+        process = Mock(side_effect=RuntimeError("sigue roto"))
+
+        result = replay(
+            test_db,
+            sessionmaker(bind=test_engine),
+            select_entries(test_db),
+            rate=0,
+            process=process,
+        )
+
+        assert result.outcomes == {ERROR: 1}
+        entry = test_db.get(WebhookInbox, entry_id)
+        assert (entry.outcome, entry.detail) == (ERROR, "sigue roto")
+
+    @patch("app.services.event_outbox.publish_event")
+    @patch("requests.get")
+    def test_replay_de_un_error_despues_del_commit(
+        self, mock_get, mock_publish, test_client, test_db, test_engine,
+        create_test_transaction,
+    ):
+        """✅ Si el aviso falló después del commit, el replay publica el evento"""
+        create_test_transaction(session_id="s-replay", status="pending", credits=250)
+        mock_get.return_value = Mock(json=Mock(return_value={
+            "id": 7,
+            "status": "approved",
+            "external_reference": json.dumps({"sessionId": "s-replay"}),
+        }))
+        # La transición y su evento se confirman; el proceso cae antes de publicar
+        with patch(
+            "app.services.webhook_service.dispatch",
+            side_effect=RuntimeError("caída después del commit"),
+        ):
+            test_client.post("/webhooks/mercadopago", content=_notification(7))
+        assert test_db.query(WebhookInbox).one().outcome == ERROR
+        assert test_db.query(OutboxEvent).count() == 1
+
+        result = replay(
+            test_db, sessionmaker(bind=test_engine), select_entries(test_db), rate=0
+        )
+
+        assert (result.outcomes, result.events) == ({SKIPPED: 1}, 1)
+        event_type, payload = mock_publish.call_args.args
+        assert event_type == "payment_status_changed"
+        assert (payload["session_id"], payload["credits"]) == ("s-replay", 250)
+        assert test_db.query(OutboxEvent).count() == 0
+
+    def test_dry_run(self, test_db, test_engine):
+        """✅ En dry-run sólo cuenta, sin procesar ni anotar"""
+        entry_id = record_notification(test_db, _notification(7))
+        process = Mock()
+
+        result = replay(
+            test_db,
+            sessionmaker(bind=test_engine),
+            select_entries(test_db),
+            dry_run=True,
+            process=process,
+        )
+
+        assert (result.selected, result.payments, result.outcomes) == (1, 1, {})
+        process.assert_not_called()
+        assert test_db.get(WebhookInbox, entry_id).attempts == 0
+
+    def test_rate_limiter(self):
+        """✅ El rate limit espacia las llamadas"""
+        limiter = RateLimiter(rate=100)
+
+        started = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+
+        assert time.monotonic() - started >= 0.035
@@ -0,0 +1,63 @@
+"""
+Archiva las transacciones terminadas (approved/failed) viejas a archivos
+.csv.gz y las borra de credit_transactions en lotes.
+
+    python archive.py                          # más viejas que 180 días
+    python archive.py --older-than-days 90
+    python archive.py --before 2026-01-01 --output-dir /mnt/archive
+    python archive.py --no-delete              # sólo genera el archivo
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from app.db.session import engine
+from app.services.archive_service import (
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_DIR,
+    archive_transactions,
+)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Archivado de credit_transactions")
+    parser.add_argument(
+        "--before",
+        type=datetime.fromisoformat,
+        help="Archivar lo creado antes de esta fecha",
+    )
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--output-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument(
+        "--no-delete", action="store_true", help="No borrar las filas archivadas"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    before = args.before or datetime.now() - timedelta(days=args.older_than_days)
+
+    print(
+        f"Archivando transacciones terminadas anteriores a {before:%Y-%m-%d %H:%M}..."
+    )
+    result = archive_transactions(
+        engine,
+        before,
+        output_dir=args.output_dir,
+        batch_size=args.batch_size,
+        delete_rows=not args.no_delete,
+    )
+    if result.path is None:
+        print("No hay filas para archivar.")
+        return
+    print(f"{result.archived} filas en {result.path}, {result.deleted} borradas.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
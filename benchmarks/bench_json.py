@@ -0,0 +1,102 @@
+"""
+Benchmark del codec JSON en las rutas calientes: stdlib json vs orjson.
+
+    python -m benchmarks.bench_json
+
+Mide el costo por operación de decodificar el body del webhook y el
+external_reference, codificar el evento de Pub/Sub y serializar una respuesta
+GraphQL típica.
+"""
+
+import json
+import timeit
+
+import orjson
+
+WEBHOOK_BODY = json.dumps({
+    "action": "payment.updated",
+    "api_version": "v1",
+    "data": {"id": "123456789"},
+    "date_created": "2025-09-28T12:00:00.000-04:00",
+    "id": 987654,
+    "live_mode": True,
+    "type": "payment",
+    "user_id": 123456789,
+}).encode("utf-8")
+
+EXTERNAL_REFERENCE = json.dumps(
+    {"sessionId": "0b6a4b0e-6c1b-4c2d-9a4e-3f9c2f1f5d7a", "userId": 42}
+)
+CHECKOUT_URL = "mercadopago.com.ar/checkout/v1/redirect?pref_id=123456789-abcdef"
+
+EVENT = {
+    "event": "payment_status_changed",
+    "data": {
+        "email": "usuario@example.com",
+        "credits": 750,
+        "session_id": "0b6a4b0e-6c1b-4c2d-9a4e-3f9c2f1f5d7a",
+        "status": "approved",
+        "payment_id": "123456789",
+    },
+}
+
+GRAPHQL_RESPONSE = {
+    "data": {
+        "createPreference": {
+            "id": "123456789-abcdef",
+            "initPoint": f"https://www.{CHECKOUT_URL}",
+            "sandboxInitPoint": f"https://sandbox.{CHECKOUT_URL}",
+            "externalReference": EXTERNAL_REFERENCE,
+            "items": [
+                {
+                    "title": f"Paquete {n} créditos",
+                    "quantity": 1,
+                    "unitPrice": price,
+                    "currencyId": "ARS",
+                }
+                for n, price in ((250, 5.0), (750, 12.0), (1500, 20.0))
+            ],
+            "payer": None,
+            "dateCreated": "2025-09-28T12:00:00.000-04:00",
+        }
+    },
+    "extensions": {"cost": {"requested": 51, "maximum": 200}},
+}
+
+CASES = {
+    "webhook body (decode)": (
+        lambda: json.loads(WEBHOOK_BODY),
+        lambda: orjson.loads(WEBHOOK_BODY),
+    ),
+    "external_reference (decode)": (
+        lambda: json.loads(EXTERNAL_REFERENCE),
+        lambda: orjson.loads(EXTERNAL_REFERENCE),
+    ),
+    "evento Pub/Sub (encode)": (
+        lambda: json.dumps(EVENT).encode("utf-8"),
+        lambda: orjson.dumps(EVENT),
+    ),
+    "respuesta GraphQL (encode)": (
+        lambda: json.dumps(
+            GRAPHQL_RESPONSE, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8"),
+        lambda: orjson.dumps(GRAPHQL_RESPONSE),
+    ),
+}
+
+
+def _per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1_000_000
+
+
+def main(number: int = 50_000):
+    print(f"{'caso':<30} {'stdlib (µs)':>12} {'orjson (µs)':>12} {'speedup':>8}")
+    for name, (stdlib_fn, orjson_fn) in CASES.items():
+        stdlib_us = _per_call_us(stdlib_fn, number)
+        orjson_us = _per_call_us(orjson_fn, number)
+        speedup = stdlib_us / orjson_us
+        print(f"{name:<30} {stdlib_us:>12.2f} {orjson_us:>12.2f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
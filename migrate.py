@@ -0,0 +1,72 @@
+"""
+Aplica en orden los scripts SQL de migrations/ que todavía no se corrieron.
+
+    python migrate.py            # aplica las pendientes
+    python migrate.py --list     # muestra el estado
+    python migrate.py --to 008   # aplica hasta 008 inclusive (expand/contract)
+
+Cada archivo se ejecuta en su propia transacción, salvo que empiece con la
+línea "-- migrate: no-transaction" (p. ej. CREATE INDEX CONCURRENTLY); esos
+archivos deben tener una sola sentencia.
+"""
+
+import sys
+from pathlib import Path
+
+from app.db.session import engine
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+NO_TRANSACTION = "-- migrate: no-transaction"
+RECORD_MIGRATION = "INSERT INTO schema_migrations (name) VALUES (%s)"
+
+
+def _applied(cursor) -> set:
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " name VARCHAR(255) PRIMARY KEY,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT now())"
+    )
+    cursor.execute("SELECT name FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _target(argv):
+    if "--to" in argv:
+        return argv[argv.index("--to") + 1]
+    return None
+
+
+def main(argv):
+    target = _target(argv)
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        applied = _applied(cursor)
+        conn.commit()
+
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            if "--list" in argv:
+                print(f"{'[x]' if path.name in applied else '[ ]'} {path.name}")
+                continue
+            if target and path.name > target and not path.name.startswith(target):
+                break
+            if path.name in applied:
+                continue
+
+            sql = path.read_text(encoding="utf-8")
+            print(f"Aplicando {path.name}...")
+            if sql.startswith(NO_TRANSACTION):
+                conn.autocommit = True
+                cursor.execute(sql)
+                cursor.execute(RECORD_MIGRATION, (path.name,))
+                conn.autocommit = False
+            else:
+                cursor.execute(sql)
+                cursor.execute(RECORD_MIGRATION, (path.name,))
+                conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
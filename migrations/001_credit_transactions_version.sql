@@ -0,0 +1,4 @@
+-- Columna de versión para la máquina de estados del pago (concurrencia optimista).
+-- En Postgres 11+ un ADD COLUMN con DEFAULT constante no reescribe la tabla.
+ALTER TABLE credit_transactions
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
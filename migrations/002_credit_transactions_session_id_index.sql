@@ -0,0 +1,4 @@
+-- migrate: no-transaction
+-- El webhook busca y actualiza por session_id: sin índice cada aviso recorre la tabla.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_credit_transactions_session_id
+    ON credit_transactions (session_id);
@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- Paso 1 de la conversión a tabla particionada (003-006).
+-- La PK de una tabla particionada tiene que incluir la clave de partición.
+-- Este índice es la futura PK (id, created_at) de la tabla histórica: se crea
+-- sin bloquear escrituras y el ATTACH de 006 lo reutiliza en vez de construirlo.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS credit_transactions_legacy_pkey
+    ON credit_transactions (id, created_at);
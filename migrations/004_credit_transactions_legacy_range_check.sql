@@ -0,0 +1,18 @@
+-- Paso 2: CHECK con el rango que va a cubrir la tabla histórica como partición
+-- (todo lo anterior al mes que viene). NOT VALID: sólo toma el lock un instante
+-- y no recorre la tabla. El límite queda en el comentario del constraint para 006.
+-- Correr 004-006 dentro del mismo mes.
+DO $$
+DECLARE
+    boundary TEXT := to_char(date_trunc('month', now()) + interval '1 month', 'YYYY-MM-DD');
+BEGIN
+    EXECUTE format(
+        'ALTER TABLE credit_transactions ADD CONSTRAINT credit_transactions_legacy_range '
+        'CHECK (created_at IS NOT NULL AND created_at < %L) NOT VALID',
+        boundary
+    );
+    EXECUTE format(
+        'COMMENT ON CONSTRAINT credit_transactions_legacy_range ON credit_transactions IS %L',
+        boundary
+    );
+END $$;
@@ -0,0 +1,4 @@
+-- Paso 3: validar el CHECK. VALIDATE CONSTRAINT recorre la tabla con un lock
+-- SHARE UPDATE EXCLUSIVE, así que lecturas y escrituras siguen funcionando.
+-- Si falla hay filas con created_at NULL o futuro: corregirlas y reintentar.
+ALTER TABLE credit_transactions VALIDATE CONSTRAINT credit_transactions_legacy_range;
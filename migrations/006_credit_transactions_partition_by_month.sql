@@ -0,0 +1,59 @@
+-- Paso 4: cambio de tabla. Todo son operaciones de catálogo (el CHECK validado
+-- evita los recorridos de SET NOT NULL y de ATTACH), así que el lock exclusivo
+-- dura milisegundos:
+--   * la tabla actual pasa a ser credit_transactions_legacy
+--   * se crea credit_transactions particionada por mes sobre created_at
+--   * legacy se adjunta como partición de todo lo anterior al límite
+--   * se crean la partición DEFAULT y los próximos meses
+-- La app crea después los meses siguientes (app/db/partitions.py).
+DO $$
+DECLARE
+    boundary DATE;
+    month DATE;
+BEGIN
+    SELECT obj_description(oid, 'pg_constraint')::DATE INTO boundary
+    FROM pg_constraint
+    WHERE conname = 'credit_transactions_legacy_range'
+      AND conrelid = 'credit_transactions'::regclass;
+
+    ALTER TABLE credit_transactions ALTER COLUMN created_at SET NOT NULL;
+
+    ALTER TABLE credit_transactions RENAME TO credit_transactions_legacy;
+    ALTER TABLE credit_transactions_legacy DROP CONSTRAINT credit_transactions_pkey;
+    ALTER TABLE credit_transactions_legacy
+        ADD CONSTRAINT credit_transactions_legacy_pkey PRIMARY KEY USING INDEX credit_transactions_legacy_pkey;
+    ALTER INDEX IF EXISTS ix_credit_transactions_id RENAME TO ix_credit_transactions_legacy_id;
+    ALTER INDEX IF EXISTS ix_credit_transactions_session_id RENAME TO ix_credit_transactions_legacy_session_id;
+
+    -- LIKE copia columnas, NOT NULL y defaults (incluido nextval de la
+    -- secuencia de id); sin INCLUDING CONSTRAINTS para no heredar el CHECK.
+    CREATE TABLE credit_transactions (
+        LIKE credit_transactions_legacy INCLUDING DEFAULTS,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    ALTER SEQUENCE credit_transactions_id_seq OWNED BY credit_transactions.id;
+
+    -- Al adjuntar, Postgres reutiliza los índices equivalentes de legacy.
+    CREATE INDEX ix_credit_transactions_id ON credit_transactions (id);
+    CREATE INDEX ix_credit_transactions_session_id ON credit_transactions (session_id);
+
+    EXECUTE format(
+        'ALTER TABLE credit_transactions ATTACH PARTITION credit_transactions_legacy '
+        'FOR VALUES FROM (MINVALUE) TO (%L)',
+        boundary
+    );
+    ALTER TABLE credit_transactions_legacy DROP CONSTRAINT credit_transactions_legacy_range;
+
+    month := boundary;
+    FOR i IN 1..3 LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF credit_transactions FOR VALUES FROM (%L) TO (%L)',
+            'credit_transactions_' || to_char(month, 'YYYY_MM'),
+            month,
+            month + interval '1 month'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+
+    CREATE TABLE credit_transactions_default PARTITION OF credit_transactions DEFAULT;
+END $$;
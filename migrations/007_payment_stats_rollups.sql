@@ -0,0 +1,28 @@
+-- Estadísticas de pago por hora y día (app/services/payment_stats.py).
+-- Aplicar antes de desplegar el código que las alimenta (escribe
+-- status_changed_at y payment_stats_deltas). El backfill de lo histórico es
+-- 012, después del despliegue.
+CREATE TABLE IF NOT EXISTS payment_stats_rollups (
+    granularity VARCHAR(10) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    tier INTEGER NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL,
+    PRIMARY KEY (granularity, bucket_start, tier, status)
+);
+
+-- Eventos todavía no plegados en los rollups: sólo INSERT en el request
+CREATE TABLE IF NOT EXISTS payment_stats_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    at TIMESTAMP NOT NULL,
+    tier INTEGER NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL
+);
+
+-- Última transición aplicada. Sin DEFAULT: sólo toca el catálogo. Queda NULL
+-- en las filas que no cambiaron desde esta migración, que son las que el
+-- backfill cuenta.
+ALTER TABLE credit_transactions ADD COLUMN IF NOT EXISTS status_changed_at TIMESTAMP;
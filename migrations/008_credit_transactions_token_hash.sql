@@ -0,0 +1,33 @@
+-- migrate: no-transaction
+-- Expand: token_hash (SHA-256, 32 bytes) reemplaza a token (hasta 512 chars).
+-- token pasa a aceptar NULL para que el código nuevo deje de escribirlo.
+-- El backfill recorre la tabla por rangos de id con un COMMIT por lote, así
+-- cada UPDATE bloquea pocas filas y el autovacuum puede ir limpiando.
+-- Aplicar con `python migrate.py --to 008`, desplegar y recién ahí correr 009.
+DO $$
+DECLARE
+    lo BIGINT;
+    hi BIGINT;
+    batch CONSTANT INTEGER := 5000;
+BEGIN
+    ALTER TABLE credit_transactions ADD COLUMN IF NOT EXISTS token_hash BYTEA;
+    -- Una base creada desde cero por la app ya no tiene token
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'credit_transactions' AND column_name = 'token'
+    ) THEN
+        RETURN;
+    END IF;
+    ALTER TABLE credit_transactions ALTER COLUMN token DROP NOT NULL;
+    COMMIT;
+
+    SELECT min(id), max(id) INTO lo, hi FROM credit_transactions;
+    WHILE lo <= hi LOOP
+        UPDATE credit_transactions
+        SET token_hash = sha256(convert_to(token, 'UTF8'))
+        WHERE id >= lo AND id < lo + batch
+          AND token_hash IS NULL AND token IS NOT NULL;
+        COMMIT;
+        lo := lo + batch;
+    END LOOP;
+END $$;
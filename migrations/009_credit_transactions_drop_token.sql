@@ -0,0 +1,55 @@
+-- migrate: no-transaction
+-- Contract: con el código nuevo desplegado nadie escribe token.
+-- Igual que 004/005, nada recorre la tabla con un lock ACCESS EXCLUSIVE:
+--   1. se completan por lotes de id (COMMIT por lote) las filas insertadas
+--      entre 008 y el despliegue
+--   2. CHECK (token_hash IS NOT NULL) NOT VALID: sólo toma el lock un instante
+--   3. VALIDATE CONSTRAINT recorre la tabla con SHARE UPDATE EXCLUSIVE, así que
+--      lecturas y escrituras siguen funcionando
+--   4. SET NOT NULL usa el CHECK validado y no vuelve a recorrer la tabla;
+--      después se borran el CHECK y la columna token
+-- DROP COLUMN sólo toca el catálogo: el espacio de las filas viejas se
+-- recupera a medida que se reescriben, o con pg_repack por partición (ver
+-- benchmarks/bench_token_storage.py).
+DO $$
+DECLARE
+    lo BIGINT;
+    hi BIGINT;
+    batch CONSTANT INTEGER := 5000;
+    has_token BOOLEAN;
+BEGIN
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'credit_transactions' AND column_name = 'token'
+    ) INTO has_token;
+
+    IF has_token THEN
+        SELECT min(id), max(id) INTO lo, hi FROM credit_transactions;
+        WHILE lo <= hi LOOP
+            UPDATE credit_transactions
+            SET token_hash = sha256(convert_to(token, 'UTF8'))
+            WHERE id >= lo AND id < lo + batch
+              AND token_hash IS NULL AND token IS NOT NULL;
+            COMMIT;
+            lo := lo + batch;
+        END LOOP;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'credit_transactions_token_hash_not_null'
+    ) THEN
+        ALTER TABLE credit_transactions ADD CONSTRAINT credit_transactions_token_hash_not_null
+            CHECK (token_hash IS NOT NULL) NOT VALID;
+        COMMIT;
+    END IF;
+
+    -- Si falla quedaron filas sin token_hash (token NULL): corregirlas y reintentar
+    ALTER TABLE credit_transactions VALIDATE CONSTRAINT credit_transactions_token_hash_not_null;
+    COMMIT;
+
+    ALTER TABLE credit_transactions ALTER COLUMN token_hash SET NOT NULL;
+    ALTER TABLE credit_transactions DROP CONSTRAINT credit_transactions_token_hash_not_null;
+    IF has_token THEN
+        ALTER TABLE credit_transactions DROP COLUMN token;
+    END IF;
+END $$;
@@ -0,0 +1,16 @@
+-- Inbox de avisos de MercadoPago: el cuerpo crudo de cada aviso y el
+-- resultado de su último procesamiento (replay_webhooks.py los reprocesa).
+CREATE TABLE IF NOT EXISTS webhook_inbox (
+    id BIGSERIAL PRIMARY KEY,
+    received_at TIMESTAMP NOT NULL DEFAULT now(),
+    topic VARCHAR(50),
+    payment_id VARCHAR(255),
+    body BYTEA NOT NULL,
+    outcome VARCHAR(20) NOT NULL DEFAULT 'received',
+    detail TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    processed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_webhook_inbox_received_at ON webhook_inbox (received_at);
+CREATE INDEX IF NOT EXISTS ix_webhook_inbox_payment_id ON webhook_inbox (payment_id);
@@ -0,0 +1,19 @@
+-- Cola de trabajos en la DB (app/services/job_queue.py). Los workers toman
+-- trabajos con FOR UPDATE SKIP LOCKED sobre el índice parcial de pendientes;
+-- los terminados (done/dead) quedan fuera del índice.
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    queue VARCHAR(50) NOT NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    locked_until TIMESTAMP,
+    locked_by VARCHAR(255),
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_claim ON jobs (queue, status, run_at) WHERE status IN ('queued', 'running');
@@ -0,0 +1,45 @@
+-- Backfill de los rollups de estadísticas (007) con lo anterior al despliegue.
+-- Correr una sola vez, con el código que alimenta las estadísticas ya
+-- desplegado, para no contar dos veces lo que ya se sumó en vivo:
+--   - created: sesiones creadas antes de la hora de la primera sesión en vivo
+--     (plegada o todavía en payment_stats_deltas).
+--     Las creadas en esa misma hora antes del despliegue no se cuentan.
+--   - transiciones: el estado actual de las filas con status_changed_at NULL,
+--     es decir cuya última transición fue anterior al despliegue. Las que
+--     cambiaron después ya se contaron en vivo.
+--   - converted: las aprobadas de ese mismo grupo, en el bucket de created_at
+--     (la conversión se calcula por cohorte de creación).
+-- La tabla no guarda cuándo ocurrió cada transición vieja: se atribuye al
+-- bucket de created_at.
+-- Las filas no guardan lo que cobró MercadoPago (en vivo sale del aviso): los
+-- montos repiten PRICE_TABLE de app/services/pricing.py. Si cambia un precio,
+-- actualizar el CASE (test_payment_stats verifica que coincidan).
+WITH cutoff AS (
+    SELECT COALESCE(LEAST(
+        (SELECT min(bucket_start) FROM payment_stats_rollups WHERE granularity = 'hour' AND status = 'created'),
+        (SELECT date_trunc('hour', min(at)) FROM payment_stats_deltas WHERE status = 'created')
+    ), 'infinity'::timestamp) AS ts
+),
+events AS (
+    SELECT created_at, credits, 'created' AS status FROM credit_transactions, cutoff
+    WHERE created_at < cutoff.ts
+    UNION ALL
+    SELECT created_at, credits, status FROM credit_transactions
+    WHERE status_changed_at IS NULL AND (status <> 'pending' OR payment_id <> '')
+    UNION ALL
+    SELECT created_at, credits, 'converted' FROM credit_transactions
+    WHERE status_changed_at IS NULL AND status = 'approved'
+),
+granularities (granularity) AS (VALUES ('hour'), ('day'))
+INSERT INTO payment_stats_rollups (granularity, bucket_start, tier, status, count, amount)
+SELECT g.granularity,
+       date_trunc(g.granularity, e.created_at),
+       e.credits,
+       e.status,
+       count(*),
+       count(*) * CASE e.credits WHEN 250 THEN 5.0 WHEN 750 THEN 12.0 WHEN 1500 THEN 20.0 ELSE 0 END
+FROM events e CROSS JOIN granularities g
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (granularity, bucket_start, tier, status) DO UPDATE
+SET count = payment_stats_rollups.count + EXCLUDED.count,
+    amount = payment_stats_rollups.amount + EXCLUDED.amount;
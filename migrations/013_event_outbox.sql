@@ -0,0 +1,13 @@
+-- Outbox de eventos de Pub/Sub (app/services/event_outbox.py). Cada transición
+-- aplicada inserta su evento payment_status_changed en la misma transacción;
+-- la fila se borra al publicarse, así que la tabla sólo tiene pendientes y el
+-- relay los recorre por la clave primaria.
+CREATE TABLE IF NOT EXISTS event_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(100) NOT NULL,
+    payload TEXT NOT NULL,
+    ordering_key VARCHAR(255),
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
@@ -0,0 +1,91 @@
+"""
+Reprocesa avisos de MercadoPago guardados en webhook_inbox con la misma
+lógica del webhook.
+
+    python replay_webhooks.py                              # los que terminaron en error
+    python replay_webhooks.py --from 2026-10-01 --to 2026-10-02 --outcome all
+    python replay_webhooks.py --id 1234 --id 1240
+    python replay_webhooks.py --from 2026-10-01 --dry-run  # sólo muestra qué haría
+    python replay_webhooks.py --concurrency 32 --rate 100
+
+Cada pago se reprocesa una sola vez aunque tenga varios avisos en el rango
+(se consulta su estado actual en MercadoPago). --rate limita las consultas
+por segundo para no chocar con el rate limit de MercadoPago.
+
+Al terminar publica los eventos que hayan quedado en el outbox (por ejemplo,
+de transiciones que se aplicaron pero cuyo evento no llegó a Pub/Sub).
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from app.db.session import SessionLocal
+from app.services.webhook_inbox import (
+    ERROR,
+    WEBHOOK_REPLAY_CONCURRENCY,
+    WEBHOOK_REPLAY_RATE,
+    replay,
+    select_entries,
+)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Replay de avisos de MercadoPago")
+    parser.add_argument(
+        "--from", dest="since", type=datetime.fromisoformat,
+        help="Recibidos desde esta fecha",
+    )
+    parser.add_argument(
+        "--to", dest="until", type=datetime.fromisoformat,
+        help="Recibidos antes de esta fecha",
+    )
+    parser.add_argument(
+        "--outcome", action="append",
+        help="Resultado a reprocesar (repetible; 'all' para todos). Default: error",
+    )
+    parser.add_argument(
+        "--id", dest="ids", type=int, action="append", help="Id del aviso (repetible)"
+    )
+    parser.add_argument("--concurrency", type=int, default=WEBHOOK_REPLAY_CONCURRENCY)
+    parser.add_argument(
+        "--rate", type=float, default=WEBHOOK_REPLAY_RATE,
+        help="Pagos por segundo (0 = sin límite)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="No reprocesa, sólo cuenta"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    outcomes = args.outcome or ([] if args.ids else [ERROR])
+    if "all" in outcomes:
+        outcomes = []
+
+    db = SessionLocal()
+    try:
+        entries = select_entries(db, args.since, args.until, outcomes, args.ids)
+        result = replay(
+            db,
+            SessionLocal,
+            entries,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            dry_run=args.dry_run,
+        )
+    finally:
+        db.close()
+
+    print(f"{result.selected} avisos seleccionados, {result.payments} pagos distintos.")
+    if args.dry_run:
+        print("Dry-run: no se reprocesó nada.")
+        return
+    for outcome, count in sorted(result.outcomes.items()):
+        print(f"  {outcome}: {count}")
+    print(f"{result.events} eventos pendientes del outbox publicados.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])